@@ -15,13 +15,11 @@ def create_minimal_deployment():
         f.write('fastapi==0.104.1\n')
         f.write('uvicorn==0.24.0\n')
         f.write('pydantic==2.5.0\n')
+        f.write('requests==2.31.0\n')
     
-    # Create minimal main.py (already exists)
-    print("✅ Minimal main.py created")
-    
-    # Ensure Procfile points to main.py
+    # Ensure Procfile points to the production app (server.create_app)
     with open('Procfile', 'w') as f:
-        f.write('web: uvicorn main:app --host 0.0.0.0 --port $PORT\n')
+        f.write('web: uvicorn app:app --host 0.0.0.0 --port $PORT\n')
     
     print("✅ Procfile updated")
     print("✅ Requirements updated")
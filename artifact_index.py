@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from artifacts import scan_artifacts
+from config import config
+
+# Keywords are shared by nearly every scam session, so they are not indexed
+UNINDEXED_CATEGORIES = frozenset({"suspicious_keywords"})
+
+class ArtifactEntry:
+    """Where one artifact has been seen: the sessions using it, most recent last."""
+
+    __slots__ = ("category", "sessions", "first_seen", "last_seen", "sightings")
+
+    def __init__(self, category: str, timestamp: int):
+        self.category = category
+        self.sessions: Dict[str, None] = {}
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.sightings = 0
+
+    def to_dict(self, value: str) -> Dict[str, Any]:
+        return {
+            "value": value,
+            "category": self.category,
+            "sessionIds": list(self.sessions),
+            "sessionCount": len(self.sessions),
+            "sightings": self.sightings,
+            "firstSeen": self.first_seen,
+            "lastSeen": self.last_seen
+        }
+
+def normalize(value: str) -> str:
+    """Normalize a query the way extraction normalizes artifacts."""
+    value = value.strip()
+    artifacts = scan_artifacts(value)
+    if len(artifacts) == 1 and artifacts[0].start == 0 and artifacts[0].end == len(value):
+        return artifacts[0].value
+    return value
+
+class ArtifactIndex:
+    """
+    Cross-session inverted index: normalized artifact -> sessions and
+    first/last seen times (epoch milliseconds).
+
+    Sessions record each message's artifacts as they are extracted, at O(1)
+    per artifact, and lookups are a single dict access. Memory is bounded:
+    at most max_entries artifacts are kept, the ones not seen for longest
+    being evicted first, and each keeps its max_sessions most recent sessions.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.ARTIFACT_INDEX_SIZE,
+        max_sessions: int = config.ARTIFACT_INDEX_SESSIONS
+    ):
+        # Ordered from least to most recently seen
+        self.entries: "OrderedDict[str, ArtifactEntry]" = OrderedDict()
+        self.max_entries = max_entries
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def record(self, session_id: str, artifacts: Mapping[str, Iterable[str]], timestamp: int) -> None:
+        """Record the artifacts one message of session_id contained, by category."""
+        with self._lock:
+            for category, values in artifacts.items():
+                if category in UNINDEXED_CATEGORIES:
+                    continue
+                for value in values:
+                    self._record(session_id, category, value, timestamp)
+            while self.max_entries > 0 and len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _record(self, session_id: str, category: str, value: str, timestamp: int) -> None:
+        entry = self.entries.get(value)
+        if entry is None:
+            entry = self.entries[value] = ArtifactEntry(category, timestamp)
+        else:
+            self.entries.move_to_end(value)
+            entry.first_seen = min(entry.first_seen, timestamp)
+            entry.last_seen = max(entry.last_seen, timestamp)
+        entry.sightings += 1
+
+        sessions = entry.sessions
+        if session_id in sessions:
+            del sessions[session_id]
+        sessions[session_id] = None
+        if self.max_sessions > 0 and len(sessions) > self.max_sessions:
+            del sessions[next(iter(sessions))]
+
+    def lookup(self, value: str) -> Optional[Dict[str, Any]]:
+        """Everything known about one artifact, or None. value is normalized first."""
+        value = normalize(value)
+        with self._lock:
+            entry = self.entries.get(value)
+            return entry.to_dict(value) if entry is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions
+            }
+
+artifact_index = ArtifactIndex()
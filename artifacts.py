@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Artifact kinds, and the intelligence category each one is recorded under
+UPI = "upi"
+EMAIL = "email"
+MOBILE = "mobile"
+LANDLINE = "landline"
+INTERNATIONAL = "international"
+ACCOUNT = "account"
+URL = "url"
+
+KIND_CATEGORY: Dict[str, str] = {
+    UPI: "upi_ids",
+    EMAIL: "emails",
+    MOBILE: "phone_numbers",
+    LANDLINE: "phone_numbers",
+    INTERNATIONAL: "phone_numbers",
+    ACCOUNT: "bank_accounts",
+    URL: "urls",
+}
+
+# Every branch starts with a character set ('h', '@', '+' or a digit), so the
+# regex engine skips ahead to the next candidate in C instead of trying each
+# branch at every position. Handles are matched from their '@' and the user
+# part is recovered by walking back, which is rare and cheap. A landline
+# written with its STD code set apart ("022-12345678", "080 12345678") is
+# matched as such first: without the separator, 080... reads as a mobile.
+# An international number may be written in groups ("+44 20 7946 0958",
+# "+1-202-555-0123"): a country code and up to five groups of at most four
+# digits, each after one space or dash. Longer groups, brackets around an
+# area code ("+1 (202) ...") or dots as separators are not recognised, and a
+# short number written right after one may be read as its last group.
+_CANDIDATE_RE = re.compile(
+    r"[hH][tT][tT][pP][sS]?://[^\s<>\"']+"
+    r"|@[A-Za-z0-9.-]+"
+    r"|(?=[+\d])(?<![\w+])(?:(?P<landline>0\d{2}[-\s]\d{8}|0\d{3}[-\s]\d{7}|0\d{4}[-\s]\d{6})"
+    r"|\+?(?:(?:91|0)[-\s]?)?[6-9]\d{4}[-\s]?\d{5}|\+\d{1,3}(?:[-\s]\d{1,4}){2,5}|\+?\d{8,18})(?!\w)"
+)
+_LOCAL_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._-")
+_SEPARATOR_RE = re.compile(r"[-\s]")
+_EMAIL_DOMAIN_RE = re.compile(r"[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}")
+
+@dataclass(slots=True)
+class Artifact:
+    """One classified span of a message: text[start:end], normalized to value."""
+
+    kind: str
+    value: str
+    start: int
+    end: int
+
+    @property
+    def category(self) -> str:
+        return KIND_CATEGORY[self.kind]
+
+def _classify_number(digits: str, plus: bool) -> Optional[str]:
+    """Kind of a digit run (separators removed, without its '+'), or None to skip it."""
+    length = len(digits)
+    indian_mobile = (
+        (length == 10 and digits[0] in "6789") or
+        (length == 12 and digits.startswith("91") and digits[2] in "6789") or
+        (length == 11 and not plus and digits[0] == "0" and digits[1] in "6789")
+    )
+    if indian_mobile:
+        return MOBILE
+    if plus:
+        return INTERNATIONAL if 8 <= length <= 15 else None
+    if length == 11 and digits[0] == "0":
+        return LANDLINE
+    if 10 <= length <= 18:
+        return ACCOUNT
+    return None
+
+def _trim_word_end(text: str, start: int, end: int) -> int:
+    """Pull end back to just after the last word character, as a trailing \\b would."""
+    while end > start and not (text[end - 1].isalnum() or text[end - 1] == "_"):
+        end -= 1
+    return end
+
+def scan_artifacts(text: str) -> List[Artifact]:
+    """
+    Walk text once and return every artifact in order of appearance.
+
+    Each candidate span is classified exactly once, so a digit run is either
+    a phone number or a bank account, never both, and the number in a UPI ID
+    such as 9876543210@ybl is not reported again as a phone number. Values
+    are normalized: separators are dropped from numbers (keeping a leading
+    '+'), Indian mobiles are written +91XXXXXXXXXX however they were given,
+    and UPI IDs and emails are lowercased.
+    """
+    artifacts: List[Artifact] = []
+    for match in _CANDIDATE_RE.finditer(text):
+        start, end = match.span()
+        first = text[start]
+
+        if first in "hH":
+            end = _trim_word_end(text, start, end)
+            artifacts.append(Artifact(URL, text[start:end], start, end))
+        elif first == "@":
+            at = start
+            while start > 0 and text[start - 1] in _LOCAL_CHARS:
+                start -= 1
+            while start < at and not text[start].isalnum():
+                start += 1
+            end = _trim_word_end(text, at + 1, end)
+            if start == at or end == at + 1:
+                continue
+            # A number scanned as part of the user name is not a phone number
+            while artifacts and artifacts[-1].start >= start:
+                artifacts.pop()
+            handle = text[start:end].lower()
+            kind = EMAIL if _EMAIL_DOMAIN_RE.fullmatch(handle[at - start + 1:]) else UPI
+            artifacts.append(Artifact(kind, handle, start, end))
+        else:
+            raw = _SEPARATOR_RE.sub("", match.group(0))
+            plus = raw.startswith("+")
+            kind = LANDLINE if match.lastgroup == "landline" else _classify_number(raw.lstrip("+"), plus)
+            if kind == MOBILE:
+                raw = "+91" + raw[-10:]
+            if kind is not None:
+                artifacts.append(Artifact(kind, raw, start, end))
+    return artifacts
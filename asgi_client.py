@@ -0,0 +1,187 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+class ASGIResponse:
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status_code = status
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in headers}
+        self.content = body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def ndjson(self) -> List[Any]:
+        return [json.loads(line) for line in self.content.splitlines() if line.strip()]
+
+class WebSocketClosed(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"WebSocket closed with code {code}")
+        self.code = code
+
+class ASGIWebSocket:
+    """The client end of an in-process WebSocket connection."""
+
+    def __init__(self) -> None:
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.close_code: Optional[int] = None
+
+    async def send_text(self, text: str) -> None:
+        await self.inbox.put({"type": "websocket.receive", "text": text})
+
+    async def send_json(self, data: Any) -> None:
+        await self.send_text(json.dumps(data))
+
+    async def receive_text(self) -> str:
+        """The next message from the app; raises WebSocketClosed once the app has closed the connection."""
+        if self.close_code is not None:
+            raise WebSocketClosed(self.close_code)
+        message = await self.outbox.get()
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            raise WebSocketClosed(self.close_code)
+        if message.get("text") is not None:
+            return message["text"]
+        return message.get("bytes", b"").decode("utf-8")
+
+    async def receive_json(self) -> Any:
+        return json.loads(await self.receive_text())
+
+class ASGIClient:
+    """
+    Drives an ASGI app in-process, without sockets, for tests and benchmarks.
+    Request bodies can be bytes, a JSON-serializable object, or an iterable of
+    byte chunks sent as a streamed body, each pulled when the app reads it.
+    websocket() opens a WebSocket connection the same way.
+    """
+
+    def __init__(self, app: Any, headers: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.headers = headers or {}
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Union[bytes, Iterable[bytes], Any] = b"",
+        headers: Optional[Dict[str, str]] = None,
+        json_body: bool = False
+    ) -> ASGIResponse:
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        if json_body:
+            body = json.dumps(body).encode("utf-8")
+            request_headers.setdefault("content-type", "application/json")
+        chunks = iter([body] if isinstance(body, bytes) else body)
+
+        scope = self._scope("http", path, request_headers)
+        scope["method"] = method.upper()
+
+        upcoming = next(chunks, None)
+        status = 500
+        response_headers: List[Tuple[bytes, bytes]] = []
+        response_body: List[bytes] = []
+        done = asyncio.Event()
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal upcoming
+            if upcoming is not None:
+                chunk, upcoming = upcoming, next(chunks, None)
+                return {"type": "http.request", "body": chunk, "more_body": upcoming is not None}
+            if not done.is_set():
+                await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return ASGIResponse(status, response_headers, b"".join(response_body))
+
+    def _scope(self, kind: str, path: str, headers: Dict[str, str]) -> Dict[str, Any]:
+        path, _, query = path.partition("?")
+        return {
+            "type": kind,
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "scheme": "http" if kind == "http" else "ws",
+            "path": path,
+            "raw_path": path.encode("latin-1"),
+            "query_string": query.encode("latin-1"),
+            "root_path": "",
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+
+    @asynccontextmanager
+    async def websocket(self, path: str, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[ASGIWebSocket]:
+        """
+        Open a WebSocket to the app for the duration of the block; the client
+        disconnects on leaving it. Raises WebSocketClosed if the app rejects
+        the handshake.
+        """
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        scope = self._scope("websocket", path, request_headers)
+        scope["subprotocols"] = []
+        socket = ASGIWebSocket()
+        await socket.inbox.put({"type": "websocket.connect"})
+        task = asyncio.create_task(self.app(scope, socket.inbox.get, socket.outbox.put))
+
+        message = await socket.outbox.get()
+        if message["type"] != "websocket.accept":
+            await task
+            raise WebSocketClosed(message.get("code", 1000))
+        try:
+            yield socket
+        finally:
+            if not task.done():
+                await socket.inbox.put({"type": "websocket.disconnect", "code": 1000})
+            await task
+
+    @asynccontextmanager
+    async def lifespan(self) -> AsyncIterator["ASGIClient"]:
+        """Run the app's startup before the block and its shutdown after it."""
+        inbox: asyncio.Queue = asyncio.Queue()
+        outbox: asyncio.Queue = asyncio.Queue()
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        task = asyncio.create_task(self.app(scope, inbox.get, outbox.put))
+
+        await inbox.put({"type": "lifespan.startup"})
+        message = await outbox.get()
+        if message["type"] != "lifespan.startup.complete":
+            await task
+            raise RuntimeError(f"Startup failed: {message.get('message', message['type'])}")
+        try:
+            yield self
+        finally:
+            await inbox.put({"type": "lifespan.shutdown"})
+            message = await outbox.get()
+            await task
+            if message["type"] != "lifespan.shutdown.complete":
+                raise RuntimeError(f"Shutdown failed: {message.get('message', message['type'])}")
+
+    async def get(self, path: str, **kwargs: Any) -> ASGIResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, body: Any = b"", **kwargs: Any) -> ASGIResponse:
+        return await self.request("POST", path, body, **kwargs)
+
+def run(coroutine: Any) -> Any:
+    """Run one client coroutine to completion from synchronous code."""
+    return asyncio.run(coroutine)
@@ -0,0 +1,133 @@
+import codecs
+import json
+from typing import Any, Dict, Iterable, List
+
+class BatchError(ValueError):
+    """An item of a batch body that could not be decoded."""
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+class BatchDecoder:
+    """
+    Incrementally decodes a batch body, either a JSON array or NDJSON (one
+    JSON value per line), so items can be scored while the body is still
+    arriving. The format is picked from the first non-whitespace character.
+
+    feed() and close() return the items completed so far. A malformed NDJSON
+    line becomes a BatchError item and decoding carries on; a malformed array
+    ends the batch with one BatchError.
+    """
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._format = None
+        self._line = 0
+        self._need_comma = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        if self._done:
+            return []
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        if self._done:
+            return []
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b"", final=True)
+        self._pos = 0
+        items = self._drain(final=True)
+        self._done = True
+        return items
+
+    def _drain(self, final: bool) -> List[Any]:
+        if self._format is None:
+            stripped = self._buffer.lstrip(_WHITESPACE)
+            if not stripped:
+                return []
+            if stripped[0] == "[":
+                self._format = "array"
+                self._pos = len(self._buffer) - len(stripped) + 1
+            else:
+                self._format = "ndjson"
+        if self._format == "array":
+            return self._drain_array(final)
+        return self._drain_lines(final)
+
+    def _drain_lines(self, final: bool) -> List[Any]:
+        items = []
+        buffer = self._buffer
+        while True:
+            end = buffer.find("\n", self._pos)
+            if end < 0:
+                if not final:
+                    break
+                end = len(buffer)
+            line = buffer[self._pos:end].strip()
+            self._pos = end + 1
+            self._line += 1
+            if line:
+                try:
+                    items.append(json.loads(line))
+                except ValueError as e:
+                    items.append(BatchError(f"line {self._line}: {e}"))
+            if self._pos >= len(buffer):
+                break
+        return items
+
+    def _drain_array(self, final: bool) -> List[Any]:
+        items = []
+        buffer = self._buffer
+        while not self._done:
+            pos = self._skip(buffer, self._pos)
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._pos = pos + 1
+                self._done = True
+                break
+            if self._need_comma:
+                if buffer[pos] != ",":
+                    items.append(BatchError(f"item {self._line + 1}: expected ',' or ']' at offset {pos}"))
+                    self._done = True
+                    break
+                self._need_comma = False
+                self._pos = pos + 1
+                continue
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except ValueError as e:
+                if final:
+                    items.append(BatchError(f"item {self._line + 1}: {e}"))
+                    self._done = True
+                break
+            # A bare number or literal running to the end of the buffer may still be growing
+            if end >= len(buffer) and not final and not isinstance(item, (dict, list, str)):
+                break
+            items.append(item)
+            self._line += 1
+            self._need_comma = True
+            self._pos = end
+        if final and not self._done:
+            items.append(BatchError("unterminated JSON array"))
+            self._done = True
+        return items
+
+    @staticmethod
+    def _skip(buffer: str, pos: int) -> int:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+def decode_batch(body: bytes) -> List[Any]:
+    """Decode a complete batch body."""
+    decoder = BatchDecoder()
+    return decoder.feed(body) + decoder.close()
+
+def encode_results(results: Iterable[Dict[str, Any]]) -> bytes:
+    """Encode results as NDJSON."""
+    return "".join(json.dumps(result) + "\n" for result in results).encode("utf-8")
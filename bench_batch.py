@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare bulk scoring through POST /honeypot/batch with one POST
+/honeypot/message per message. Both run in-process through the ASGI app, so
+the numbers measure per-request framework overhead, not the network.
+
+Usage: python bench_batch.py [--messages N]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from asgi_client import ASGIClient
+from handler import score_messages
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+
+def corpus(count):
+    texts = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    texts += [test["message"] for test in EDGE_CASES]
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+async def single(client, texts):
+    timestamp = datetime(2024, 1, 1).isoformat()
+    for i, text in enumerate(texts):
+        body = {
+            "sessionId": f"bench-{i}",
+            "message": {"sender": "scammer", "text": text, "timestamp": timestamp},
+            "conversationHistory": [],
+            "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+        }
+        response = await client.post("/honeypot/message", body, json_body=True)
+        assert response.status_code == 200
+
+
+async def batch(client, body, content_type):
+    response = await client.post("/honeypot/batch", body, headers={"content-type": content_type})
+    assert response.status_code == 200
+    return response
+
+
+def timed(label, count, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:>8.2f}s {count / elapsed:>12,.0f} msg/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    texts = corpus(args.messages)
+    client = ASGIClient(app)
+    array_body = json.dumps([{"id": i, "text": text} for i, text in enumerate(texts)]).encode()
+    ndjson_body = "".join(json.dumps({"id": i, "text": text}) + "\n" for i, text in enumerate(texts)).encode()
+    # Sent in 64 KiB chunks, as a server would hand them over
+    ndjson_chunks = [ndjson_body[offset:offset + 65536] for offset in range(0, len(ndjson_body), 65536)]
+
+    print(f"{'path':<34} {'time':>9} {'throughput':>16}")
+    single_s = timed("POST /honeypot/message x N", len(texts), lambda: asyncio.run(single(client, texts)))
+    array_s = timed("POST /honeypot/batch (JSON array)", len(texts),
+                    lambda: asyncio.run(batch(client, array_body, "application/json")))
+    timed("POST /honeypot/batch (NDJSON)", len(texts),
+          lambda: asyncio.run(batch(client, ndjson_chunks, "application/x-ndjson")))
+    timed("handler.score_messages", len(texts), lambda: sum(1 for _ in score_messages(texts)))
+    print(f"\nbatch endpoint speedup over single endpoint: {single_s / array_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rescoring throughput at archive scale: detect_scam in a loop against the
+vectorized BatchScorer, over synthetic messages built from the test_data
+corpus. Each message gets a reference number so texts are unique unless
+--duplicates is given. Checks that both agree exactly on every message.
+
+Usage: python bench_batch_scoring.py [--messages 1000000] [--duplicates]
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import detect_scam
+from scoring import BatchScorer
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+
+def build_messages(count, duplicates):
+    texts = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    texts += [test["message"] for test in EDGE_CASES]
+    if duplicates:
+        return [texts[i % len(texts)] for i in range(count)]
+    return [f"{texts[i % len(texts)]} Ref #{i}" for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--duplicates", action="store_true", help="reuse corpus texts verbatim")
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, args.duplicates)
+
+    start = time.perf_counter()
+    expected = [detect_scam(text, []) for text in messages]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = BatchScorer().score(messages)
+    batch_s = time.perf_counter() - start
+
+    mismatches = sum(
+        1 for i, result in enumerate(expected)
+        if scores.confidence[i] != result.confidence or bool(scores.scam_detected[i]) != result.scamDetected
+    )
+    print(f"messages:            {len(messages):,}{' (duplicated texts)' if args.duplicates else ''}")
+    print(f"detect_scam loop:    {loop_s:8.2f}s {len(messages) / loop_s:>12,.0f} msg/s")
+    print(f"BatchScorer.score:   {batch_s:8.2f}s {len(messages) / batch_s:>12,.0f} msg/s")
+    print(f"speedup:             {loop_s / batch_s:8.1f}x")
+    print(f"mismatches:          {mismatches}")
+    print(f"flagged as scam:     {int(scores.scam_detected.sum()):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark final-callback throughput against a local stub HTTP server:
+a fresh requests.post per callback (the previous behaviour) versus the
+pooled CallbackManager, sequentially and through the dispatcher's
+concurrent workers.
+
+Usage: python bench_callbacks.py [--callbacks N] [--latency SECONDS]
+"""
+
+import argparse
+import sys
+import os
+import time
+import requests
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from callback import CallbackManager
+from dispatcher import CallbackDispatcher
+from models import SessionState
+from stub_callback_server import StubCallbackServer
+
+
+def make_state():
+    return SessionState(
+        conversation_history=[],
+        scam_detected=True,
+        total_message_count=15,
+        extracted_intelligence={"upi_ids": ["scammer@upi"], "phone_numbers": ["+919876543210"]},
+        consecutive_no_new_intel=3
+    )
+
+
+def run(label, stub, callbacks, send):
+    # A session sends its callback once: every mode gets sessions of its own
+    states = [make_state() for _ in range(callbacks)]
+    connections_before = stub.connections
+    requests_before = stub.count
+    start = time.perf_counter()
+    send(states)
+    elapsed = time.perf_counter() - start
+    assert stub.count - requests_before == callbacks, f"{label}: {stub.count - requests_before} callbacks delivered"
+    print(f"{label:<28} {callbacks / elapsed:10.1f} callbacks/s  ({stub.connections - connections_before} connections)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callbacks", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated endpoint latency per request")
+    args = parser.parse_args()
+
+    stub = StubCallbackServer(delay=args.latency)
+
+    def unpooled(states):
+        builder = CallbackManager(url=stub.url)
+        for i, state in enumerate(states):
+            payload = builder.build_payload(f"fresh-{i}", state).model_dump()
+            requests.post(stub.url, json=payload, timeout=10).raise_for_status()
+
+    def pooled(states):
+        manager = CallbackManager(url=stub.url)
+        for i, state in enumerate(states):
+            manager.send_final_callback(f"pooled-{i}", state)
+
+    def dispatched(states):
+        dispatcher = CallbackDispatcher(manager=CallbackManager(url=stub.url, pool_size=16), workers=16)
+        for i, state in enumerate(states):
+            dispatcher.submit(f"dispatched-{i}", state)
+        dispatcher.join()
+        dispatcher.stop()
+
+    print(f"{args.callbacks} callbacks, simulated endpoint latency {args.latency * 1000:.0f} ms")
+    run("requests.post per callback", stub, args.callbacks, unpooled)
+    run("pooled session", stub, args.callbacks, pooled)
+    run("pooled + dispatcher (16)", stub, args.callbacks, dispatched)
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
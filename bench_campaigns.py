@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Stream a large corpus of template variants through the campaign index.
+Each template is sent with a different name, amount, UPI ID and phone
+number every time, and occasionally one word swapped; the rest of the
+corpus is unique noise. Reports assignment latency, how many campaigns
+each template was split into, cluster purity, and the index's memory.
+Then replays part of the corpus through handle_message() with and
+without the campaign fast path.
+
+Usage: python bench_campaigns.py [--messages N] [--templates N] [--unique 0.1] [--replay N]
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from campaigns import CampaignIndex
+from detection_cache import DetectionCache
+from handler import HoneypotHandler
+from models import HoneypotRequest
+from sessions import SessionStore
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+NAMES = ["Ravi", "Priya", "Amit", "Sunita", "Rahul", "Anjali", "Vikram", "Neha", "Suresh", "Kavita"]
+SWAPS = {"urgent": "immediately", "blocked": "suspended", "account": "a/c", "today": "now", "call": "contact"}
+WORDS = ("market tuesday garden river window coffee ticket monday cricket school music doctor "
+         "travel weather kitchen office family movie dinner holiday train paper season").split()
+
+
+def build_corpus(count, templates, unique, rng):
+    """(text, template index or None) pairs."""
+    samples = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    samples += [test["message"] for test in EDGE_CASES]
+    samples = [sample for sample in samples if len(sample.split()) >= 8]
+    samples = sorted(set(samples))
+    # One template per distinct sample text, so template labels are distinguishable
+    bases = [f"Dear {{name}}, {sample} Pay Rs {{amount}} to {{upi}} or call {{phone}}."
+             for sample in rng.sample(samples, min(templates, len(samples)))]
+    templates = len(bases)
+    corpus = []
+    for _ in range(count):
+        if rng.random() < unique:
+            corpus.append((" ".join(rng.choice(WORDS) for _ in range(12)) + f" {rng.randrange(10 ** 6)}", None))
+            continue
+        label = rng.randrange(templates)
+        text = bases[label].format(name=rng.choice(NAMES), amount=rng.randrange(100, 100000),
+                                   upi=f"{rng.choice(NAMES).lower()}{rng.randrange(1000)}@ybl",
+                                   phone=f"9{rng.randrange(10 ** 9):09d}")
+        if rng.random() < 0.3:
+            word = rng.choice(list(SWAPS))
+            text = text.replace(word, SWAPS[word], 1)
+        corpus.append((text, label))
+    return corpus
+
+
+def stream(corpus, max_campaigns):
+    index = CampaignIndex(max_campaigns=max_campaigns)
+    members = defaultdict(Counter)
+    start = time.perf_counter()
+    assigned = [index.assign(text) for text, _ in corpus]
+    elapsed = time.perf_counter() - start
+    for (_, label), campaign in zip(corpus, assigned):
+        if label is not None and campaign is not None:
+            members[campaign.id][label] += 1
+    return index, members, elapsed / len(corpus) * 1e6
+
+
+def index_memory(corpus, max_campaigns):
+    tracemalloc.start()
+    index = CampaignIndex(max_campaigns=max_campaigns)
+    for text, _ in corpus:
+        index.assign(text)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def replay(corpus, fast_path):
+    handler = HoneypotHandler(campaign_fast_path=fast_path,
+                              session_store=SessionStore(max_sessions=len(corpus), idle_ttl=0),
+                              detection_cache=DetectionCache(), campaigns=CampaignIndex())
+    requests = [
+        HoneypotRequest(sessionId=f"target-{i}",
+                        message={"sender": "scammer", "text": text, "timestamp": "2024-01-01T10:00:00Z"},
+                        metadata=METADATA)
+        for i, (text, _) in enumerate(corpus)
+    ]
+    start = time.perf_counter()
+    scams = sum(handler.handle_message(request)["scamDetected"] for request in requests)
+    return (time.perf_counter() - start) / len(requests) * 1e6, scams
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--templates", type=int, default=40)
+    parser.add_argument("--unique", type=float, default=0.1)
+    parser.add_argument("--max-campaigns", type=int, default=50000)
+    parser.add_argument("--replay", type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.templates, args.unique, random.Random(42))
+    args.templates = len({label for _, label in corpus if label is not None})
+    index, members, assign_us = stream(corpus, args.max_campaigns)
+    stats = index.stats()
+    labelled = sum(sum(counts.values()) for counts in members.values())
+    purity = sum(max(counts.values()) for counts in members.values()) / labelled
+    splits = Counter(counts.most_common(1)[0][0] for counts in members.values() if sum(counts.values()) > 1)
+
+    print(f"messages:          {args.messages:,} ({args.templates} templates, {args.unique:.0%} unique)")
+    print(f"assign():          {assign_us:8.2f} us/message")
+    print(f"campaigns kept:    {stats['campaigns']:,} of at most {stats['max_campaigns']:,} "
+          f"({stats['evictions']:,} evicted)")
+    print(f"campaigns/template:{sum(splits.values()) / max(len(splits), 1):8.2f} (campaigns of 2+ messages)")
+    print(f"purity:            {purity:8.2%}")
+    print(f"index memory:      {index_memory(corpus, args.max_campaigns) / 2 ** 20:8.1f} MiB")
+
+    sample = corpus[:args.replay]
+    without_us, without_scams = replay(sample, fast_path=False)
+    with_us, with_scams = replay(sample, fast_path=True)
+    print(f"handle_message() over {len(sample):,} sessions:")
+    print(f"  fast path off    {without_us:8.1f} us/message ({without_scams:,} scam sessions)")
+    print(f"  fast path on     {with_us:8.1f} us/message ({with_scams:,} scam sessions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Request-parse and response-encode cost of the default Pydantic/JSON path
+against the opt-in fast codec, as conversationHistory grows. Also times the
+callback payload build+encode and one full /honeypot/message round trip
+through each app in-process.
+
+Final callbacks go to a local stub server.
+
+Usage: python bench_codec.py [--history 0,15,100,1000] [--rounds N]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+import warnings
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+
+import codec
+from models import HoneypotRequest
+from records import SessionRecord
+from callback import CallbackManager, callback_manager
+from dispatcher import callback_dispatcher
+from stub_callback_server import StubCallbackServer
+from handler import HoneypotHandler
+from sessions import SessionStore
+from server import create_app
+from asgi_client import ASGIClient
+
+warnings.simplefilter("ignore", DeprecationWarning)
+
+
+def make_body(turns):
+    timestamp = "2024-01-01T10:00:00Z"
+    return json.dumps({
+        "sessionId": "bench-codec",
+        "message": {"sender": "scammer", "text": "URGENT: your account will be blocked, pay to fraud@ybl", "timestamp": timestamp},
+        "conversationHistory": [
+            {"sender": "scammer" if i % 2 == 0 else "user",
+             "text": f"Turn {i}: please verify your KYC details and pay the processing fee today", "timestamp": timestamp}
+            for i in range(turns)
+        ],
+        "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+    }).encode()
+
+
+def per_call_us(fn, rounds):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def app_round_trip_us(fast_codec, body, rounds):
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=rounds + 10, idle_ttl=0))
+    client = ASGIClient(create_app(handler, warmup=False, fast_codec=fast_codec))
+    headers = {"content-type": "application/json"}
+
+    async def loop():
+        await client.post("/honeypot/message", body, headers=headers)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await client.post("/honeypot/message", body, headers=headers)
+        return (time.perf_counter() - start) / rounds * 1e6
+
+    return asyncio.run(loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", default="0,15,100,1000")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Sessions here run past the stop condition; keep their callbacks local
+    stub = StubCallbackServer()
+    callback_manager.url = stub.url
+
+    print(f"codec backend: {'orjson' if codec.orjson else 'json (orjson not installed)'}\n")
+    print(f"{'history':>8} {'bytes':>9} {'pydantic parse us':>18} {'fast parse us':>14} {'speedup':>8} "
+          f"{'app default us':>15} {'app fast us':>12}")
+    for turns in (int(t) for t in args.history.split(",")):
+        body = make_body(turns)
+        rounds = max(20, args.rounds // max(1, turns // 15))
+        slow = per_call_us(lambda: HoneypotRequest(**json.loads(body)), rounds)
+        fast = per_call_us(lambda: codec.parse_request(body), rounds)
+        app_slow = app_round_trip_us(False, body, max(20, rounds // 4))
+        app_fast = app_round_trip_us(True, body, max(20, rounds // 4))
+        print(f"{turns:>8} {len(body):>9} {slow:>18.1f} {fast:>14.1f} {slow / fast:>7.1f}x {app_slow:>15.1f} {app_fast:>12.1f}")
+
+    result = {"reply": "I need to understand this better before proceeding with any payment.", "scamDetected": True, "sessionId": "bench-codec"}
+    slow = per_call_us(lambda: json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")).encode(), args.rounds * 5)
+    fast = per_call_us(lambda: codec.encode_response(result), args.rounds * 5)
+    print(f"\nresponse encode: default {slow:.2f} us, pre-encoded {fast:.2f} us ({slow / fast:.1f}x)")
+
+    record = SessionRecord(scam_detected=True, total_message_count=15,
+                           extracted_intelligence={"upi_ids": ["fraud@ybl"], "phone_numbers": ["+919876543210"],
+                                                   "suspicious_keywords": ["urgent", "verify", "blocked"]})
+    slow_manager = CallbackManager(url="http://127.0.0.1:9", fast_codec=False)
+    fast_manager = CallbackManager(url="http://127.0.0.1:9", fast_codec=True)
+    slow = per_call_us(lambda: json.dumps(slow_manager.payload_dict("s", record)).encode(), args.rounds * 5)
+    fast = per_call_us(lambda: codec.dumps(fast_manager.payload_dict("s", record)), args.rounds * 5)
+    print(f"callback build+encode: model .dict() {slow:.2f} us, fast {fast:.2f} us ({slow / fast:.1f}x)")
+    callback_dispatcher.stop()
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: launch `uvicorn app:app` in a fresh process and time
+process start to first successful /honeypot/message response, with the
+startup warm-up on and off (WARMUP=0). Reports medians over several runs.
+
+Usage: python bench_cold_start.py [--runs N]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+REQUEST = {
+    "sessionId": "cold-start",
+    "message": {"sender": "scammer", "text": "URGENT: your account will be blocked, pay the fee to verify@ybl", "timestamp": "2024-01-01T10:00:00Z"},
+    "conversationHistory": [],
+    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cold_start(warmup):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WARMUP="1" if warmup else "0")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env
+    )
+    http = requests.Session()
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                http.get(f"{url}/health", timeout=1)
+                break
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.002)
+        listening = time.perf_counter()
+
+        sent = time.perf_counter()
+        response = http.post(f"{url}/honeypot/message", json=REQUEST, timeout=30)
+        response.raise_for_status()
+        first = time.perf_counter()
+
+        sent_again = time.perf_counter()
+        http.post(f"{url}/honeypot/message", json=dict(REQUEST, sessionId="cold-start-2"), timeout=30).raise_for_status()
+        second = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait(10)
+    return {
+        "listening_ms": (listening - started) * 1000,
+        "first_response_ms": (first - started) * 1000,
+        "first_request_ms": (first - sent) * 1000,
+        "second_request_ms": (second - sent_again) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'warm-up':<8} {'listening ms':>13} {'start->1st resp ms':>19} {'1st req ms':>11} {'2nd req ms':>11}")
+    for warmup in (False, True):
+        runs = [cold_start(warmup) for _ in range(args.runs)]
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{'on' if warmup else 'off':<8} {median['listening_ms']:>13.1f} {median['first_response_ms']:>19.1f} "
+              f"{median['first_request_ms']:>11.2f} {median['second_request_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
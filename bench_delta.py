@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Ingress bytes and server time for 15-turn sessions sent with the full
+conversationHistory on every turn versus delta mode (historySeq +
+historyDigest), through the ASGI app in-process with and without the fast
+codec. Final callbacks go to a local stub server.
+
+Usage: python bench_delta.py [--sessions N] [--turns N]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import HoneypotHandler
+from sessions import SessionStore
+from server import create_app
+from asgi_client import ASGIClient
+from callback import callback_manager
+from dispatcher import callback_dispatcher
+from stub_callback_server import StubCallbackServer
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+
+
+def corpus():
+    texts = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    return texts + [test["message"] for test in EDGE_CASES]
+
+
+async def run_sessions(client, sessions, turns, texts, delta):
+    headers = {"content-type": "application/json"}
+    sent = 0
+    elapsed = 0.0
+    for s in range(sessions):
+        history = []
+        previous = None
+        for turn in range(turns):
+            text = texts[(s + turn) % len(texts)]
+            body = {
+                "sessionId": f"{'delta' if delta else 'full'}-{s}",
+                "message": {"sender": "scammer", "text": text, "timestamp": f"2024-01-01T10:{turn:02d}:00Z"},
+                "metadata": METADATA
+            }
+            if delta and previous:
+                body["historySeq"] = previous["historySeq"]
+                body["historyDigest"] = previous["historyDigest"]
+            else:
+                body["conversationHistory"] = history
+            payload = json.dumps(body).encode()
+            sent += len(payload)
+
+            start = time.perf_counter()
+            response = await client.post("/honeypot/message", payload, headers=headers)
+            elapsed += time.perf_counter() - start
+            assert response.status_code == 200, response.text
+            previous = response.json()
+            history = history + [
+                {"sender": "scammer", "text": text, "timestamp": body["message"]["timestamp"]},
+                {"sender": "user", "text": previous["reply"], "timestamp": body["message"]["timestamp"]}
+            ]
+    return sent, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=15)
+    args = parser.parse_args()
+
+    stub = StubCallbackServer()
+    callback_manager.url = stub.url
+    texts = corpus()
+
+    print(f"{'codec':<8} {'mode':<6} {'KB in/session':>14} {'ms/session':>11}")
+    for fast_codec in (False, True):
+        for delta in (False, True):
+            handler = HoneypotHandler(session_store=SessionStore(max_sessions=args.sessions * 2, idle_ttl=0))
+            client = ASGIClient(create_app(handler, warmup=False, fast_codec=fast_codec))
+            sent, elapsed = asyncio.run(run_sessions(client, args.sessions, args.turns, texts, delta))
+            print(f"{'fast' if fast_codec else 'default':<8} {'delta' if delta else 'full':<6} "
+                  f"{sent / args.sessions / 1024:>14.1f} {elapsed / args.sessions * 1000:>11.2f}")
+
+    callback_dispatcher.stop()
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
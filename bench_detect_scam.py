@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for detect_scam(): per-message latency of the precompiled
+single-pass signal matcher versus the previous pattern-by-pattern re.search loop.
+
+Usage: python bench_detect_scam.py [--rounds N]
+"""
+
+import argparse
+import re
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import detect_scam
+from models import ScamDetectionResult
+from rules import rule_registry
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+
+def legacy_detect_scam(message: str, history: list) -> ScamDetectionResult:
+    """The previous detect_scam(): one re.search per pattern on every call."""
+    message_lower = message.lower()
+    detected_signals = []
+    confidence = 0.0
+    for label, weight, patterns, first_only in rule_registry.current.signal_categories:
+        for pattern in list(patterns):
+            if re.search(pattern, message_lower):
+                detected_signals.append(f"{label}: {pattern}")
+                confidence += weight
+                if first_only:
+                    break
+    confidence = min(confidence, 1.0)
+    return ScamDetectionResult(
+        scamDetected=confidence >= 0.40,
+        confidence=confidence,
+        reasons=detected_signals if detected_signals else ["No scam indicators detected"]
+    )
+
+
+def load_messages():
+    messages = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    messages += [test["message"] for test in EDGE_CASES]
+    # A long pasted message exercises the scan cost rather than call overhead
+    messages.append(" ".join(messages))
+    return messages
+
+
+def time_per_message(func, messages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            func(message, [])
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    messages = load_messages()
+    for message in messages:
+        assert detect_scam(message, []) == legacy_detect_scam(message, []), message
+
+    legacy_us = time_per_message(legacy_detect_scam, messages, args.rounds)
+    compiled_us = time_per_message(detect_scam, messages, args.rounds)
+
+    print(f"Messages per round: {len(messages)}, rounds: {args.rounds}")
+    print(f"re.search per pattern : {legacy_us:8.2f} us/message")
+    print(f"precompiled matcher   : {compiled_us:8.2f} us/message")
+    print(f"Speedup: {legacy_us / compiled_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
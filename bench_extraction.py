@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass artifact scanner against the previous extraction,
+which ran a UPI regex, an account regex, five phone regexes and a URL regex
+over every message. Messages are long pastes built from the test scenarios.
+
+Usage: python bench_extraction.py [--sizes 1000,10000,100000] [--rounds N]
+"""
+
+import argparse
+import random
+import re
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from artifacts import scan_artifacts
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+FILLER = [
+    "Dear customer,", "as per RBI guidelines", "please note that", "your KYC is pending",
+    "call our helpline", "ref no", "transaction id", "on 12/03/2024", "amount Rs 4999",
+    "pay to", "or visit", "account", "immediately", "thank you", "regards, support team",
+]
+
+
+def legacy_scan(text):
+    """The artifact part of the previous extract_intelligence(): nine regex scans."""
+    found = {"upi_ids": [], "bank_accounts": [], "phone_numbers": [], "urls": []}
+    found["upi_ids"] = re.findall(r'\b[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\b', text)
+    for account in re.findall(r'\b\d{10,18}\b', text):
+        if not (len(account) == 10 and account.startswith(('6', '7', '8', '9'))):
+            found["bank_accounts"].append(account)
+    for pattern in [r'\b[+]?91[-\s]?[6-9]\d{9}\b', r'\b[6-9]\d{9}\b', r'\b0[-\s]?[6-9]\d{9}\b',
+                    r'\b\d{10}\b', r'\b[+]?\d{11,15}\b']:
+        for phone in re.findall(pattern, text):
+            found["phone_numbers"].append(re.sub(r'[^0-9+]', '', phone))
+    found["urls"] = re.findall(r'\bhttps?://[^\s<>"\']+(?:/[^\s<>"\']*)*\b', text, re.IGNORECASE)
+    return found
+
+
+def long_message(size, rng):
+    """About `size` characters of scam text mixed with filler and artifacts."""
+    samples = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    samples += [test["message"] for test in EDGE_CASES]
+    parts, length = [], 0
+    while length < size:
+        part = rng.choice(samples) if rng.random() < 0.3 else rng.choice(FILLER)
+        if rng.random() < 0.05:
+            part += f" {rng.choice('6789')}{rng.randrange(10 ** 9):09d}"
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'chars':>8} {'legacy us':>12} {'single-pass us':>15} {'speedup':>8} {'MB/s':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        texts = [long_message(size, rng) for _ in range(10)]
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in texts:
+                legacy_scan(text)
+        legacy_us = (time.perf_counter() - start) / (args.rounds * len(texts)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in texts:
+                scan_artifacts(text)
+        single_us = (time.perf_counter() - start) / (args.rounds * len(texts)) * 1e6
+
+        chars = sum(len(text) for text in texts) / len(texts)
+        print(f"{size:>8} {legacy_us:>12.1f} {single_us:>15.1f} {legacy_us / single_us:>7.1f}x "
+              f"{chars / single_us:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
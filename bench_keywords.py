@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared keyword index against per-keyword substring checks as
+the keyword lists grow. Each list is padded with synthetic analyst keywords.
+
+Usage: python bench_keywords.py [--sizes 30,300,1000,5000] [--rounds N]
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from keywords import KeywordIndex
+from rules import rule_registry
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+
+def scaled_keyword_sets(size, rng):
+    """Pad every keyword set to `size` entries with random 1-3 word phrases."""
+    syllables = ["ka", "ro", "mi", "tan", "vel", "shu", "pra", "dex", "lo", "gan", "ti", "bor"]
+    scaled = {}
+    for name, keywords in rule_registry.current.keyword_sets.items():
+        padded = list(keywords)
+        while len(padded) < size:
+            words = ["".join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+            padded.append(" ".join(words))
+        scaled[name] = padded
+    return scaled
+
+
+def substring_scan(keyword_sets, text):
+    return {name: [keyword for keyword in keywords if keyword in text]
+            for name, keywords in keyword_sets.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="30,300,1000,5000")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    messages = [test["message"].lower() for tests in TEST_SCENARIOS.values() for test in tests]
+    messages += [test["message"].lower() for test in EDGE_CASES]
+
+    print(f"{'keywords/set':>12} {'substring us/msg':>18} {'index us/msg':>14} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        keyword_sets = scaled_keyword_sets(size, rng)
+        index = KeywordIndex(keyword_sets)
+        for text in messages:
+            assert index.scan(text) == substring_scan(keyword_sets, text)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in messages:
+                substring_scan(keyword_sets, text)
+        substring_us = (time.perf_counter() - start) / (args.rounds * len(messages)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for text in messages:
+                index.scan(text)
+        index_us = (time.perf_counter() - start) / (args.rounds * len(messages)) * 1e6
+
+        print(f"{size:>12} {substring_us:>18.2f} {index_us:>14.2f} {substring_us / index_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Overhead of the pipeline metrics. Times the individual recording calls,
+the exact set of calls one scam request makes, and handle_message() with
+metrics enabled against disabled.
+
+Usage: python bench_metrics.py [--rounds N] [--requests N]
+"""
+
+import argparse
+import gc
+import sys
+import os
+import time
+from time import perf_counter
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import Metrics
+from handler import HoneypotHandler
+from models import HoneypotRequest
+from sessions import SessionStore
+
+TEXT = "URGENT: your SBI account will be blocked today. Pay the fee to verify@ybl"
+
+
+def per_call_ns(fn, rounds):
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e9
+
+
+def one_request(metrics):
+    """The recording calls handle_message() makes for a scam message."""
+    metrics.inc("requests_total")
+    start = perf_counter()
+    stages = [("session", perf_counter() - start)]
+    mark = perf_counter()
+    stages.append(("detect", perf_counter() - mark))
+    mark = perf_counter()
+    stages.append(("extract", perf_counter() - mark))
+    mark = perf_counter()
+    now = perf_counter()
+    stages.append(("reply", now - mark))
+    mark, now = now, perf_counter()
+    stages.append(("store", now - mark))
+    stages.append(("total", now - start))
+    metrics.record(stages, ("scam_replies_total",))
+
+
+def handler_us(metrics, requests):
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=len(requests), idle_ttl=0), metrics=metrics)
+    # Garbage left by the previous run is not charged to this one
+    gc.collect()
+    start = time.perf_counter()
+    for request in requests:
+        handler.handle_message(request)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    enabled, disabled = Metrics(), Metrics(enabled=False)
+    print("Per call:")
+    print(f"  perf_counter()     {per_call_ns(perf_counter, args.rounds):8.0f} ns")
+    print(f"  inc()              {per_call_ns(lambda: enabled.inc('requests_total'), args.rounds):8.0f} ns")
+    print(f"  observe()          {per_call_ns(lambda: enabled.observe('detect', 0.00004), args.rounds):8.0f} ns")
+    stages = [(stage, 0.00004) for stage in ("session", "detect", "extract", "reply", "store", "total")]
+    print(f"  record(6 stages)   {per_call_ns(lambda: enabled.record(stages, ('scam_replies_total',)), args.rounds):8.0f} ns")
+
+    with_metrics = per_call_ns(lambda: one_request(enabled), args.rounds) / 1000
+    without = per_call_ns(lambda: one_request(disabled), args.rounds) / 1000
+    print("Instrumentation of one scam request:")
+    print(f"  enabled            {with_metrics:8.2f} us")
+    print(f"  disabled           {without:8.2f} us")
+
+    requests = [
+        HoneypotRequest(
+            sessionId=f"bench-metrics-{i}",
+            message={"sender": "scammer", "text": TEXT, "timestamp": "2024-01-01T10:00:00Z"},
+            metadata={"channel": "SMS", "language": "English", "locale": "IN"}
+        )
+        for i in range(args.requests)
+    ]
+    results = {"enabled": [], "disabled": []}
+    for _ in range(5):
+        results["enabled"].append(handler_us(Metrics(), requests))
+        results["disabled"].append(handler_us(Metrics(enabled=False), requests))
+    best_enabled, best_disabled = min(results["enabled"]), min(results["disabled"])
+    print(f"handle_message() over {args.requests} sessions (best of 5):")
+    print(f"  metrics enabled    {best_enabled:8.2f} us/request")
+    print(f"  metrics disabled   {best_disabled:8.2f} us/request")
+    print(f"  difference         {best_enabled - best_disabled:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
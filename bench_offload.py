@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tail latency of /honeypot/message under mixed load, with message analysis
+on the event loop against offloaded to worker processes. Requests arrive
+open-loop (Poisson, at --rate per second) through the in-process ASGI
+client; a --long share of them are long pasted messages, the rest short
+corpus messages. Latency is measured from each request's scheduled arrival,
+so time spent queued behind a long message counts.
+
+Usage: python bench_offload.py [--requests 4000] [--rate 400] [--long 0.05] [--long-chars 50000] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from asgi_client import ASGIClient, run
+from campaigns import CampaignIndex
+from config import config
+from detection_cache import DetectionCache
+from handler import HoneypotHandler
+from server import create_app
+from sessions import SessionStore
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+
+
+def build_plan(requests, rate, long_share, long_chars, rng):
+    """(arrival offset in seconds, "short" or "long", request body) per request."""
+    samples = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    samples += [test["message"] for test in EDGE_CASES if test["message"].strip()]
+    plan = []
+    at = 0.0
+    for i in range(requests):
+        at += rng.expovariate(rate)
+        kind = "long" if rng.random() < long_share else "short"
+        if kind == "long":
+            text = ""
+            while len(text) < long_chars:
+                text += rng.choice(samples) + " "
+        else:
+            text = rng.choice(samples)
+        # A distinct reference number per message, so no request is answered from the detection cache
+        body = {
+            "sessionId": f"bench-{i}",
+            "message": {"sender": "scammer", "text": f"{text} Ref {i}", "timestamp": "2024-01-01T10:00:00Z"},
+            "conversationHistory": [],
+            "metadata": METADATA
+        }
+        plan.append((at, kind, json.dumps(body).encode("utf-8")))
+    return plan
+
+
+async def drive(plan, workers, max_lag_ms):
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=len(plan), idle_ttl=0),
+                              detection_cache=DetectionCache(), campaigns=CampaignIndex())
+    app = create_app(handler, warmup=True, offload_workers=workers)
+    client = ASGIClient(app, headers={"x-api-key": config.API_KEY or "", "content-type": "application/json"})
+    latencies = {"short": [], "long": []}
+
+    async with client.lifespan():
+        if app.state.offload is not None:
+            app.state.offload.max_lag = max_lag_ms / 1000
+        loop = asyncio.get_running_loop()
+        start = loop.time() + 0.2
+
+        async def send(at, kind, body):
+            await asyncio.sleep(max(start + at - loop.time(), 0))
+            response = await client.post("/honeypot/message", body)
+            assert response.status_code == 200, response.text
+            latencies[kind].append(loop.time() - start - at)
+
+        await asyncio.gather(*(send(*item) for item in plan))
+        offloaded = app.state.offload.offloaded if app.state.offload is not None else 0
+    return latencies, offloaded
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000 if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--rate", type=float, default=400)
+    parser.add_argument("--long", type=float, default=0.05)
+    parser.add_argument("--long-chars", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-lag-ms", type=float, default=config.OFFLOAD_MAX_LAG_MS)
+    args = parser.parse_args()
+
+    plan = build_plan(args.requests, args.rate, args.long, args.long_chars, random.Random(42))
+    longs = sum(kind == "long" for _, kind, _ in plan)
+    print(f"{len(plan):,} requests at {args.rate:g}/s, {longs:,} long ({args.long_chars:,} chars), "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'':<16}{'short p50':>10}{'p99':>9}{'p99.9':>9}{'long p50':>10}{'p99':>9}{'offloaded':>11}   (ms)")
+    for label, workers in (("inline", 0), (f"offload x{args.workers}", args.workers)):
+        latencies, offloaded = run(drive(plan, workers, args.max_lag_ms))
+        short, long = latencies["short"], latencies["long"]
+        print(f"{label:<16}{percentile(short, 0.5):10.2f}{percentile(short, 0.99):9.2f}"
+              f"{percentile(short, 0.999):9.2f}{percentile(long, 0.5):10.2f}{percentile(long, 0.99):9.2f}"
+              f"{offloaded:11,}")
+
+
+if __name__ == "__main__":
+    main()
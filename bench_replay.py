@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark: synthesizes multi-turn sessions from the test_data corpora
+(and any JSONL captures) and drives them through HoneypotHandler in-process
+and through the ASGI app. Prints one JSON document with p50/p95/p99 latency,
+throughput and peak RSS per mode, so runs can be diffed across commits.
+
+Captures are JSON lines; the message text is taken from message.text,
+message, text or body, in that order. Final callbacks go to a local stub
+server, never to GUVI.
+
+Usage: python bench_replay.py [--sessions N] [--turns N] [--capture FILE ...]
+                              [--modes handler,asgi] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from models import HoneypotRequest
+from sessions import SessionStore
+from callback import callback_manager
+from dispatcher import callback_dispatcher
+from stub_callback_server import StubCallbackServer
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+
+def corpus_texts():
+    texts = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    texts += [test["message"] for test in EDGE_CASES]
+    return texts
+
+
+def capture_texts(path):
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, str):
+                texts.append(record)
+                continue
+            message = record.get("message")
+            if isinstance(message, dict):
+                message = message.get("text")
+            text = message if isinstance(message, str) else record.get("text", record.get("body"))
+            if isinstance(text, str) and text:
+                texts.append(text)
+    return texts
+
+
+def synthesize(texts, sessions, turns, seed):
+    """Request bodies for `sessions` conversations of `turns` turns, interleaved turn by turn."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 10, 0)
+    scripts = [[rng.choice(texts) for _ in range(turns)] for _ in range(sessions)]
+    bodies = []
+    for turn in range(turns):
+        for session, script in enumerate(scripts):
+            bodies.append({
+                "sessionId": f"replay-{session:07d}",
+                "message": {
+                    "sender": "scammer",
+                    "text": script[turn],
+                    "timestamp": (start + timedelta(seconds=turn)).isoformat()
+                },
+                "conversationHistory": [],
+                "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+            })
+    return bodies
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 4),
+            "p95": round(percentile(latencies, 95) * 1000, 4),
+            "p99": round(percentile(latencies, 99) * 1000, 4),
+            "max": round(latencies[-1] * 1000, 4) if latencies else 0.0
+        },
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_handler(bodies, max_sessions):
+    from handler import HoneypotHandler
+
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=max_sessions, idle_ttl=0))
+    requests = [HoneypotRequest(**body) for body in bodies]
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for request in requests:
+        began = clock()
+        handler.handle_message(request)
+        latencies.append(clock() - began)
+    return summarize(latencies, clock() - start)
+
+
+def run_asgi(bodies):
+    from app import app
+    from asgi_client import ASGIClient
+
+    client = ASGIClient(app)
+    payloads = [json.dumps(body).encode("utf-8") for body in bodies]
+    headers = {"content-type": "application/json", "x-api-key": "bench"}
+
+    async def replay():
+        latencies = []
+        clock = time.perf_counter
+        async with client.lifespan():
+            start = clock()
+            for payload in payloads:
+                began = clock()
+                response = await client.post("/honeypot/message", payload, headers=headers)
+                latencies.append(clock() - began)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/honeypot/message returned {response.status_code}: {response.text}")
+            return summarize(latencies, clock() - start)
+
+    return asyncio.run(replay())
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=8, help="messages per session")
+    parser.add_argument("--capture", action="append", default=[], help="JSONL capture to add to the corpus")
+    parser.add_argument("--modes", default="handler,asgi")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    texts = corpus_texts()
+    for path in args.capture:
+        texts += capture_texts(path)
+    bodies = synthesize(texts, args.sessions, args.turns, args.seed)
+
+    stub = StubCallbackServer()
+    callback_manager.url = stub.url
+    results = {}
+    try:
+        for mode in args.modes.split(","):
+            if mode == "handler":
+                results[mode] = run_handler(bodies, max_sessions=args.sessions)
+            elif mode == "asgi":
+                results[mode] = run_asgi(bodies)
+            else:
+                parser.error(f"unknown mode {mode!r}")
+        callback_dispatcher.join(30)
+    finally:
+        stub.close()
+
+    report = {
+        "benchmark": "replay",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "corpus": {"texts": len(texts), "captures": args.capture},
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "callbacks_delivered": len(stub.received),
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Start-up cost of a large rule pack: building the matchers from the JSON
+pack against loading the compiled artifact, as a worker does. The default
+pack is padded with synthetic word patterns and analyst keywords (a few
+regex patterns among them) up to the requested number of rules.
+
+Usage: python bench_rules.py [--rules 10000] [--rounds N]
+"""
+
+import argparse
+import json
+import random
+import sys
+import os
+import pickle
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from rules import compile_rule_pack, load_rules, pack_digest, read_artifact, write_artifact
+
+SYLLABLES = ["ka", "ro", "mi", "tan", "vel", "shu", "pra", "dex", "lo", "gan", "ti", "bor"]
+
+
+def phrase(rng):
+    return " ".join("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(rng.randint(1, 3)))
+
+
+def scaled_pack(rules, rng):
+    """The default pack with rules added until signals and keywords hold `rules` entries between them."""
+    with open(config.RULE_PACK, "rb") as f:
+        pack = json.load(f)
+    count = sum(len(c["patterns"]) for c in pack["signals"]) + sum(map(len, pack["keywords"].values()))
+    while count < rules:
+        if rng.random() < 0.7:
+            category = rng.choice([c for c in pack["signals"] if not c["firstMatchOnly"]])
+            if rng.random() < 0.02:
+                category = rng.choice([c for c in pack["signals"] if c["firstMatchOnly"]])
+                category["patterns"].append(rf"\b{phrase(rng)}\s+\+?\d{{10,15}}\b")
+            else:
+                category["patterns"].append(rf"\b{phrase(rng)}\b")
+        else:
+            pack["keywords"][rng.choice(list(pack["keywords"]))].append(phrase(rng))
+        count += 1
+    return json.dumps(pack).encode("utf-8")
+
+
+def best_ms(fn, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    data = scaled_pack(args.rules, random.Random(42))
+    digest = pack_digest(data)
+    with tempfile.TemporaryDirectory() as directory:
+        pack_path = os.path.join(directory, "pack.json")
+        with open(pack_path, "wb") as f:
+            f.write(data)
+        artifact = pack_path + ".compiled"
+        compiled = compile_rule_pack(data, digest)
+        write_artifact(compiled, artifact)
+
+        compile_ms = best_ms(lambda: compile_rule_pack(data, digest), args.rounds)
+        load_ms = best_ms(lambda: read_artifact(artifact, digest), args.rounds)
+        startup_ms = best_ms(lambda: load_rules(pack_path, artifact), args.rounds)
+        size = os.path.getsize(artifact)
+    parts = {name: pickle.dumps(getattr(compiled, name), protocol=pickle.HIGHEST_PROTOCOL)
+             for name in ("signal_matcher", "keyword_index")}
+    part_ms = {name: best_ms(lambda: pickle.loads(blob), args.rounds) for name, blob in parts.items()}
+
+    loaded = read_artifact(artifact, digest) if os.path.exists(artifact) else compiled
+    text = "urgent: pay the fee today " + " ".join(compiled.signal_categories[0][2][-3:])
+    assert loaded.signal_matcher.scan(text) == compiled.signal_matcher.scan(text)
+
+    patterns = sum(len(patterns) for _, _, patterns, _ in compiled.signal_categories)
+    keywords = sum(len(keywords) for keywords in compiled.keyword_sets.values())
+    print(f"rule pack:           {patterns:,} patterns + {keywords:,} keywords ({len(data):,} bytes of JSON)")
+    print(f"compile from JSON:   {compile_ms:8.1f} ms")
+    print(f"load artifact:       {load_ms:8.1f} ms ({size:,} bytes)")
+    for name, blob in parts.items():
+        print(f"  {name + ':':<18}{part_ms[name]:8.1f} ms ({len(blob):,} bytes)")
+    print(f"load_rules() warm:   {startup_ms:8.1f} ms (pack read and digest check included)")
+    print(f"speedup:             {compile_ms / load_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
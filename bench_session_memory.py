@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: bytes per live session for the Pydantic SessionState the
+store used to hold versus the slotted SessionRecord, at 100k live sessions.
+
+Usage: python bench_session_memory.py [--sessions N] [--turns N]
+"""
+
+import argparse
+import gc
+import sys
+import os
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import SessionState
+from records import SessionRecord
+
+
+def turn_text(session, turn):
+    # Distinct string objects per turn, as they would arrive from JSON
+    return f"Session {session} turn {turn}: pay the fee to verify your account today"
+
+
+def build_states(sessions, turns, start):
+    live = {}
+    for s in range(sessions):
+        state = SessionState(
+            conversation_history=[],
+            scam_detected=False,
+            total_message_count=0,
+            extracted_intelligence={},
+            consecutive_no_new_intel=0
+        )
+        for t in range(turns):
+            state.conversation_history.append({
+                "sender": "scammer" if t % 2 == 0 else "user",
+                "text": turn_text(s, t),
+                "timestamp": (start + timedelta(seconds=t)).isoformat()
+            })
+            state.total_message_count += 1
+        live[f"session-{s}"] = state
+    return live
+
+
+def build_records(sessions, turns, start):
+    live = {}
+    for s in range(sessions):
+        record = SessionRecord()
+        for t in range(turns):
+            record.add_turn("scammer" if t % 2 == 0 else "user", turn_text(s, t), start + timedelta(seconds=t))
+            record.total_message_count += 1
+        live[f"session-{s}"] = record
+    return live
+
+
+def measure(builder, sessions, turns):
+    start = datetime(2024, 1, 1, 10, 0)
+    gc.collect()
+    tracemalloc.start()
+    live = builder(sessions, turns, start)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Message text is identical in both layouts, so report it separately
+    text_bytes = sum(sys.getsizeof(turn_text(0, t)) for t in range(turns)) * sessions
+    del live
+    return used / sessions, (used - text_bytes) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} live sessions, {args.turns} turns each")
+    state_total, state_overhead = measure(build_states, args.sessions, args.turns)
+    record_total, record_overhead = measure(build_records, args.sessions, args.turns)
+    print(f"{'':<22} {'bytes/session':>14} {'excl. text':>11}")
+    print(f"{'SessionState (Pydantic)':<22} {state_total:>14.0f} {state_overhead:>11.0f}")
+    print(f"{'SessionRecord (slots)':<22} {record_total:>14.0f} {record_overhead:>11.0f}")
+    print(f"Reduction: {state_total / record_total:.2f}x total, {state_overhead / record_overhead:.2f}x excluding text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Soak test for the message pipeline: replays a stream of synthetic scam
+sessions through HoneypotHandler.handle_message, with final callbacks
+delivered by the dispatcher to a local stub, and prints resident memory at
+checkpoints. Memory should stay flat once the session store reaches its cap:
+sessions that finished are marked when their callback is queued, the
+rest are flushed through the eviction hook, and nothing keeps a record per
+session ever seen. The handler's caches and indexes are sized like the
+store, so they fill up over the same stretch.
+
+Usage: python bench_session_soak.py [--sessions N] [--max-sessions N] [--messages N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from artifact_index import ArtifactIndex
+from callback import CallbackManager
+from campaigns import CampaignIndex
+from detection_cache import DetectionCache
+from dispatcher import CallbackDispatcher
+from handler import HoneypotHandler
+from models import HoneypotRequest, Message, Metadata
+from sessions import SessionStore
+from stub_callback_server import StubCallbackServer
+
+METADATA = Metadata(channel="SMS", language="English", locale="IN")
+# Sessions between waits for the callback queue to drain, so it never overflows
+DRAIN_EVERY = 200
+
+
+def rss_mb():
+    """Current resident set size (Linux), in MB."""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--max-sessions", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=5,
+                        help="messages per session; from 5 on, a session stops and sends its callback")
+    args = parser.parse_args()
+
+    stub = StubCallbackServer(record=False)
+    dead_letters = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False)
+    dispatcher = CallbackDispatcher(manager=CallbackManager(url=stub.url), dead_letter_path=dead_letters.name)
+    store = SessionStore(max_sessions=args.max_sessions, idle_ttl=0)
+    handler = HoneypotHandler(session_store=store, callback_dispatcher=dispatcher,
+                              artifact_index=ArtifactIndex(max_entries=args.max_sessions),
+                              detection_cache=DetectionCache(args.max_sessions),
+                              campaigns=CampaignIndex(max_campaigns=args.max_sessions, max_tokens=args.max_sessions))
+
+    timestamp = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+    checkpoint = max(1, args.sessions // 10)
+    start = time.perf_counter()
+    print(f"{'sessions':>10} {'live':>8} {'evictions':>10} {'callbacks':>10} {'rss MB':>8} {'sessions/s':>11}")
+    for i in range(args.sessions):
+        session_id = f"soak-{i:09d}"
+        for turn in range(args.messages):
+            handler.handle_message(HoneypotRequest(
+                sessionId=session_id,
+                message=Message(sender="scammer", text=f"URGENT: pay the fee to fraud{i}@upi now, turn {turn}",
+                                timestamp=timestamp),
+                metadata=METADATA
+            ))
+        if (i + 1) % DRAIN_EVERY == 0:
+            dispatcher.join()
+
+        if (i + 1) % checkpoint == 0:
+            stats = store.stats()
+            rate = (i + 1) / (time.perf_counter() - start)
+            print(f"{i + 1:>10} {stats['size']:>8} {stats['evictions']:>10} {stub.count:>10} {rss_mb():>8.1f} "
+                  f"{rate:>11.0f}")
+
+    dispatcher.stop()
+    stub.close()
+    print(f"Delivered {stub.count} callbacks, {os.path.getsize(dead_letters.name)} bytes dead-lettered")
+    os.unlink(dead_letters.name)
+
+
+if __name__ == "__main__":
+    main()
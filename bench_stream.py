@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-turn cost of thousands of concurrent conversations over
+POST /honeypot/message (full conversationHistory, or delta mode) against one
+/honeypot/stream WebSocket per session, through the ASGI app in-process.
+Every session runs its turns one after another; all sessions run at once
+(streams are all opened first, and the handshakes count in the total time).
+Reports throughput, per-turn latency, the HTTP/1.1 or WebSocket bytes a
+turn costs on the wire in each direction, and the requests and connections
+it takes. Final callbacks go to a local stub server.
+
+Usage: python bench_stream.py [--sessions 2000] [--turns 10] [--fast-codec]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from asgi_client import ASGIClient
+from callback import callback_manager
+from campaigns import CampaignIndex
+from config import config
+from detection_cache import DetectionCache
+from dispatcher import callback_dispatcher
+from handler import HoneypotHandler
+from server import create_app
+from sessions import SessionStore
+from stub_callback_server import StubCallbackServer
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+API_KEY = config.API_KEY or "test-key"
+# What a server such as uvicorn adds to each HTTP response
+RESPONSE_HEAD = len(b"HTTP/1.1 200 OK\r\ndate: Mon, 01 Jan 2024 10:00:00 GMT\r\nserver: uvicorn\r\n"
+                    b"content-length: 000\r\ncontent-type: application/json\r\n\r\n")
+
+
+def corpus():
+    texts = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    return texts + [test["message"] for test in EDGE_CASES if test["message"].strip()]
+
+
+def http_request_bytes(path, body):
+    head = (f"POST {path} HTTP/1.1\r\nHost: honeypot.example.com\r\nContent-Type: application/json\r\n"
+            f"x-api-key: {API_KEY}\r\nContent-Length: {len(body)}\r\n\r\n")
+    return len(head) + len(body)
+
+
+def ws_frame_bytes(payload, masked):
+    """A single-frame WebSocket message: header, extended length, client mask."""
+    length = len(payload)
+    return 2 + (2 if length >= 126 else 0) + (6 if length >= 65536 else 0) + (4 if masked else 0) + length
+
+
+def ws_handshake_bytes(path):
+    request = (f"GET {path} HTTP/1.1\r\nHost: honeypot.example.com\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+               f"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\nx-api-key: {API_KEY}\r\n\r\n")
+    response = ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                "Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=\r\n\r\n")
+    return len(request), len(response)
+
+
+class Totals:
+    def __init__(self):
+        self.latencies = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.requests = 0
+        self.connections = 0
+
+
+async def post_session(client, session, turns, texts, delta, totals):
+    history = []
+    previous = None
+    for turn in range(turns):
+        text = texts[(session + turn) % len(texts)]
+        timestamp = f"2024-01-01T10:{turn:02d}:00Z"
+        body = {
+            "sessionId": f"post-{session}",
+            "message": {"sender": "scammer", "text": text, "timestamp": timestamp},
+            "metadata": METADATA
+        }
+        if delta and previous:
+            body["historySeq"] = previous["historySeq"]
+            body["historyDigest"] = previous["historyDigest"]
+        else:
+            body["conversationHistory"] = history
+        start = time.perf_counter()
+        payload = json.dumps(body).encode("utf-8")
+        response = await client.post("/honeypot/message", payload, headers={"content-type": "application/json"})
+        previous = response.json()
+        totals.latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        totals.bytes_in += http_request_bytes("/honeypot/message", payload)
+        totals.bytes_out += RESPONSE_HEAD + len(response.content)
+        totals.requests += 1
+        if not delta:
+            history = history + [
+                {"sender": "scammer", "text": text, "timestamp": timestamp},
+                {"sender": "user", "text": previous["reply"], "timestamp": timestamp}
+            ]
+    # HTTP/1.1 keep-alive: one connection per session at best
+    totals.connections += 1
+
+
+async def stream_session(client, session, turns, texts, totals, connected):
+    path = f"/honeypot/stream/stream-{session}"
+    handshake_in, handshake_out = ws_handshake_bytes(path)
+    totals.bytes_in += handshake_in
+    totals.bytes_out += handshake_out
+    totals.requests += 1
+    totals.connections += 1
+    async with client.websocket(path) as socket:
+        # Every session is connected before any sends, so all of them are in flight at once
+        await connected.wait()
+        for turn in range(turns):
+            text = texts[(session + turn) % len(texts)]
+            start = time.perf_counter()
+            frame = json.dumps({"sender": "scammer", "text": text, "timestamp": f"2024-01-01T10:{turn:02d}:00Z"})
+            await socket.send_text(frame)
+            answer = await socket.receive_text()
+            totals.latencies.append(time.perf_counter() - start)
+            assert "error" not in json.loads(answer), answer
+            totals.bytes_in += ws_frame_bytes(frame.encode("utf-8"), masked=True)
+            totals.bytes_out += ws_frame_bytes(answer.encode("utf-8"), masked=False)
+
+
+async def drive(mode, sessions, turns, texts, fast_codec):
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=sessions * 2, idle_ttl=0),
+                              detection_cache=DetectionCache(), campaigns=CampaignIndex())
+    client = ASGIClient(create_app(handler, warmup=False, fast_codec=fast_codec), headers={"x-api-key": API_KEY})
+    totals = Totals()
+    if mode == "stream":
+        connected = asyncio.Barrier(sessions)
+        jobs = [stream_session(client, s, turns, texts, totals, connected) for s in range(sessions)]
+    else:
+        jobs = [post_session(client, s, turns, texts, mode == "delta", totals) for s in range(sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*jobs)
+    return totals, time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--fast-codec", action="store_true", help="serve the POST modes with the fast codec")
+    args = parser.parse_args()
+
+    stub = StubCallbackServer()
+    callback_manager.url = stub.url
+    texts = corpus()
+    count = args.sessions * args.turns
+
+    print(f"{args.sessions:,} concurrent sessions x {args.turns} turns ({'fast' if args.fast_codec else 'default'} codec)")
+    print(f"{'mode':<12}{'turns/s':>9}{'us/turn':>9}{'p50 ms':>9}{'p99 ms':>9}{'B in/turn':>11}{'B out/turn':>12}"
+          f"{'requests':>10}{'conns':>8}")
+    for label, mode in (("POST full", "full"), ("POST delta", "delta"), ("WebSocket", "stream")):
+        totals, elapsed = asyncio.run(drive(mode, args.sessions, args.turns, texts, args.fast_codec))
+        print(f"{label:<12}{count / elapsed:9,.0f}{elapsed / count * 1e6:9.0f}"
+              f"{percentile(totals.latencies, 0.5):9.1f}{percentile(totals.latencies, 0.99):9.1f}"
+              f"{totals.bytes_in / count:11,.0f}{totals.bytes_out / count:12,.0f}"
+              f"{totals.requests:10,}{totals.connections:8,}")
+
+    callback_dispatcher.stop()
+    stub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,139 @@
 import requests
 import logging
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional, Union
+from requests.adapters import HTTPAdapter
 from models import SessionState, GUVICallbackPayload
+from records import SessionRecord
+from intelligence import IntelligenceStore
 from config import config
+from metrics import metrics
+import codec
 
 logger = logging.getLogger(__name__)
 
-class CallbackManager:
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+class CallbackStats:
+    """Thread-safe delivery counters for the GUVI callback endpoint."""
+
     def __init__(self):
-        self.sent_callbacks: set = set()
-    
-    def send_final_callback(self, session_id: str, session_state: SessionState) -> bool:
-        if session_id in self.sent_callbacks:
-            logger.warning(f"Callback already sent for session {session_id}")
-            return False
-        
-        payload = GUVICallbackPayload(
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record_attempt(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.sent + self.failed
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "latency_avg_ms": (self.latency_total / attempts * 1000) if attempts else 0.0,
+                "latency_max_ms": self.latency_max * 1000
+            }
+
+class CallbackManager:
+    """
+    Sends final session results to GUVI over a persistent keep-alive
+    connection pool. Concurrent delivery is the dispatcher's job (see
+    dispatcher.py): its workers share this manager's pool.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        pool_size: int = config.CALLBACK_POOL_SIZE,
+        timeout: float = config.CALLBACK_TIMEOUT,
+        fast_codec: bool = config.FAST_CODEC
+    ):
+        self.url = url or config.GUVI_CALLBACK_URL
+        self.timeout = timeout
+        self.fast_codec = fast_codec
+        self.stats = CallbackStats()
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    def build_payload(self, session_id: str, session_state: Union[SessionState, SessionRecord]) -> GUVICallbackPayload:
+        intelligence = session_state.extracted_intelligence
+        if isinstance(intelligence, IntelligenceStore):
+            intelligence = intelligence.to_dict()
+        return GUVICallbackPayload(
             sessionId=session_id,
             scamDetected=session_state.scam_detected,
             totalMessagesExchanged=session_state.total_message_count,
-            extractedIntelligence=session_state.extracted_intelligence,
+            extractedIntelligence=intelligence,
             agentNotes="Session completed"
         )
-        
+
+    def payload_dict(self, session_id: str, session_state: Union[SessionState, SessionRecord]) -> Dict[str, Any]:
+        """The callback payload as a plain dict, snapshotting the session."""
+        if not self.fast_codec:
+            return self.build_payload(session_id, session_state).dict()
+        # Same fields as GUVICallbackPayload, without building the model
+        intelligence = session_state.extracted_intelligence
+        return {
+            "sessionId": session_id,
+            "scamDetected": session_state.scam_detected,
+            "totalMessagesExchanged": session_state.total_message_count,
+            "extractedIntelligence": intelligence.to_dict() if isinstance(intelligence, IntelligenceStore) else dict(intelligence),
+            "agentNotes": "Session completed"
+        }
+
+    def post_payload(self, payload: Dict[str, Any]) -> requests.Response:
+        """POST one payload over the pooled session, recording its latency."""
+        start = time.perf_counter()
+        try:
+            if self.fast_codec:
+                response = self.http.post(self.url, data=codec.dumps(payload), headers=JSON_HEADERS, timeout=self.timeout)
+            else:
+                response = self.http.post(self.url, json=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            latency = time.perf_counter() - start
+            self.stats.record_attempt(latency, False)
+            metrics.observe("callback_post", latency)
+            raise
+        latency = time.perf_counter() - start
+        self.stats.record_attempt(latency, response.ok)
+        metrics.observe("callback_post", latency)
+        return response
+
+    def send_final_callback(self, session_id: str, session_state: Union[SessionState, SessionRecord]) -> bool:
+        """POST the final callback now; on success the session is marked callback_sent."""
+        if session_state.callback_sent:
+            logger.warning(f"Callback already sent for session {session_id}")
+            return False
+
+        if not self._send(self.payload_dict(session_id, session_state)):
+            return False
+        session_state.callback_sent = True
+        return True
+
+    def _send(self, payload: Dict[str, Any]) -> bool:
+        session_id = payload["sessionId"]
         try:
-            response = requests.post(
-                config.GUVI_CALLBACK_URL,
-                json=payload.dict(),
-                timeout=10
-            )
+            response = self.post_payload(payload)
             response.raise_for_status()
-            self.sent_callbacks.add(session_id)
             logger.info(f"Callback sent successfully for session {session_id}")
             return True
         except requests.exceptions.RequestException as e:
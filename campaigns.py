@@ -0,0 +1,222 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from heapq import nlargest
+from operator import eq
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import config
+
+# One-permutation MinHash: each word's 64-bit hash picks one of BINS bins,
+# and a message's signature is the smallest hash in every bin (None for an
+# empty bin). Signatures are split into BANDS bands of ROWS bins; messages
+# sharing any band are candidates, so a near-duplicate with word-set Jaccard
+# similarity s is found with probability 1 - (1 - s ** ROWS) ** BANDS:
+# 99.97% at 0.8, 98% at 0.6.
+BINS = 16
+ROWS = 2
+BANDS = BINS // ROWS
+
+# Letters only: names change little, and amounts, phone numbers and
+# reference ids, which change with every copy, disappear entirely
+_TOKEN_RE = re.compile(r"[a-z]+")
+_BIT = [1 << i for i in range(BINS)]
+# Bands whose bins are all empty say nothing about a message
+_EMPTY_BANDS = frozenset((band,) + (None,) * ROWS for band in range(BANDS))
+
+class Signature:
+    """A message's MinHash signature and the bitmask of its empty bins."""
+
+    __slots__ = ("values", "empty")
+
+    def __init__(self, values: Tuple[Optional[int], ...], empty: int):
+        self.values = values
+        self.empty = empty
+
+    def band_keys(self) -> Set[Tuple[Any, ...]]:
+        values = self.values
+        return set(zip(range(BANDS), *(values[row::ROWS] for row in range(ROWS)))) - _EMPTY_BANDS
+
+    def similarity(self, other: "Signature") -> float:
+        """Jaccard similarity of the two word sets, estimated from the bins either one fills."""
+        both_empty = (self.empty & other.empty).bit_count()
+        matches = sum(map(eq, self.values, other.values)) - both_empty
+        return matches / (BINS - both_empty)
+
+class Campaign:
+    """
+    A cluster of near-duplicate messages. scam_generation is the rules
+    generation under which a member was last detected as a scam on its own
+    (0 if none was): a mark only counts under the rules that made it.
+    """
+
+    __slots__ = ("id", "signature", "band_keys", "size", "scam_generation", "first_seen", "last_seen", "sample")
+
+    def __init__(self, campaign_id: int, signature: Signature, band_keys: Set[Tuple[Any, ...]],
+                 sample: str, now: float):
+        self.id = campaign_id
+        self.signature = signature
+        self.band_keys = band_keys
+        self.size = 0
+        self.scam_generation = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.sample = sample
+
+    @property
+    def scam(self) -> bool:
+        return self.scam_generation > 0
+
+    def mark_scam(self, generation: int) -> None:
+        # A request still finishing on older rules does not take a newer mark back
+        if generation > self.scam_generation:
+            self.scam_generation = generation
+
+    def scam_under(self, generation: int) -> bool:
+        """Whether a member was detected as a scam under this rules generation."""
+        return self.scam_generation == generation
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "campaignId": self.id,
+            "size": self.size,
+            "scam": self.scam,
+            "scamGeneration": self.scam_generation,
+            "firstSeen": self.first_seen,
+            "lastSeen": self.last_seen,
+            "sample": self.sample
+        }
+
+class CampaignIndex:
+    """
+    Streaming near-duplicate clustering of incoming messages, by MinHash
+    LSH over the set of words in the normalized text.
+
+    assign() puts a message into the candidate campaign whose first
+    message's estimated similarity is at least `similarity`, or starts a
+    new campaign. Candidates come from one dict lookup per band, so
+    assignment costs the same however many campaigns are known. Once any
+    member of a campaign has been detected as a scam on its own, the
+    campaign is marked and later members can skip detection, for as long
+    as the same rules are in force.
+
+    Memory is bounded: at most max_campaigns are kept (the least recently
+    assigned are evicted) and the per-word hash cache holds at most
+    max_tokens words.
+    """
+
+    def __init__(
+        self,
+        similarity: float = config.CAMPAIGN_SIMILARITY,
+        max_campaigns: int = config.CAMPAIGN_MAX_CLUSTERS,
+        max_tokens: int = 50000,
+        min_tokens: int = 6,
+        clock: Any = time.time
+    ):
+        self.similarity = similarity
+        self.max_campaigns = max_campaigns
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.clock = clock
+        # Ordered from least to most recently assigned
+        self.campaigns: "OrderedDict[int, Campaign]" = OrderedDict()
+        # band key -> campaign id
+        self._bands: Dict[Tuple[Any, ...], int] = {}
+        # word -> (bin, hash)
+        self._token_hashes: Dict[str, Tuple[int, int]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def signature(self, text: str) -> Optional[Signature]:
+        """MinHash signature of the text's words, or None for texts too short to cluster."""
+        tokens = set(_TOKEN_RE.findall(text.lower()))
+        if len(tokens) < self.min_tokens:
+            return None
+        hashes = list(map(self._token_hashes.get, tokens))
+        if None in hashes:
+            hashes = [self._token_hash(token) for token in tokens]
+        # Largest first, so the smallest hash in each bin is the one kept
+        hashes.sort(reverse=True)
+        minimums = dict(hashes)
+        empty = (1 << BINS) - 1 - sum(map(_BIT.__getitem__, minimums))
+        return Signature(tuple(map(minimums.get, range(BINS))), empty)
+
+    def _token_hash(self, token: str) -> Tuple[int, int]:
+        value = self._token_hashes.get(token)
+        if value is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            value = (digest % BINS, digest // BINS)
+            if len(self._token_hashes) >= self.max_tokens:
+                self._token_hashes.clear()
+            self._token_hashes[token] = value
+        return value
+
+    def assign(self, text: str) -> Optional[Campaign]:
+        """The campaign text belongs to (created if needed), or None if it is too short."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        band_keys = signature.band_keys()
+        now = self.clock()
+
+        with self._lock:
+            campaign = self._match(signature, band_keys)
+            if campaign is None:
+                campaign = Campaign(self._next_id, signature, band_keys, text[:200], now)
+                self._next_id += 1
+                self.campaigns[campaign.id] = campaign
+                for key in band_keys:
+                    self._bands.setdefault(key, campaign.id)
+                while len(self.campaigns) > self.max_campaigns:
+                    self._evict()
+            else:
+                self.campaigns.move_to_end(campaign.id)
+            campaign.size += 1
+            campaign.last_seen = now
+            return campaign
+
+    def _match(self, signature: Signature, band_keys: Set[Tuple[Any, ...]]) -> Optional[Campaign]:
+        found = list(map(self._bands.get, band_keys))
+        candidates = set(found)
+        candidates.discard(None)
+        # The campaign most bands agree on first
+        for campaign_id in sorted(candidates, key=found.count, reverse=True):
+            campaign = self.campaigns[campaign_id]
+            if signature.similarity(campaign.signature) >= self.similarity:
+                return campaign
+        return None
+
+    def _evict(self) -> None:
+        _, campaign = self.campaigns.popitem(last=False)
+        self._drop_bands(campaign)
+        self.evictions += 1
+
+    def _drop_bands(self, campaign: Campaign) -> None:
+        for key in campaign.band_keys:
+            if self._bands.get(key) == campaign.id:
+                del self._bands[key]
+
+    def get(self, campaign_id: int) -> Optional[Campaign]:
+        with self._lock:
+            return self.campaigns.get(campaign_id)
+
+    def top(self, limit: int = 20, scam_only: bool = False) -> List[Dict[str, Any]]:
+        """The largest campaigns, for analysts."""
+        with self._lock:
+            campaigns = [c for c in self.campaigns.values() if c.scam or not scam_only]
+            return [campaign.to_dict() for campaign in nlargest(limit, campaigns, key=lambda c: c.size)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "campaigns": len(self.campaigns),
+                "scam_campaigns": sum(1 for campaign in self.campaigns.values() if campaign.scam),
+                "max_campaigns": self.max_campaigns,
+                "evictions": self.evictions,
+                "cached_tokens": len(self._token_hashes)
+            }
+
+campaign_index = CampaignIndex()
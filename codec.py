@@ -0,0 +1,165 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+    orjson = None
+
+from models import HoneypotRequest, Message
+
+class CodecError(ValueError):
+    """A request body the fast decoder will not vouch for."""
+
+if orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+else:
+    loads = json.loads
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+@dataclass(slots=True)
+class RequestMessage:
+    sender: str
+    text: str
+    timestamp: datetime
+
+@dataclass(slots=True)
+class RequestMetadata:
+    channel: str
+    language: str
+    locale: str
+
+@dataclass(slots=True)
+class FastRequest:
+    """
+    Same attributes as HoneypotRequest. conversationHistory is the decoded
+    JSON list as-is: entries are only checked to be objects, since the
+    handler reads nothing but their sender and text.
+    """
+
+    sessionId: str
+    message: RequestMessage
+    conversationHistory: List[Any]
+    metadata: RequestMetadata
+    historySeq: Optional[int] = None
+    historyDigest: Optional[str] = None
+
+def _field(data: Dict[str, Any], name: str, kind: type) -> Any:
+    value = data.get(name)
+    if type(value) is not kind:
+        raise CodecError(f"{name}: expected {kind.__name__}")
+    return value
+
+def _optional(data: Dict[str, Any], name: str, kind: type, default: Any = None) -> Any:
+    return _field(data, name, kind) if data.get(name) is not None else default
+
+def _message(data: Dict[str, Any], where: str = "") -> RequestMessage:
+    try:
+        timestamp = datetime.fromisoformat(_field(data, "timestamp", str))
+    except ValueError as e:
+        raise CodecError(f"{where}timestamp: {e}")
+    return RequestMessage(_field(data, "sender", str), _field(data, "text", str), timestamp)
+
+def decode_request(body: bytes) -> FastRequest:
+    """
+    Decode a /honeypot/message body into a FastRequest. Only exact, common
+    shapes are accepted; anything else raises CodecError so the caller can
+    fall back to full Pydantic validation.
+    """
+    try:
+        data = loads(body)
+    except ValueError as e:
+        raise CodecError(f"invalid JSON: {e}")
+    if type(data) is not dict:
+        raise CodecError("expected a JSON object")
+
+    message = _message(_field(data, "message", dict), "message.")
+    metadata = _field(data, "metadata", dict)
+
+    history = _optional(data, "conversationHistory", list, [])
+    for entry in history:
+        if type(entry) is not dict:
+            raise CodecError("conversationHistory: expected objects")
+
+    return FastRequest(
+        sessionId=_field(data, "sessionId", str),
+        message=message,
+        conversationHistory=history,
+        metadata=RequestMetadata(
+            _field(metadata, "channel", str),
+            _field(metadata, "language", str),
+            _field(metadata, "locale", str)
+        ),
+        historySeq=_optional(data, "historySeq", int),
+        historyDigest=_optional(data, "historyDigest", str)
+    )
+
+def parse_request(body: bytes) -> Tuple[Optional[Any], Optional[List[Dict[str, Any]]]]:
+    """
+    Fast decode with a Pydantic fallback. Returns (request, None), or
+    (None, errors) when the body is invalid.
+    """
+    try:
+        return decode_request(body), None
+    except CodecError:
+        pass
+    try:
+        return HoneypotRequest.model_validate_json(body), None
+    except ValueError as e:
+        return None, _errors(e)
+
+def parse_turn(frame: Union[bytes, str]) -> Tuple[Optional[RequestMessage], Optional[List[Dict[str, Any]]]]:
+    """
+    Decode one turn of a streamed conversation: a message object, as in a
+    request's "message" field. Returns (message, None), or (None, errors).
+    """
+    try:
+        data = loads(frame)
+        if type(data) is not dict:
+            raise CodecError("expected a JSON object")
+        return _message(data), None
+    except (CodecError, ValueError):
+        pass
+    try:
+        message = Message.model_validate_json(frame)
+    except ValueError as e:
+        return None, _errors(e)
+    return RequestMessage(message.sender, message.text, message.timestamp), None
+
+def _errors(error: ValueError) -> List[Dict[str, Any]]:
+    if hasattr(error, "errors"):
+        return [
+            {"type": err["type"], "loc": ["body", *err["loc"]], "msg": err["msg"]}
+            for err in error.errors(include_url=False, include_context=False, include_input=False)
+        ]
+    return [{"type": "value_error", "loc": ["body"], "msg": str(error)}]
+
+_reply_fragments: Dict[str, bytes] = {}
+_MAX_REPLY_FRAGMENTS = 4096
+
+def encode_response(result: Dict[str, Any]) -> bytes:
+    """
+    Encode a handle_message() result. Replies come from a small fixed set,
+    so their encoded form is cached and only the remaining fields are
+    encoded per call.
+    """
+    reply = result.get("reply")
+    if type(reply) is not str:
+        return dumps(result)
+
+    fragment = _reply_fragments.get(reply)
+    if fragment is None:
+        fragment = dumps(reply)
+        if len(_reply_fragments) < _MAX_REPLY_FRAGMENTS:
+            _reply_fragments[reply] = fragment
+    rest = dumps({key: value for key, value in result.items() if key != "reply"})
+    if rest == b"{}":
+        return b'{"reply":' + fragment + b'}'
+    return b'{"reply":' + fragment + b',' + rest[1:]
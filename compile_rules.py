@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Compile a rule pack into the artifact workers load at start-up, so no
+worker pays for building the matchers. Fails on a malformed pack.
+
+Usage: python compile_rules.py [rule_pack.json] [--output PATH]
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import config
+from rules import RulePackError, artifact_path, compile_rule_pack, write_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pack", nargs="?", default=config.RULE_PACK)
+    parser.add_argument("--output", help="artifact path (default: RULE_ARTIFACT, or <pack>.compiled)")
+    args = parser.parse_args()
+
+    with open(args.pack, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    try:
+        compiled = compile_rule_pack(data)
+    except RulePackError as e:
+        sys.exit(f"{args.pack}: {e}")
+    compile_ms = (time.perf_counter() - start) * 1000
+    output = args.output or artifact_path(args.pack)
+    write_artifact(compiled, output)
+
+    patterns = sum(len(patterns) for _, _, patterns, _ in compiled.signal_categories)
+    keywords = sum(len(keywords) for keywords in compiled.keyword_sets.values())
+    print(f"{args.pack}: {compiled.name} v{compiled.version}, {patterns} patterns, {keywords} keywords")
+    print(f"compiled in {compile_ms:.1f} ms -> {output} ({os.path.getsize(output):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
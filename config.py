@@ -6,5 +6,60 @@ class Config:
     GUVI_CALLBACK_URL: str = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
     MAX_MESSAGES: int = 15
     MAX_NO_NEW_INTEL: int = 3
+    # Confidence at which detect_scam (and the batch scorer) flags a message
+    SCAM_THRESHOLD: float = float(os.getenv("SCAM_THRESHOLD", "0.40"))
+    # Per-turn decay of a session's running signal tally (see tally.py)
+    SIGNAL_DECAY: float = float(os.getenv("SIGNAL_DECAY", "0.8"))
+    # Exercise every engine in the app's startup hook before accepting traffic
+    WARMUP: bool = os.getenv("WARMUP", "1") != "0"
+    # Rebuild sessions from the client's conversationHistory, so any worker can serve any session
+    STATELESS_SESSIONS: bool = os.getenv("STATELESS_SESSIONS", "0") == "1"
+    # Opt-in fast JSON path (see codec.py): typed structs in, pre-encoded bytes out
+    FAST_CODEC: bool = os.getenv("FAST_CODEC", "0") == "1"
+    # Per-stage latency histograms and pipeline counters, served on /metrics
+    METRICS: bool = os.getenv("METRICS", "1") != "0"
+    # Detection patterns, keyword sets and reply banks (see rules.py), and where
+    # their compiled artifact is kept (default: <RULE_PACK>.compiled)
+    RULE_PACK: str = os.getenv("RULE_PACK", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule_pack.json"))
+    RULE_ARTIFACT: str = os.getenv("RULE_ARTIFACT", "")
+    # Seconds between checks of the rule pack's mtime for a hot reload (0 disables)
+    RULE_RELOAD_INTERVAL: float = float(os.getenv("RULE_RELOAD_INTERVAL", "5"))
+    # Message analysis in worker processes (see offload.py): worker count (0 runs
+    # everything on the event loop), and the message length or event-loop lag
+    # from which a message is offloaded
+    OFFLOAD_WORKERS: int = int(os.getenv("OFFLOAD_WORKERS", "0"))
+    OFFLOAD_MIN_CHARS: int = int(os.getenv("OFFLOAD_MIN_CHARS", "2000"))
+    OFFLOAD_MAX_LAG_MS: float = float(os.getenv("OFFLOAD_MAX_LAG_MS", "20"))
+    
+    # Session store: "memory" (per process), "sqlite" (per host) or "redis" (shared)
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_SQLITE_PATH: str = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+    # Session store bounds: idle sessions expire, the least recently used are evicted
+    MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", "100000"))
+    SESSION_IDLE_TTL: float = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+    # Turns kept per session in its ring buffer
+    SESSION_HISTORY_TURNS: int = int(os.getenv("SESSION_HISTORY_TURNS", "32"))
+    # Per-message analyses cached for repeated template texts (0 disables)
+    DETECTION_CACHE_SIZE: int = int(os.getenv("DETECTION_CACHE_SIZE", "10000"))
+    # Near-duplicate campaign clustering (see campaigns.py): estimated word-set
+    # similarity for joining a campaign, campaigns kept, and whether messages in
+    # a known scam campaign skip detection
+    CAMPAIGN_SIMILARITY: float = float(os.getenv("CAMPAIGN_SIMILARITY", "0.6"))
+    CAMPAIGN_MAX_CLUSTERS: int = int(os.getenv("CAMPAIGN_MAX_CLUSTERS", "50000"))
+    CAMPAIGN_FAST_PATH: bool = os.getenv("CAMPAIGN_FAST_PATH", "1") != "0"
+    # Cross-session artifact index bounds: artifacts kept, sessions kept per artifact
+    ARTIFACT_INDEX_SIZE: int = int(os.getenv("ARTIFACT_INDEX_SIZE", "100000"))
+    ARTIFACT_INDEX_SESSIONS: int = int(os.getenv("ARTIFACT_INDEX_SESSIONS", "100"))
+    
+    # Background delivery of final callbacks (see dispatcher.py)
+    CALLBACK_WORKERS: int = int(os.getenv("CALLBACK_WORKERS", "4"))
+    CALLBACK_QUEUE_SIZE: int = int(os.getenv("CALLBACK_QUEUE_SIZE", "1000"))
+    CALLBACK_MAX_RETRIES: int = int(os.getenv("CALLBACK_MAX_RETRIES", "5"))
+    CALLBACK_BACKOFF_BASE: float = float(os.getenv("CALLBACK_BACKOFF_BASE", "0.5"))
+    CALLBACK_BACKOFF_MAX: float = float(os.getenv("CALLBACK_BACKOFF_MAX", "30"))
+    CALLBACK_TIMEOUT: float = float(os.getenv("CALLBACK_TIMEOUT", "10"))
+    CALLBACK_POOL_SIZE: int = int(os.getenv("CALLBACK_POOL_SIZE", "8"))
+    CALLBACK_DEAD_LETTER_PATH: str = os.getenv("CALLBACK_DEAD_LETTER_PATH", "callback_dead_letter.jsonl")
 
 config = Config()
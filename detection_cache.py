@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from config import config
+
+def cache_key(text: str) -> bytes:
+    """
+    16-byte digest of the message text with surrounding whitespace removed.
+    Case and inner whitespace are kept: detection patterns and extracted
+    URLs depend on them.
+    """
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=16).digest()
+
+class DetectionCache:
+    """
+    Bounded LRU cache of per-message analysis, for campaigns that send the
+    same template text to thousands of targets.
+
+    Entries are keyed by cache_key(text) and hold whatever compute(text)
+    returned; they are shared between sessions, so callers must treat them
+    as read-only. max_entries of 0 disables caching.
+    """
+
+    def __init__(self, max_entries: int = config.DETECTION_CACHE_SIZE):
+        # Ordered from least to most recently used
+        self.entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, text: str, compute: Callable[[str], Any]) -> Any:
+        if self.max_entries <= 0:
+            self.misses += 1
+            return compute(text)
+
+        key = cache_key(text)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Computed outside the lock; a concurrent miss on the same text just
+        # computes the same entry twice
+        entry = compute(text)
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def peek(self, text: str) -> Any:
+        """The entry for text, or None, without counting a lookup or refreshing its recency."""
+        with self._lock:
+            return self.entries.get(cache_key(text))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+detection_cache = DetectionCache()
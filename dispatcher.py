@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Union
+
+import requests
+
+from models import SessionState
+from records import SessionRecord
+from callback import callback_manager, CallbackManager
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class CallbackDispatcher:
+    """
+    Delivers final callbacks off the request path.
+
+    submit() snapshots the payload and returns immediately; a background thread
+    runs an asyncio loop whose workers drain a bounded queue, POST through the
+    manager's pooled session, retry with exponential backoff, and append
+    callbacks that never get through to a dead-letter JSONL file. The POSTs
+    and dead-letter writes run on the dispatcher's own thread pool, which is
+    shut down only once the queue has drained.
+
+    The dispatcher only dedupes callbacks still in flight; that a session
+    already had its callback is recorded by the submitter, in the session's
+    callback_sent flag.
+
+    Its owner calls stop() on shutdown, as the app's lifespan does in
+    server.py, so queued callbacks go out first. The dispatcher thread is a
+    daemon: callbacks still queued when the process exits without stop() are
+    lost.
+    """
+
+    def __init__(
+        self,
+        manager: CallbackManager = callback_manager,
+        workers: int = config.CALLBACK_WORKERS,
+        queue_size: int = config.CALLBACK_QUEUE_SIZE,
+        max_retries: int = config.CALLBACK_MAX_RETRIES,
+        backoff_base: float = config.CALLBACK_BACKOFF_BASE,
+        backoff_max: float = config.CALLBACK_BACKOFF_MAX,
+        dead_letter_path: str = config.CALLBACK_DEAD_LETTER_PATH
+    ):
+        self.manager = manager
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_path = dead_letter_path
+
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._ready = threading.Event()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="callback")
+                self._thread = threading.Thread(target=self._run, name="callback-dispatcher", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def submit(self, session_id: str, session_state: Union[SessionState, SessionRecord]) -> bool:
+        """Queue the final callback for a session. Never blocks on the network."""
+        with self._lock:
+            if session_id in self._pending:
+                return False
+            if len(self._pending) >= self.queue_size:
+                full = True
+            else:
+                full = False
+                self._pending.add(session_id)
+
+        payload = self.manager.payload_dict(session_id, session_state)
+        self.start()
+        if full:
+            logger.error(f"Callback queue full, dead-lettering session {session_id}")
+            self._executor.submit(self._dead_letter, payload, "queue full", 0)
+            return False
+
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, payload)
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued callback is delivered or dead-lettered."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self.join(timeout)
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+        # Lets in-flight POSTs and dead-letter writes finish
+        self._executor.shutdown()
+        with self._lock:
+            self._thread = None
+            self._executor = None
+            self._ready.clear()
+
+    def _run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._stopping = asyncio.Event()
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._ready.set()
+        await self._stopping.wait()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            payload = await self._queue.get()
+            try:
+                await self._deliver(payload)
+            except Exception as e:
+                logger.exception(f"Unexpected callback failure for session {payload['sessionId']}: {e}")
+                await self._record_failure(payload, str(e), 0)
+            finally:
+                with self._idle:
+                    self._pending.discard(payload["sessionId"])
+                    self._idle.notify_all()
+
+    async def _deliver(self, payload: Dict[str, Any]) -> None:
+        session_id = payload["sessionId"]
+        error = ""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.manager.stats.record_retry()
+                await asyncio.sleep(min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+            try:
+                response = await self._loop.run_in_executor(self._executor, self.manager.post_payload, payload)
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+                logger.warning(f"Callback attempt {attempt + 1} failed for session {session_id}: {e}")
+                continue
+
+            if response.ok:
+                logger.info(f"Callback sent successfully for session {session_id}")
+                return
+
+            error = f"HTTP {response.status_code}"
+            logger.warning(f"Callback attempt {attempt + 1} failed for session {session_id}: {error}")
+            # Client errors other than rate limiting will not succeed on retry
+            if response.status_code < 500 and response.status_code != 429:
+                await self._record_failure(payload, error, attempt + 1)
+                return
+
+        logger.error(f"Giving up on callback for session {session_id}: {error}")
+        await self._record_failure(payload, error, self.max_retries + 1)
+
+    async def _record_failure(self, payload: Dict[str, Any], error: str, attempts: int) -> None:
+        # File I/O stays off the event loop
+        await self._loop.run_in_executor(self._executor, self._dead_letter, payload, error, attempts)
+
+    def _dead_letter(self, payload: Dict[str, Any], error: str, attempts: int) -> None:
+        record = {
+            "failedAt": datetime.now(timezone.utc).isoformat(),
+            "error": error,
+            "attempts": attempts,
+            "payload": payload
+        }
+        with self._lock:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+callback_dispatcher = CallbackDispatcher()
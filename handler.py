@@ -1,158 +1,56 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import datetime
+from time import perf_counter
 from models import HoneypotRequest, SessionState, ScamDetectionResult
-from sessions import session_store
-from callback import callback_manager
+from records import SessionRecord, Sender, parse_timestamp, to_epoch_ms
+from history import HistoryMismatch
+from config import config
+from intelligence import IntelligenceStore
+from sessions import SessionStore, session_store
+from callback import CallbackManager, callback_manager
+from dispatcher import CallbackDispatcher, callback_dispatcher
+from rules import CompiledRules, RuleRegistry, rule_registry
+from signals import SignalMatcher
+from tally import SignalTally
+from artifacts import scan_artifacts
+from artifact_index import ArtifactIndex, artifact_index
+from metrics import Metrics, metrics
+from detection_cache import DetectionCache, detection_cache
+from campaigns import CampaignIndex, campaign_index
+from codec import FastRequest
 
-def detect_scam(message: str, history: list) -> ScamDetectionResult:
+def detect_scam(message: str, history: list, tally: Optional[SignalTally] = None,
+                rules: Optional[CompiledRules] = None) -> ScamDetectionResult:
     """
     Deterministic rule-based scam detection.
     Focuses on urgency, account threats, payment requests, and authority impersonation.
+    Patterns come from the rule pack, precompiled once into its signal_matcher and scanned in a single pass;
+    rules defaults to the pack currently in force.
+    
+    history holds the turns before message; its scammer turns are folded into
+    a SignalTally so a scam spread over several mild turns is still flagged.
+    Sessions pass their running tally instead, which message is folded into,
+    so only the new message is scanned. The per-turn breakdown is appended to
+    the reasons once earlier turns contribute.
     """
-    import re
-    
     # Convert to lowercase for case-insensitive matching
     message_lower = message.lower()
     
-    # Core scam signal patterns
-    urgency_patterns = [
-        r'\burgent\b',
-        r'\bimmediately\b', 
-        r'\bright now\b',
-        r'\basap\b',
-        r'\btoday only\b',
-        r'\blimited time\b',
-        r'\bact fast\b',
-        r'\bdon\'t delay\b',
-        r'\blast chance\b',
-        r'\boffer expires\b',
-        r'\bending soon\b',
-        r'\bquick action\b',
-        r'\b24 hours\b',
-        r'\b48 hours\b'
-    ]
-    
-    account_threat_patterns = [
-        r'\baccount blocked\b',
-        r'\baccount suspended\b',
-        r'\baccount closed\b',
-        r'\baccount frozen\b',
-        r'\baccount deactivated\b',
-        r'\bsuspend\b',
-        r'\bblock\b',
-        r'\bdeactivate\b',
-        r'\bclose\b',
-        r'\bfrozen\b',
-        r'\blegal action\b',
-        r'\barrest\b',
-        r'\bjail\b',
-        r'\bprison\b',
-        r'\bcourt case\b',
-        r'\bcriminal\b',
-        r'\bfraud\b',
-        r'\billegal\b',
-        r'\bviolation\b',
-        r'\bseized\b'
-    ]
-    
-    payment_verification_patterns = [
-        r'\bpayment\b',
-        r'\btransfer\b',
-        r'\bsend money\b',
-        r'\bdeposit\b',
-        r'\bpay\b',
-        r'\bcharge\b',
-        r'\bfee\b',
-        r'\bfine\b',
-        r'\bpenalty\b',
-        r'\btransaction\b',
-        r'\bu?pi\b',
-        r'\bupi\b',
-        r'\bkyc\b',
-        r'\bverify\b',
-        r'\bverification\b',
-        r'\bconfirm\b',
-        r'\bupdate\b',
-        r'\bshare\b',
-        r'\bprovide\b',
-        r'\bgive\b'
-    ]
-    
-    authority_patterns = [
-        r'\bbank\b',
-        r'\bgovernment\b',
-        r'\btax\b',
-        r'\bcustoms\b',
-        r'\bcourt\b',
-        r'\bpolice\b',
-        r'\binvestigation\b',
-        r'\bofficial\b',
-        r'\bdepartment\b',
-        r'\brai\b',
-        r'\bincome tax\b',
-        r'\bgst\b',
-        r'\bsebi\b',
-        r'\brbi\b',
-        r'\breserve bank\b',
-        r'\bcyber cell\b',
-        r'\bfbi\b',
-        r'\binterpol\b',
-        r'\bsecurity\b',
-        r'\bsbi\b',
-        r'\bicici\b',
-        r'\bhdfc\b',
-        r'\baxis\b',
-        r'\bpnb\b',
-        r'\bsupport\b'
-    ]
-    
     # Track detected signals and confidence
-    detected_signals = []
-    confidence = 0.0
-    
-    # Check each pattern category
-    for pattern in urgency_patterns:
-        if re.search(pattern, message_lower):
-            detected_signals.append(f"Urgency language: {pattern}")
-            confidence += 0.25
-    
-    for pattern in account_threat_patterns:
-        if re.search(pattern, message_lower):
-            detected_signals.append(f"Account threat: {pattern}")
-            confidence += 0.30
-    
-    for pattern in payment_verification_patterns:
-        if re.search(pattern, message_lower):
-            detected_signals.append(f"Payment/verification request: {pattern}")
-            confidence += 0.25
-    
-    for pattern in authority_patterns:
-        if re.search(pattern, message_lower):
-            detected_signals.append(f"Authority impersonation: {pattern}")
-            confidence += 0.20
-    
-    # Check for suspicious phone number requests
-    phone_request_patterns = [
-        r'\bcall\s+me\s+on\s+\+?\d{10,15}\b',
-        r'\bcall\s+me\s+on\s+\d{10}\b',
-        r'\bcall\s+\+?\d{10,15}\b',
-        r'\bphone\s+\+?\d{10,15}\b',
-        r'\bmobile\s+\+?\d{10,15}\b',
-        r'\bcontact\s+\+?\d{10,15}\b',
-        r'\+?\d{10,15}\s+for\s+(?:help|support|details|info)'
-    ]
-    
-    for pattern in phone_request_patterns:
-        if re.search(pattern, message_lower):
-            detected_signals.append(f"Suspicious phone request: {pattern}")
-            confidence += 0.25
-            break
+    matcher = (rules or rule_registry.current).signal_matcher
+    hits = matcher.scan(message_lower)
+    return _with_conversation(_message_result(hits, matcher), hits, history, tally, matcher)
+
+def _message_result(hits: List[int], matcher: SignalMatcher) -> ScamDetectionResult:
+    """Detection result for one message's pattern hits on their own."""
+    confidence, detected_signals = matcher.score(hits)
     
     # Cap confidence at 1.0
     confidence = min(confidence, 1.0)
     
     # Determine if scam is detected
     # Lower threshold for better detection - multiple signals increase confidence
-    scam_detected = confidence >= 0.40
+    scam_detected = confidence >= config.SCAM_THRESHOLD
     
     return ScamDetectionResult(
         scamDetected=scam_detected,
@@ -160,199 +58,422 @@ def detect_scam(message: str, history: list) -> ScamDetectionResult:
         reasons=detected_signals if detected_signals else ["No scam indicators detected"]
     )
 
-def agent_reply(session_state: SessionState) -> str:
+def _with_conversation(result: ScamDetectionResult, hits: List[int], history: list,
+                       tally: Optional[SignalTally], matcher: SignalMatcher) -> ScamDetectionResult:
+    """Fold the message into the conversation's tally; result is returned as-is while no earlier turn contributes."""
+    if tally is None and history:
+        tally = SignalTally.from_history(history, matcher)
+    if tally is None:
+        return result
+    tally.fold(hits, matcher)
+    if not tally.spans_turns():
+        return result
+    
+    confidence = max(result.confidence, tally.confidence(matcher))
+    reasons = ([reason for reason in result.reasons if reason != "No scam indicators detected"] +
+               tally.reasons(matcher))
+    return ScamDetectionResult(
+        scamDetected=confidence >= config.SCAM_THRESHOLD,
+        confidence=confidence,
+        reasons=reasons
+    )
+
+class MessageAnalysis:
+    """
+    Everything computed from a message's text alone, shared through the
+    detection cache by every session that receives the same text. Each part
+    is only worked out once a session needs it: a message in a known scam
+    campaign never needs the detection scan. rules is the pack the analysis
+    was made with.
+    """
+
+    __slots__ = ("text", "rules", "_hits", "_detection", "_keyword_hits", "_artifacts")
+
+    def __init__(self, text: str, rules: CompiledRules):
+        self.text = text
+        self.rules = rules
+        self._hits: Optional[List[int]] = None
+        self._detection: Optional[ScamDetectionResult] = None
+        self._keyword_hits: Optional[Dict[str, List[str]]] = None
+        self._artifacts: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def precomputed(cls, text: str, rules: CompiledRules, hits: List[int], keyword_hits: Dict[str, List[str]],
+                    artifacts: Dict[str, List[str]]) -> "MessageAnalysis":
+        """An analysis whose scans were done elsewhere (an offload worker); only scoring the hits is left."""
+        analysis = cls(text, rules)
+        analysis._hits = hits
+        analysis._keyword_hits = keyword_hits
+        analysis._artifacts = artifacts
+        return analysis
+
+    @property
+    def hits(self) -> List[int]:
+        if self._hits is None:
+            self._hits = self.rules.signal_matcher.scan(self.text.lower())
+        return self._hits
+
+    @property
+    def detection(self) -> ScamDetectionResult:
+        if self._detection is None:
+            self._detection = _message_result(self.hits, self.rules.signal_matcher)
+        return self._detection
+
+    @property
+    def keyword_hits(self) -> Dict[str, List[str]]:
+        if self._keyword_hits is None:
+            self._keyword_hits = self.rules.keyword_index.scan(self.text.lower())
+        return self._keyword_hits
+
+    @property
+    def artifacts(self) -> Dict[str, List[str]]:
+        if self._artifacts is None:
+            self._artifacts = extract_artifacts(self.text, self.keyword_hits)
+        return self._artifacts
+
+def _batch_text(item: Any) -> Tuple[str, Any]:
+    """Text and caller id of one batch item: a string, {"text"} or a HoneypotRequest-shaped object."""
+    if isinstance(item, str):
+        return item, None
+    if isinstance(item, dict):
+        text = item.get("text")
+        if text is None and isinstance(item.get("message"), dict):
+            text = item["message"].get("text")
+        if isinstance(text, str):
+            return text, item.get("id", item.get("sessionId"))
+    raise ValueError("expected a string or an object with a text field")
+
+def score_messages(messages: Iterable[Any], start: int = 0,
+                   rules: Optional[CompiledRules] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stateless bulk classification: scam detection plus intelligence
+    extraction for each message, without touching any session.
+    Items are strings, {"id", "text"} objects or HoneypotRequest bodies; each
+    result carries the item's index (counting from start) and id, or an
+    error for an item that cannot be scored. The whole batch is scored with
+    one pack: rules, or the one in force when it starts.
+    """
+    if rules is None:
+        rules = rule_registry.current
+    for index, item in enumerate(messages, start):
+        result: Dict[str, Any] = {"index": index}
+        try:
+            if isinstance(item, Exception):
+                raise item
+            text, item_id = _batch_text(item)
+        except ValueError as e:
+            result["error"] = str(e)
+            yield result
+            continue
+        if item_id is not None:
+            result["id"] = item_id
+
+        detection = detect_scam(text, [], rules=rules)
+        result["scamDetected"] = detection.scamDetected
+        result["confidence"] = detection.confidence
+        result["reasons"] = detection.reasons
+        result["extractedIntelligence"] = extract_artifacts(text, rules.keyword_index.scan(text.lower()))
+        yield result
+
+def agent_reply(session_state: Union[SessionState, SessionRecord], keyword_hits: Optional[Dict[str, List[str]]] = None,
+                rules: Optional[CompiledRules] = None) -> str:
     """
     Generate replies as a cautious, cooperative, mildly confused Indian user.
     Asks at most one question per turn.
+    keyword_hits is the rules' keyword_index.scan() of the last message, if the caller already has it;
+    rules defaults to the pack currently in force.
     """
     import random
     
-    # Generic cautious responses
-    safe_responses = [
-        "I see. Can you please explain this more clearly?",
-        "I'm not sure I understand. Could you tell me more about this?",
-        "Thank you for the information. What do you need me to do exactly?",
-        "I need some time to think about this. What are the next steps?",
-        "I'm a bit confused about this process. Can you guide me?",
-        "Okay, I understand. How does this work exactly?",
-        "I see. What should I do now?",
-        "Thank you for explaining. Is there anything else I should know?",
-        "I'm not very familiar with these things. Can you help me understand?",
-        "Alright. What information do you need from me?"
-    ]
-    
-    # Responses for when personal info is requested
-    caution_responses = [
-        "I'm not comfortable sharing that information right now. Why do you need it?",
-        "I need to be careful with my details. Can you explain why this is necessary?",
-        "I'm hesitant to provide that. Is there another way to proceed?",
-        "I'd like to understand more before sharing any personal information."
-    ]
-    
-    # Enhanced cautious responses for payment requests
-    payment_caution_responses = [
-        "I need to think about this carefully. Can you provide more details?",
-        "I'm not sure about making payments like this. What are my options?",
-        "I need to understand this better before proceeding with any payment.",
-        "Can you explain why this payment is necessary? I want to be sure.",
-        "I'm hesitant to send money without understanding the process better."
-    ]
-    
-    # Enhanced responses for urgency
-    urgency_responses = [
-        "I need some time to understand this properly. Can we slow down a bit?",
-        "This seems rushed. Can you explain everything step by step?",
-        "I prefer to take my time with important decisions. What's the hurry?",
-        "Let me understand this first before taking any quick action."
-    ]
+    if rules is None:
+        rules = rule_registry.current
     
     # Get the last message from conversation history
-    last_message = ""
-    if session_state.conversation_history:
-        last_message = session_state.conversation_history[-1].get("text", "").lower()
-    
-    # Check if personal information is being requested
-    personal_info_keywords = ["account number", "card number", "cvv", "pin", "password", "otp", "aadhaar", "pan"]
-    if any(keyword in last_message for keyword in personal_info_keywords):
-        return random.choice(caution_responses)
-    
-    # Check if payment is being requested
-    payment_keywords = ["payment", "transfer", "send money", "deposit", "pay", "fee", "charge"]
-    if any(keyword in last_message for keyword in payment_keywords):
-        return random.choice(payment_caution_responses)
-    
-    # Check for urgency - be more cautious
-    urgency_keywords = ["urgent", "immediately", "right now", "asap", "today only", "hurry", "fast", "quickly", "don't delay", "act now"]
-    if any(keyword in last_message for keyword in urgency_keywords):
-        return random.choice(urgency_responses)
-    
-    # Default cautious response
-    return random.choice(safe_responses)
+    if keyword_hits is None:
+        if isinstance(session_state, SessionRecord):
+            last_message = session_state.last_text().lower()
+        else:
+            last_message = ""
+            if session_state.conversation_history:
+                last_message = session_state.conversation_history[-1].get("text", "").lower()
+        keyword_hits = rules.keyword_index.scan(last_message)
+    
+    # Personal information requests first, then payment, then urgency (the
+    # rule pack's reply order); otherwise a generic cautious response
+    return random.choice(rules.replies_for(keyword_hits))
 
-def extract_intelligence(text: str, intelligence_store: Dict[str, Any]) -> Dict[str, Any]:
+def extract_artifacts(text: str, keyword_hits: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
     """
-    Extract only explicitly present intelligence from message text.
-    Uses regex for deterministic extraction.
+    Extract only explicitly present intelligence from one message.
+    Uses artifacts.scan_artifacts() for deterministic single-pass extraction.
+    Each category lists its matches in order of appearance, without duplicates.
+    keyword_hits is keyword_index.scan() of the lowercased text, if the caller already has it.
     """
-    import re
-    
-    # Make a copy to avoid modifying the original
-    extracted = intelligence_store.copy()
-    
-    # Initialize categories if not present
-    if "upi_ids" not in extracted:
-        extracted["upi_ids"] = []
-    if "bank_accounts" not in extracted:
-        extracted["bank_accounts"] = []
-    if "phone_numbers" not in extracted:
-        extracted["phone_numbers"] = []
-    if "urls" not in extracted:
-        extracted["urls"] = []
-    if "suspicious_keywords" not in extracted:
-        extracted["suspicious_keywords"] = []
-    
-    # Extract UPI IDs (format: username@bankname)
-    upi_pattern = r'\b[a-zA-Z0-9._-]+@[a-zA-Z0-9.-]+\b'
-    upi_matches = re.findall(upi_pattern, text)
-    for upi in upi_matches:
-        if upi not in extracted["upi_ids"]:
-            extracted["upi_ids"].append(upi)
-    
-    # Extract bank account numbers (10-18 digit sequences)
-    account_pattern = r'\b\d{10,18}\b'
-    account_matches = re.findall(account_pattern, text)
-    for account in account_matches:
-        # Avoid extracting phone numbers as account numbers
-        if not (len(account) == 10 and account.startswith(('6', '7', '8', '9'))):
-            if account not in extracted["bank_accounts"]:
-                extracted["bank_accounts"].append(account)
-    
-    # Extract phone numbers (Indian format - enhanced patterns)
-    phone_patterns = [
-        r'\b[+]?91[-\s]?[6-9]\d{9}\b',  # +91 format
-        r'\b[6-9]\d{9}\b',              # Simple 10-digit
-        r'\b0[-\s]?[6-9]\d{9}\b',        # With 0 prefix
-        r'\b\d{10}\b',                   # Any 10-digit (catch-all)
-        r'\b[+]?\d{11,15}\b'             # International numbers
-    ]
-    
-    for pattern in phone_patterns:
-        phone_matches = re.findall(pattern, text)
-        for phone in phone_matches:
-            # Normalize phone number format
-            normalized = re.sub(r'[^0-9+]', '', phone)
-            # Avoid duplicates
-            if normalized not in extracted["phone_numbers"]:
-                extracted["phone_numbers"].append(normalized)
+    found = IntelligenceStore()
     
-    # Extract URLs
-    url_pattern = r'\bhttps?://[^\s<>"\']+(?:/[^\s<>"\']*)*\b'
-    url_matches = re.findall(url_pattern, text, re.IGNORECASE)
-    for url in url_matches:
-        if url not in extracted["urls"]:
-            extracted["urls"].append(url)
+    # UPI IDs, emails, phone numbers, bank accounts and URLs in one pass
+    for artifact in scan_artifacts(text):
+        found.add(artifact.category, artifact.value)
     
     # Extract suspicious keywords
-    suspicious_keywords = [
-        "urgent", "immediately", "payment", "transfer", "deposit",
-        "prize", "winner", "lottery", "bonus", "reward",
-        "suspend", "block", "deactivate", "legal action",
-        "account number", "card number", "cvv", "pin", "password",
-        "otp", "aadhaar", "pan", "tax", "customs", "court",
-        "police", "government", "official", "department"
-    ]
+    if keyword_hits is None:
+        keyword_hits = rule_registry.current.keyword_index.scan(text.lower())
+    for keyword in keyword_hits["suspicious"]:
+        found.add("suspicious_keywords", keyword)
     
-    text_lower = text.lower()
-    for keyword in suspicious_keywords:
-        if keyword in text_lower and keyword not in extracted["suspicious_keywords"]:
-            extracted["suspicious_keywords"].append(keyword)
-    
-    return extracted
+    return found.to_dict()
+
+def extract_intelligence(text: str, intelligence_store: Dict[str, Any], keyword_hits: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """
+    Merge the intelligence in text into a plain intelligence dict and return
+    the result; the dict passed in is left untouched. Sessions accumulate into
+    an IntelligenceStore instead.
+    """
+    extracted = IntelligenceStore(intelligence_store)
+    extracted.update(extract_artifacts(text, keyword_hits))
+    return extracted.to_dict()
 
 def get_safe_reply() -> str:
     return "Thank you for your message. How can I help you today?"
 
 class HoneypotHandler:
-    def __init__(self):
+    """
+    The message pipeline. The session store, callback delivery, caches and
+    indexes default to the process-wide ones; pass others in to run a handler
+    on its own state. The handler flushes sessions the store evicts through
+    an eviction hook on its session_store.
+    """
+    
+    def __init__(self, stateless: bool = config.STATELESS_SESSIONS,
+                 campaign_fast_path: bool = config.CAMPAIGN_FAST_PATH,
+                 session_store: SessionStore = session_store,
+                 callback_manager: CallbackManager = callback_manager,
+                 callback_dispatcher: CallbackDispatcher = callback_dispatcher,
+                 artifact_index: ArtifactIndex = artifact_index,
+                 metrics: Metrics = metrics,
+                 detection_cache: DetectionCache = detection_cache,
+                 rule_registry: RuleRegistry = rule_registry,
+                 campaigns: CampaignIndex = campaign_index):
         self.session_store = session_store
         self.callback_manager = callback_manager
-    
-    def handle_message(self, request: HoneypotRequest) -> Dict[str, Any]:
-        session_state = self.session_store.get_session(request.sessionId)
+        self.callback_dispatcher = callback_dispatcher
+        self.stateless = stateless
+        self.artifact_index = artifact_index
+        self.metrics = metrics
+        self.detection_cache = detection_cache
+        self.rule_registry = rule_registry
+        self.campaigns = campaigns
+        self.campaign_fast_path = campaign_fast_path
+        self.session_store.add_eviction_hook(self.flush_session)
+    
+    def flush_session(self, session_id: str, session_state: SessionRecord, reason: str) -> None:
+        """Send what a scam session has gathered before the store drops it."""
+        if session_state.scam_detected and not session_state.callback_sent:
+            self.callback_dispatcher.submit(session_id, session_state)
+    
+    def process_message(self, session_state: SessionRecord, sender: str, text: str, timestamp: datetime,
+                        session_id: Optional[str] = None, rules: Optional[CompiledRules] = None,
+                        precomputed: Optional[MessageAnalysis] = None,
+                        replay: bool = False,
+                        stages: Optional[List[Tuple[str, float]]] = None) -> Optional[Dict[str, List[str]]]:
+        """
+        Record one incoming message and run detection and extraction on it.
+        Returns the message's keyword hits once the session is a scam, else None.
+        With a session_id, extracted artifacts also go into the cross-session index.
+        
+        The text-only part of the work comes from the detection cache, so a
+        template sent to many targets is analyzed once; the session's own
+        state (tally, intelligence, counters) is still updated every time.
         
-        session_state.conversation_history.append({
-            "sender": request.message.sender,
-            "text": request.message.text,
-            "timestamp": request.message.timestamp.isoformat()
-        })
-        session_state.total_message_count += 1
+        Every message is also assigned to its near-duplicate campaign. A
+        campaign is marked as a scam once one of its messages is detected as
+        a scam on its own; with campaign_fast_path, a session whose message
+        falls into a campaign marked under the same rules generation is
+        flagged without running detection.
         
+        rules is the request's snapshot of the rule pack (by default, the one
+        in force). Cached analyses made with an older pack are dropped the
+        first time a request on a newer one meets them. precomputed is an
+        analysis of text under rules made elsewhere (see offload.py); it is
+        used, and cached, in place of analyzing text here.
+        
+        A replayed message (rehydrate() rebuilding a session) was counted
+        when the session first took it in: it rebuilds the session's state
+        but is not counted again in the session's counters, its campaign or
+        the artifact index.
+        
+        The detect and extract latencies are appended to stages, for the
+        caller to record with the rest of its request; without stages they
+        are recorded here.
+        """
+        if rules is None:
+            rules = self.rule_registry.current
+        recorded_here = stages is None
+        if recorded_here:
+            stages = []
+        session_state.add_turn(sender, text, timestamp)
+        if not replay:
+            session_state.total_message_count += 1
+        
+        start = perf_counter()
+        campaign = None if replay else self.campaigns.assign(text)
+        compute = (lambda text: precomputed) if precomputed is not None else (lambda text: MessageAnalysis(text, rules))
+        analysis = self.detection_cache.get_or_compute(text, compute)
+        if analysis.rules is not rules:
+            if analysis.rules.generation < rules.generation:
+                self.detection_cache.clear()
+                analysis = self.detection_cache.get_or_compute(text, compute)
+            if analysis.rules is not rules:
+                # Still finishing on the previous pack after a reload
+                analysis = compute(text)
         if not session_state.scam_detected:
-            scam_result = detect_scam(request.message.text, session_state.conversation_history)
-            if scam_result.scamDetected:
+            if self.campaign_fast_path and campaign is not None and campaign.scam_under(rules.generation):
+                detected = True
+                self.metrics.inc("campaign_fast_path_total")
+            else:
+                detected = _with_conversation(analysis.detection, analysis.hits, session_state.history,
+                                              session_state.signal_tally, rules.signal_matcher).scamDetected
+                if campaign is not None and analysis.detection.scamDetected:
+                    campaign.mark_scam(rules.generation)
+            stages.append(("detect", perf_counter() - start))
+            if detected:
                 session_state.scam_detected = True
+                if not replay:
+                    self.metrics.inc("scam_sessions_total")
         
-        if session_state.scam_detected:
-            previous_intel_count = len(session_state.extracted_intelligence)
-            new_intelligence = extract_intelligence(request.message.text, session_state.extracted_intelligence)
-            session_state.extracted_intelligence.update(new_intelligence)
-            
-            if len(session_state.extracted_intelligence) > previous_intel_count:
+        if not session_state.scam_detected:
+            if recorded_here:
+                self.metrics.record(stages)
+            return None
+        
+        start = perf_counter()
+        # One keyword scan serves both extraction and the reply
+        keyword_hits = analysis.keyword_hits
+        artifacts = analysis.artifacts
+        new_intelligence = session_state.extracted_intelligence.update(artifacts)
+        if not replay:
+            if session_id is not None:
+                self.artifact_index.record(session_id, artifacts, to_epoch_ms(timestamp))
+            if new_intelligence:
                 session_state.consecutive_no_new_intel = 0
             else:
                 session_state.consecutive_no_new_intel += 1
-            
-            reply = agent_reply(session_state)
-        else:
-            reply = get_safe_reply()
+        stages.append(("extract", perf_counter() - start))
+        if recorded_here:
+            self.metrics.record(stages)
+        return keyword_hits
+    
+    def rehydrate(self, session_state: SessionRecord, entries: List[Dict[str, Any]],
+                  session_id: Optional[str] = None, rules: Optional[CompiledRules] = None) -> SessionRecord:
+        """
+        Bring a session up to date with the client's conversationHistory.
+        The prefix already processed is recognized by its last turn
+        (SessionRecord.taken_in), so only the new suffix is hashed and run
+        through detection and extraction. If the history does not continue
+        the session (a node that never saw it, or a conversation that
+        diverged from this node's) the session is rebuilt from the whole
+        history. The scammer turns it had already taken in are replayed
+        without being counted again (see process_message), and a final
+        callback already sent stays sent.
+        """
+        processed = session_state.taken_in(entries)
+        replayed = 0
+        if processed is None:
+            replayed = session_state.scammer_turns
+            session_state = SessionRecord(total_message_count=session_state.total_message_count,
+                                          consecutive_no_new_intel=session_state.consecutive_no_new_intel,
+                                          callback_sent=session_state.callback_sent)
+            processed = 0
         
-        self.session_store.update_session(request.sessionId, session_state)
+        for index in range(processed, len(entries)):
+            entry = entries[index]
+            sender = str(entry.get("sender", ""))
+            text = str(entry.get("text", ""))
+            # Our own replies only extend the chain
+            if sender == Sender.SCAMMER.value:
+                self.process_message(session_state, sender, text, parse_timestamp(entry.get("timestamp")), session_id,
+                                     rules, replay=session_state.scammer_turns < replayed)
+            session_state.advance_history(sender, text)
+        return session_state
+    
+    def handle_message(self, request: Union[HoneypotRequest, FastRequest], rules: Optional[CompiledRules] = None,
+                       analysis: Optional[MessageAnalysis] = None) -> Dict[str, Any]:
+        """
+        Process one incoming message. In delta mode the request carries
+        historySeq and/or historyDigest instead of the full history; if they
+        do not match the session, HistoryMismatch is raised and nothing is
+        recorded. In stateless mode a full conversationHistory rebuilds the
+        session, so any node can serve any session.
         
-        if self.session_store.should_stop_session(session_state):
-            self.callback_manager.send_final_callback(request.sessionId, session_state)
+        Each stage's latency goes to self.metrics, in one record() call at
+        the end of the request: session (lookup and history sync), detect and
+        extract (in process_message), reply, store, callback, and total.
+        
+        The session is held with session_store.locked() from lookup to
+        update, so workers sharing a backend never overwrite each other's
+        turns.
+        
+        The whole request runs on one snapshot of the rule pack, so a reload
+        while it is in flight never mixes two packs; rules defaults to the
+        pack in force. analysis, if given, is the message's analysis under
+        rules, already computed (by an offload worker).
+        """
+        if rules is None:
+            rules = self.rule_registry.current
+        metrics = self.metrics
+        metrics.inc("requests_total")
+        start = perf_counter()
+        with self.session_store.locked(request.sessionId):
+            session_state = self.session_store.get_session(request.sessionId)
+            
+            if request.historySeq is not None or request.historyDigest is not None:
+                if ((request.historySeq is not None and request.historySeq != session_state.history_seq) or
+                        (request.historyDigest is not None and request.historyDigest != session_state.history_digest)):
+                    metrics.inc("history_mismatches_total")
+                    raise HistoryMismatch(request.sessionId, session_state.history_seq, session_state.history_digest)
+            elif self.stateless:
+                session_state = self.rehydrate(session_state, request.conversationHistory, request.sessionId, rules)
+            else:
+                session_state.rebase_history(request.conversationHistory)
+            stages = [("session", perf_counter() - start)]
+            
+            keyword_hits = self.process_message(session_state, request.message.sender, request.message.text,
+                                                request.message.timestamp, request.sessionId, rules, analysis,
+                                                stages=stages)
+            mark = perf_counter()
+            if keyword_hits is not None:
+                reply = agent_reply(session_state, keyword_hits, rules)
+            else:
+                reply = get_safe_reply()
+            now = perf_counter()
+            stages.append(("reply", now - mark))
+            
+            mark = now
+            session_state.advance_history(request.message.sender, request.message.text)
+            session_state.advance_history(Sender.USER.value, reply)
+            # Claimed in the saved state, under the lock: of all the workers
+            # sharing the session, one sends its callback, once
+            finished = self.session_store.should_stop_session(session_state) and not session_state.callback_sent
+            if finished:
+                session_state.callback_sent = True
+            self.session_store.update_session(request.sessionId, session_state)
+            now = perf_counter()
+            stages.append(("store", now - mark))
+            
+            if finished:
+                mark = now
+                # Delivered in the background so the response never waits on GUVI
+                if self.callback_dispatcher.submit(request.sessionId, session_state):
+                    metrics.inc("callbacks_queued_total")
+                now = perf_counter()
+                stages.append(("callback", now - mark))
+        stages.append(("total", now - start))
+        metrics.record(stages, ("scam_replies_total",) if keyword_hits is not None else ())
         
         return {
             "reply": reply,
             "scamDetected": session_state.scam_detected,
-            "sessionId": request.sessionId
+            "sessionId": request.sessionId,
+            "historySeq": session_state.history_seq,
+            "historyDigest": session_state.history_digest
         }
@@ -0,0 +1,47 @@
+import hashlib
+from typing import Any, Dict, Iterable
+
+# Digest of an empty conversation
+GENESIS = ""
+
+def chain(digest: str, sender: str, text: str) -> str:
+    """
+    Extend a conversation digest by one turn:
+    blake2b-128(previous digest hex, NUL, sender, NUL, text) as hex.
+    Clients in delta mode compute the same chain over their history.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(digest.encode("ascii"))
+    h.update(b"\0")
+    h.update(sender.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+def history_digest(entries: Iterable[Dict[str, Any]], digest: str = GENESIS) -> str:
+    """Digest of conversationHistory entries, continuing from digest."""
+    for entry in entries:
+        digest = chain(digest, str(entry.get("sender", "")), str(entry.get("text", "")))
+    return digest
+
+class HistoryMismatch(Exception):
+    """
+    A delta-mode request whose historySeq/historyDigest does not match the
+    session. The client should resend the message with its full
+    conversationHistory.
+    """
+
+    def __init__(self, session_id: str, history_seq: int, history_digest: str):
+        super().__init__(f"Conversation history out of sync for session {session_id}")
+        self.session_id = session_id
+        self.history_seq = history_seq
+        self.history_digest = history_digest
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "detail": "Conversation history out of sync; resend the message with the full conversationHistory",
+            "resync": True,
+            "sessionId": self.session_id,
+            "historySeq": self.history_seq,
+            "historyDigest": self.history_digest
+        }
@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+INTELLIGENCE_CATEGORIES = ("upi_ids", "bank_accounts", "phone_numbers", "urls", "emails", "suspicious_keywords")
+
+class IntelligenceStore:
+    """
+    Accumulated intelligence for one session: an insertion-ordered set per
+    category. update() adds a message's artifacts in O(1) per artifact and
+    returns only the ones not seen before.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, data: Optional[Mapping[str, Iterable[str]]] = None):
+        # Categories are created on first use so an idle session stays small
+        self._items: Dict[str, Dict[str, None]] = {}
+        if data:
+            self.update(data)
+
+    def add(self, category: str, item: str) -> bool:
+        """Add one artifact. Returns True if it was new."""
+        items = self._items.get(category)
+        if items is None:
+            items = self._items[category] = {}
+        elif item in items:
+            return False
+        items[item] = None
+        return True
+
+    def update(self, artifacts: Mapping[str, Iterable[str]]) -> Dict[str, List[str]]:
+        """Merge artifacts in. Returns the delta: new items per category, empty categories omitted."""
+        delta: Dict[str, List[str]] = {}
+        for category, found in artifacts.items():
+            added = [item for item in found if self.add(category, item)]
+            if added:
+                delta[category] = added
+        return delta
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """Every category, items in the order they were first seen."""
+        data = {category: list(self._items.get(category, ())) for category in INTELLIGENCE_CATEGORIES}
+        for category, items in self._items.items():
+            if category not in data:
+                data[category] = list(items)
+        return data
+
+    def __getitem__(self, category: str) -> List[str]:
+        return list(self._items.get(category, ()))
+
+    def __contains__(self, category: str) -> bool:
+        return bool(self._items.get(category))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, IntelligenceStore):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"IntelligenceStore({self.to_dict()!r})"
@@ -0,0 +1,74 @@
+from typing import Dict, List, Sequence, Tuple
+
+class KeywordIndex:
+    """
+    Aho-Corasick automaton over several named keyword sets.
+
+    A text is walked once, one dict lookup per character, no matter how many
+    keywords the sets hold. Matching is plain substring matching, the same as
+    `keyword in text`. The index is built once and never mutated afterwards,
+    so a single instance can be shared between threads.
+    """
+
+    def __init__(self, keyword_sets: Dict[str, Sequence[str]]):
+        self.set_names: Tuple[str, ...] = tuple(keyword_sets)
+
+        # Global keyword ids in (set order, keyword order)
+        keywords: List[str] = []
+        keyword_set: List[int] = []
+        for set_index, name in enumerate(self.set_names):
+            for keyword in keyword_sets[name]:
+                keywords.append(keyword)
+                keyword_set.append(set_index)
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        self._keyword_set: Tuple[int, ...] = tuple(keyword_set)
+
+        # Trie
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for keyword_id, keyword in enumerate(keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword_id)
+
+        # Failure links in breadth-first order, folded into a full transition table
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        queue = list(goto[0].values())
+        for state in queue:
+            fallback = fail[state]
+            outputs[state].extend(outputs[fallback])
+            transitions = dict(delta[fallback])
+            transitions.update(goto[state])
+            delta[state] = {char: target for char, target in transitions.items() if target}
+            for char, child in goto[state].items():
+                fail[child] = delta[fallback].get(char, 0)
+                queue.append(child)
+
+        self._delta: Tuple[Dict[str, int], ...] = tuple(delta)
+        self._outputs: Tuple[Tuple[int, ...], ...] = tuple(tuple(sorted(set(ids))) for ids in outputs)
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """Return, per keyword set, the keywords occurring in text, in list order."""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+
+        hits: Dict[str, List[str]] = {name: [] for name in self.set_names}
+        for keyword_id in sorted(found):
+            hits[self.set_names[self._keyword_set[keyword_id]]].append(self.keywords[keyword_id])
+        return hits
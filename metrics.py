@@ -0,0 +1,158 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from config import config
+
+# Stage latency bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+class _Shard:
+    """One thread's counters and histograms. Only its own thread writes to it."""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        # stage -> [count per bucket..., count above the last bucket, sum of seconds]
+        self.histograms: Dict[str, List[float]] = {}
+
+class Metrics:
+    """
+    Request pipeline counters and per-stage latency histograms.
+
+    Every thread writes to its own shard, so recording takes no lock: inc()
+    and observe() are a thread-local lookup, a dict lookup and a list
+    increment. record() takes a whole request's stages and counters in one
+    call, so a request pays for the thread-local lookup and the call once.
+    render() sums the shards into Prometheus text format and adds
+    the collectors registered with register(), which are only evaluated at
+    scrape time.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "honeypot",
+                 enabled: bool = config.METRICS):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.enabled = enabled
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+        # name -> (type, help, collector)
+        self._collectors: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        """Add to a counter. Names are given without the prefix, e.g. "requests_total"."""
+        if self.enabled:
+            try:
+                self._local.shard.counters[name] += amount
+            except (AttributeError, KeyError):
+                counters = self._shard().counters
+                counters[name] = counters.get(name, 0) + amount
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one stage latency."""
+        if self.enabled:
+            try:
+                histogram = self._local.shard.histograms[stage]
+            except (AttributeError, KeyError):
+                histogram = self._shard().histograms.setdefault(stage, [0] * (len(self.buckets) + 2))
+            histogram[bisect_left(self.buckets, seconds)] += 1
+            histogram[-1] += seconds
+
+    def record(self, stages: Iterable[Tuple[str, float]], counters: Iterable[str] = ()) -> None:
+        """Record (stage, seconds) latencies and add one to each named counter."""
+        if not self.enabled:
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        histograms = shard.histograms
+        buckets = self.buckets
+        for stage, seconds in stages:
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histogram = histograms[stage] = [0] * (len(buckets) + 2)
+            histogram[bisect_left(buckets, seconds)] += 1
+            histogram[-1] += seconds
+        counts = shard.counters
+        for name in counters:
+            counts[name] = counts.get(name, 0) + 1
+
+    def register(self, name: str, kind: str, help_text: str, collector: Callable[[], float]) -> None:
+        """Expose a value read at scrape time (kind is "gauge" or "counter")."""
+        with self._lock:
+            self._collectors[name] = (kind, help_text, collector)
+
+    def snapshot(self) -> Tuple[Dict[str, float], Dict[str, List[float]]]:
+        """Counters and histograms summed over every thread."""
+        with self._lock:
+            shards = list(self._shards)
+        counters: Dict[str, float] = {}
+        histograms: Dict[str, List[float]] = {}
+        for shard in shards:
+            # Copies are taken in one step each, so a writing thread cannot
+            # change them mid-iteration
+            for name, value in list(shard.counters.items()):
+                counters[name] = counters.get(name, 0) + value
+            for stage, histogram in list(shard.histograms.items()):
+                histogram = list(histogram)
+                total = histograms.get(stage)
+                if total is None:
+                    histograms[stage] = histogram
+                else:
+                    histograms[stage] = [a + b for a, b in zip(total, histogram)]
+        return counters, histograms
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        counters, histograms = self.snapshot()
+        prefix = self.prefix
+        lines = []
+
+        for name in sorted(counters):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {_number(counters[name])}")
+
+        with self._lock:
+            collectors = sorted(self._collectors.items())
+        for name, (kind, help_text, collector) in collectors:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {_number(collector())}")
+
+        if histograms:
+            family = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {family} Time spent in each stage of the message pipeline")
+            lines.append(f"# TYPE {family} histogram")
+            for stage in sorted(histograms):
+                histogram = histograms[stage]
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram):
+                    cumulative += count
+                    lines.append(f'{family}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                cumulative += histogram[-2]
+                lines.append(f'{family}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+                lines.append(f'{family}_sum{{stage="{stage}"}} {histogram[-1]!r}')
+                lines.append(f'{family}_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+metrics = Metrics()
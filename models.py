@@ -15,8 +15,11 @@ class Metadata(BaseModel):
 class HoneypotRequest(BaseModel):
     sessionId: str
     message: Message
-    conversationHistory: List[Dict[str, Any]]
+    conversationHistory: List[Dict[str, Any]] = []
     metadata: Metadata
+    # Delta mode: sent instead of the full history (see history.py)
+    historySeq: Optional[int] = None
+    historyDigest: Optional[str] = None
 
 class ScamDetectionResult(BaseModel):
     scamDetected: bool
@@ -29,6 +32,7 @@ class SessionState(BaseModel):
     total_message_count: int
     extracted_intelligence: Dict[str, Any]
     consecutive_no_new_intel: int
+    callback_sent: bool = False
 
 class GUVICallbackPayload(BaseModel):
     sessionId: str
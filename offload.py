@@ -0,0 +1,133 @@
+"""
+Message analysis on a process pool, for the async message routes.
+
+Detection and extraction are pure-Python CPU work run on the event loop, so
+a burst of long messages holds up every other request, and threads cannot
+help under the GIL. OffloadPool runs the scans in worker processes that
+load the compiled rules once when they start (the artifact, as any worker
+does; see rules.py). A task carries only the text and the digest of the
+rule pack the request is using; the worker returns the compact result
+(pattern ids, keyword hits, extracted artifacts) and the request rebuilds
+its MessageAnalysis from it. Scoring, sessions and replies stay in the
+serving process.
+
+A message is offloaded when it is long (config.OFFLOAD_MIN_CHARS) or when
+the event loop is backed up, measured by how late a short timer fires
+(config.OFFLOAD_MAX_LAG_MS). Short messages on an idle loop are cheaper to
+analyze in place than to ship to another process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+from handler import MessageAnalysis, extract_artifacts
+from rules import CompiledRules, RulePackError, RuleRegistry, load_rules, rule_registry
+
+logger = logging.getLogger(__name__)
+
+# What a worker sends back: pattern ids, keyword hits, extracted artifacts
+Analysis = Tuple[List[int], Dict[str, List[str]], Dict[str, List[str]]]
+
+# Seconds between event-loop lag samples
+LAG_INTERVAL = 0.005
+
+# Worker process state, set by _init_worker()
+_source: Tuple[str, str] = ("", "")
+_rules: Optional[CompiledRules] = None
+
+def _init_worker(path: str, artifact: str) -> None:
+    global _source, _rules
+    _source = (path, artifact)
+    _rules = load_rules(path, artifact)
+
+def analyze_text(text: str, digest: str) -> Optional[Analysis]:
+    """
+    Worker side: scan text with the rule pack whose digest is given. After a
+    reload the worker loads the pack again; None means it could not get the
+    same rules (the pack changed again since), and the caller analyzes the
+    message itself.
+    """
+    global _rules
+    if _rules is None or _rules.digest != digest:
+        try:
+            _rules = load_rules(*_source)
+        except (RulePackError, OSError):
+            return None
+        if _rules.digest != digest:
+            return None
+    lower = text.lower()
+    keyword_hits = _rules.keyword_index.scan(lower)
+    return _rules.signal_matcher.scan(lower), keyword_hits, extract_artifacts(text, keyword_hits)
+
+class OffloadPool:
+    """
+    Worker processes for analyzing messages off the event loop. Workers are
+    spawned, not forked, so they never inherit the server's threads or locks.
+    start() and stop() run in the app's lifespan.
+    """
+
+    def __init__(self, workers: int = config.OFFLOAD_WORKERS, min_chars: int = config.OFFLOAD_MIN_CHARS,
+                 max_lag_ms: float = config.OFFLOAD_MAX_LAG_MS, registry: RuleRegistry = rule_registry):
+        self.workers = workers
+        self.registry = registry
+        self.min_chars = min_chars
+        self.max_lag = max_lag_ms / 1000
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker, initargs=(registry.path, registry.artifact))
+        # How late the last lag sample fired, in seconds
+        self.lag = 0.0
+        # Tasks sent to the workers and not yet answered
+        self.pending = 0
+        self.offloaded = 0
+        self.fallbacks = 0
+        self._monitor: Optional[asyncio.Task] = None
+
+    def should_offload(self, text: str) -> bool:
+        """
+        Long messages always go to the workers. Others only while the loop is
+        lagging and a worker is free: queueing short messages behind busy
+        workers costs more than analyzing them here.
+        """
+        return len(text) >= self.min_chars or (self.lag >= self.max_lag and self.pending < self.workers)
+
+    async def analyze(self, text: str, rules: CompiledRules) -> MessageAnalysis:
+        """The analysis of text under rules, from a worker; computed here if no worker can provide it."""
+        self.offloaded += 1
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, analyze_text, text, rules.digest)
+        except BrokenProcessPool as e:
+            logger.error(f"Offload pool unavailable, analyzing in process: {e}")
+            result = None
+        finally:
+            self.pending -= 1
+        if result is None:
+            self.fallbacks += 1
+            return MessageAnalysis(text, rules)
+        return MessageAnalysis.precomputed(text, rules, *result)
+
+    async def start(self) -> None:
+        """Start every worker, so no request waits for one to spawn, then begin sampling the loop's lag."""
+        loop = asyncio.get_running_loop()
+        digest = self.registry.current.digest
+        await asyncio.gather(*(loop.run_in_executor(self.executor, analyze_text, "", digest)
+                               for _ in range(self.workers)))
+        self._monitor = asyncio.create_task(self._sample_lag())
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lag = max(loop.time() - start - LAG_INTERVAL, 0.0)
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
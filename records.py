@@ -0,0 +1,217 @@
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional, Union
+from models import SessionState
+from intelligence import IntelligenceStore
+from history import GENESIS, chain, history_digest
+from tally import SignalTally
+from config import config
+
+class Sender(Enum):
+    SCAMMER = "scammer"
+    USER = "user"
+
+_SENDERS = {sender.value: sender for sender in Sender}
+
+def intern_sender(sender: str) -> Union[Sender, str]:
+    """Known senders become shared enum members, anything else an interned string."""
+    return _SENDERS.get(sender) or sys.intern(sender)
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    return int(timestamp.timestamp() * 1000)
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    return datetime.fromtimestamp(epoch_ms / 1000, timezone.utc)
+
+def parse_timestamp(value: Any) -> datetime:
+    """Timestamp of a conversationHistory entry: ISO string or epoch milliseconds, else now."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        return from_epoch_ms(value)
+    return datetime.now(timezone.utc)
+
+@dataclass(slots=True)
+class Turn:
+    sender: Union[Sender, str]
+    text: str
+    timestamp: int  # epoch milliseconds
+
+    @property
+    def sender_name(self) -> str:
+        return self.sender.value if isinstance(self.sender, Sender) else self.sender
+
+def _new_history() -> Deque[Turn]:
+    return deque(maxlen=config.SESSION_HISTORY_TURNS)
+
+@dataclass(slots=True)
+class SessionRecord:
+    """
+    Internal per-session state. Recent turns live in a bounded ring buffer;
+    to_state() converts to the Pydantic SessionState at the API/callback
+    boundary.
+    """
+
+    history: Deque[Turn] = field(default_factory=_new_history)
+    scam_detected: bool = False
+    total_message_count: int = 0
+    extracted_intelligence: IntelligenceStore = field(default_factory=IntelligenceStore)
+    consecutive_no_new_intel: int = 0
+    # Length and chain digest of the whole conversation, both sides, for delta mode
+    history_seq: int = 0
+    history_digest: str = GENESIS
+    # Digest of the last turn on its own, to line a client's history up with the chain
+    history_tail: str = GENESIS
+    # The scammer's turns taken in so far and the digest of the last on its own, to line up
+    # a client's history that does not repeat our replies word for word
+    scammer_turns: int = 0
+    scammer_tail: str = GENESIS
+    # Decayed per-category signal weights of the scammer's turns so far
+    signal_tally: SignalTally = field(default_factory=SignalTally)
+    # Set, and saved with the session, once its final callback has been queued:
+    # whichever worker gets there first sends it, and only once
+    callback_sent: bool = False
+
+    def __post_init__(self):
+        if not isinstance(self.extracted_intelligence, IntelligenceStore):
+            self.extracted_intelligence = IntelligenceStore(self.extracted_intelligence)
+
+    def add_turn(self, sender: str, text: str, timestamp: datetime) -> Turn:
+        turn = Turn(intern_sender(sender), text, to_epoch_ms(timestamp))
+        self.history.append(turn)
+        return turn
+
+    def advance_history(self, sender: str, text: str) -> None:
+        self.history_seq += 1
+        self.history_digest = chain(self.history_digest, sender, text)
+        self.history_tail = chain(GENESIS, sender, text)
+        if sender == Sender.SCAMMER.value:
+            self.scammer_turns += 1
+            self.scammer_tail = self.history_tail
+
+    def continues(self, entries: List[Dict[str, Any]]) -> bool:
+        """
+        Whether the client's conversationHistory starts with the turns chained
+        so far: at least as many entries, and the same turn where the chain
+        ends. Only that one entry is hashed, whatever the history's length.
+        """
+        seq = self.history_seq
+        if seq > len(entries):
+            return False
+        return seq == 0 or history_digest((entries[seq - 1],)) == self.history_tail
+
+    def taken_in(self, entries: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        How many entries of the client's conversationHistory the session has
+        already taken in, or None if the history does not continue it. A
+        history that repeats the chain is lined up by continues(). One that
+        leaves out our replies, or does not repeat them word for word, is
+        lined up by the scammer's own turns: its scammer_turns-th scammer
+        turn has to be the session's last, and the replies after it are
+        already taken in. Only one entry is hashed either way.
+        """
+        if self.continues(entries):
+            return self.history_seq
+        seen = 0
+        for index, entry in enumerate(entries):
+            if entry.get("sender") != Sender.SCAMMER.value:
+                continue
+            seen += 1
+            if seen < self.scammer_turns:
+                continue
+            if history_digest((entry,)) != self.scammer_tail:
+                return None
+            index += 1
+            while index < len(entries) and entries[index].get("sender") != Sender.SCAMMER.value:
+                index += 1
+            return index
+        return None
+
+    def rebase_history(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Take the client's full conversationHistory as the conversation so far.
+        Where it continues the chain, only the entries after it are hashed.
+        """
+        if not self.continues(entries):
+            self.history_seq = len(entries)
+            self.history_digest = history_digest(entries)
+            self.history_tail = history_digest(entries[-1:])
+            scammer = [entry for entry in entries if entry.get("sender") == Sender.SCAMMER.value]
+            self.scammer_turns = len(scammer)
+            self.scammer_tail = history_digest(scammer[-1:])
+            return
+        for index in range(self.history_seq, len(entries)):
+            entry = entries[index]
+            self.advance_history(str(entry.get("sender", "")), str(entry.get("text", "")))
+
+    def last_text(self) -> str:
+        return self.history[-1].text if self.history else ""
+
+    def to_state(self) -> SessionState:
+        return SessionState(
+            conversation_history=[
+                {"sender": turn.sender_name, "text": turn.text, "timestamp": from_epoch_ms(turn.timestamp).isoformat()}
+                for turn in self.history
+            ],
+            scam_detected=self.scam_detected,
+            total_message_count=self.total_message_count,
+            extracted_intelligence=self.extracted_intelligence.to_dict(),
+            consecutive_no_new_intel=self.consecutive_no_new_intel,
+            callback_sent=self.callback_sent
+        )
+
+    @classmethod
+    def from_state(cls, state: SessionState) -> "SessionRecord":
+        record = cls(
+            scam_detected=state.scam_detected,
+            total_message_count=state.total_message_count,
+            extracted_intelligence=state.extracted_intelligence,
+            consecutive_no_new_intel=state.consecutive_no_new_intel,
+            callback_sent=state.callback_sent
+        )
+        for entry in state.conversation_history:
+            record.add_turn(entry.get("sender", ""), entry.get("text", ""), parse_timestamp(entry.get("timestamp")))
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form used by the shared session backends."""
+        return {
+            "h": [[turn.sender_name, turn.text, turn.timestamp] for turn in self.history],
+            "s": self.scam_detected,
+            "n": self.total_message_count,
+            "i": self.extracted_intelligence.to_dict(),
+            "k": self.consecutive_no_new_intel,
+            "q": self.history_seq,
+            "d": self.history_digest,
+            "l": self.history_tail,
+            "a": self.scammer_turns,
+            "e": self.scammer_tail,
+            "t": self.signal_tally.to_list(),
+            "c": self.callback_sent
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionRecord":
+        record = cls(
+            scam_detected=data["s"],
+            total_message_count=data["n"],
+            extracted_intelligence=data["i"],
+            consecutive_no_new_intel=data["k"],
+            history_seq=data.get("q", 0),
+            history_digest=data.get("d", GENESIS),
+            history_tail=data.get("l", GENESIS),
+            scammer_turns=data.get("a", 0),
+            scammer_tail=data.get("e", GENESIS),
+            signal_tally=SignalTally.from_list(data["t"]) if "t" in data else SignalTally(),
+            callback_sent=data.get("c", False)
+        )
+        record.history.extend(Turn(intern_sender(sender), text, timestamp) for sender, text, timestamp in data["h"])
+        return record
@@ -0,0 +1,323 @@
+"""
+Rule packs: the detection vocabularies, keyword sets and reply banks as a
+versioned JSON file (rule_pack.json), compiled into the matchers the
+request path uses.
+
+Compiling a pack builds a SignalMatcher and a KeywordIndex, which is the
+slow part of start-up for large packs, so the compiled rules are pickled
+next to the pack and reused by every worker until the pack changes. The
+artifact is keyed by a digest of the pack's bytes, the matcher classes'
+source and the Python version; a stale, unreadable or missing artifact is
+rebuilt.
+The artifact is trusted local state (it is unpickled), like the pack.
+compile_rules.py builds it ahead of time, e.g. at image build.
+
+rule_registry holds the rules in force. It can be reloaded while serving,
+by watching the pack's mtime or through the admin endpoint, without a
+restart (which would drop in-memory sessions).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from signals import SignalMatcher
+from keywords import KeywordIndex
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Keyword set whose hits extraction records as suspiciousKeywords
+SUSPICIOUS_KEYWORDS = "suspicious"
+
+# Replies are chosen from the first bank whose keyword set the message hits,
+# in the pack's order; this bank is used when none does
+DEFAULT_REPLIES = "default"
+
+class RulePackError(ValueError):
+    """The rule pack is malformed."""
+
+class CompiledRules:
+    """A compiled rule pack: its matchers plus the data they were built from."""
+
+    __slots__ = ("name", "version", "digest", "signal_categories", "signal_requires", "keyword_sets",
+                 "reply_banks", "signal_matcher", "keyword_index", "generation")
+
+    def __init__(self, name: str, version: Any, digest: str,
+                 signal_categories: List[Tuple[str, float, List[str], bool]],
+                 keyword_sets: Dict[str, List[str]], reply_banks: Dict[str, List[str]],
+                 signal_requires: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.version = version
+        self.digest = digest
+        self.signal_categories = signal_categories
+        # Category label -> regex every message its patterns match contains
+        self.signal_requires = signal_requires or {}
+        self.keyword_sets = keyword_sets
+        self.reply_banks = reply_banks
+        self.signal_matcher = SignalMatcher(signal_categories, self.signal_requires)
+        self.keyword_index = KeywordIndex(keyword_sets)
+        # Set by RuleRegistry: 1 for the rules loaded at start-up, +1 per reload
+        self.generation = 0
+
+    def replies_for(self, keyword_hits: Dict[str, List[str]]) -> List[str]:
+        """The reply bank for a message's keyword hits."""
+        for name, replies in self.reply_banks.items():
+            if name != DEFAULT_REPLIES and keyword_hits.get(name):
+                return replies
+        return self.reply_banks[DEFAULT_REPLIES]
+
+def _strings(value: Any, where: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+        raise RulePackError(f"{where} must be a list of non-empty strings")
+    return value
+
+def compile_rule_pack(data: bytes, digest: Optional[str] = None) -> CompiledRules:
+    """Validate a rule pack's JSON and build its matchers."""
+    try:
+        pack = json.loads(data)
+    except ValueError as e:
+        raise RulePackError(f"not valid JSON: {e}") from e
+    if not isinstance(pack, dict):
+        raise RulePackError("a rule pack is a JSON object")
+
+    categories = []
+    requires = {}
+    for i, category in enumerate(pack.get("signals") or []):
+        where = f"signals[{i}]"
+        if not isinstance(category, dict) or not isinstance(category.get("label"), str):
+            raise RulePackError(f"{where} needs a label")
+        weight = category.get("weight")
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+            raise RulePackError(f"{where}.weight must be a non-negative number")
+        categories.append((category["label"], float(weight), _strings(category.get("patterns"), f"{where}.patterns"),
+                           bool(category.get("firstMatchOnly", False))))
+        if "requires" in category:
+            if not isinstance(category["requires"], str) or not category["requires"]:
+                raise RulePackError(f"{where}.requires must be a non-empty pattern")
+            requires[category["label"]] = category["requires"]
+    if not categories:
+        raise RulePackError("signals must list at least one category")
+
+    keyword_sets = pack.get("keywords")
+    if not isinstance(keyword_sets, dict):
+        raise RulePackError("keywords must map set names to keyword lists")
+    keyword_sets = {name: _strings(keywords, f"keywords.{name}") for name, keywords in keyword_sets.items()}
+    if SUSPICIOUS_KEYWORDS not in keyword_sets:
+        raise RulePackError(f'keywords needs a "{SUSPICIOUS_KEYWORDS}" set')
+
+    reply_banks = pack.get("replies")
+    if not isinstance(reply_banks, dict) or DEFAULT_REPLIES not in reply_banks:
+        raise RulePackError(f'replies must map keyword set names, and "{DEFAULT_REPLIES}", to replies')
+    for name, replies in reply_banks.items():
+        if name != DEFAULT_REPLIES and name not in keyword_sets:
+            raise RulePackError(f"replies.{name} has no keyword set")
+        _strings(replies, f"replies.{name}")
+
+    try:
+        return CompiledRules(str(pack.get("name", "")), pack.get("version"), digest or pack_digest(data),
+                             categories, keyword_sets, reply_banks, requires)
+    except Exception as e:  # re.error from a bad pattern, mostly
+        raise RulePackError(f"cannot compile: {e}") from e
+
+def _code_digest() -> bytes:
+    """
+    Digest of the source of every class in a pickled artifact (CompiledRules
+    and its matchers) and the Python version, so an artifact pickled by
+    different code is rebuilt rather than unpickled into classes whose
+    internals have changed.
+    """
+    digest = hashlib.sha256(f"{sys.version_info[0]}.{sys.version_info[1]}".encode())
+    for cls in (CompiledRules, SignalMatcher, KeywordIndex):
+        try:
+            with open(sys.modules[cls.__module__].__file__, "rb") as f:
+                digest.update(f.read())
+        except (OSError, TypeError):
+            digest.update(cls.__qualname__.encode())
+    return digest.digest()
+
+_CODE_DIGEST = _code_digest()
+
+def pack_digest(data: bytes) -> str:
+    """What the compiled artifact of a pack depends on."""
+    digest = hashlib.sha256(data)
+    digest.update(_CODE_DIGEST)
+    return digest.hexdigest()
+
+def artifact_path(pack_path: str) -> str:
+    """Where the compiled artifact of a pack is kept: RULE_ARTIFACT for the configured pack, else beside it."""
+    if config.RULE_ARTIFACT and os.path.abspath(pack_path) == os.path.abspath(config.RULE_PACK):
+        return config.RULE_ARTIFACT
+    return pack_path + ".compiled"
+
+def write_artifact(rules: CompiledRules, path: str) -> None:
+    """Pickle the compiled rules to path, atomically so a concurrent reader never sees half a file."""
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+        # The digest goes first, so a stale artifact is detected without unpickling the matchers
+        pickle.dump(rules.digest, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+
+def read_artifact(path: str, digest: str) -> Optional[CompiledRules]:
+    """The compiled rules stored at path if they were built from a pack with this digest."""
+    try:
+        with open(path, "rb") as f:
+            if pickle.load(f) != digest:
+                return None
+            rules = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable rule artifact {path}: {e}")
+        return None
+    return rules if isinstance(rules, CompiledRules) else None
+
+def load_rules(path: Optional[str] = None, artifact: Optional[str] = None) -> CompiledRules:
+    """
+    The compiled rules for the pack at path, from its artifact when that is
+    current. Otherwise the pack is compiled and the artifact rewritten; if
+    it cannot be written (a read-only filesystem), the rules are still used.
+    """
+    path = path or config.RULE_PACK
+    artifact = artifact or artifact_path(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = pack_digest(data)
+
+    rules = read_artifact(artifact, digest)
+    if rules is not None:
+        return rules
+    rules = compile_rule_pack(data, digest)
+    try:
+        write_artifact(rules, artifact)
+    except OSError as e:
+        logger.warning(f"Could not write rule artifact {artifact}: {e}")
+    return rules
+
+class RuleRegistry:
+    """
+    The rules in force, replaced read-copy-update style.
+
+    The request path reads `current` once per request and uses that
+    snapshot throughout, so a request never mixes two rule packs and never
+    takes a lock. reload() compiles the new rules on the calling thread
+    (the watcher, or a worker thread of the admin endpoint) and publishes
+    them with a single attribute assignment; requests already running keep
+    the rules they started with. Only reloads, and the first load, are
+    serialized.
+    """
+
+    def __init__(self, path: Optional[str] = None, artifact: Optional[str] = None):
+        self.path = path or config.RULE_PACK
+        self.artifact = artifact or artifact_path(self.path)
+        self._reload_lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._current: Optional[CompiledRules] = None
+        self.loaded_at = 0.0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error: Optional[str] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def current(self) -> CompiledRules:
+        """The rules in force; the pack is loaded on first use (see load())."""
+        return self._current or self.load()
+
+    def load(self) -> CompiledRules:
+        """
+        Load the pack if no rules are in force yet, and return the rules in
+        force. Nothing is loaded at construction, so importing this module
+        (compile_rules.py does) reads and compiles nothing.
+        """
+        with self._reload_lock:
+            if self._current is None:
+                self._stat = self._pack_stat()
+                rules = load_rules(self.path, self.artifact)
+                rules.generation = 1
+                self._current = rules
+                self.loaded_at = time.time()
+            return self._current
+
+    def _pack_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the pack again if it changed since the last attempt (or always,
+        with force) and publish it. Returns whether different rules are now
+        in force. A malformed or unreadable pack raises RulePackError or
+        OSError and the current rules stay in force.
+        """
+        # The rules a reload is compared with (and replaces)
+        self.load()
+        with self._reload_lock:
+            stat = self._pack_stat()
+            if not force and stat == self._stat:
+                return False
+            # Recorded before loading, so a broken pack is retried only once it changes again
+            self._stat = stat
+            try:
+                rules = load_rules(self.path, self.artifact)
+            except (RulePackError, OSError) as e:
+                self.reload_errors += 1
+                self.last_error = str(e)
+                raise
+            self.last_error = None
+            current = self._current
+            if rules.digest == current.digest:
+                return False
+            rules.generation = current.generation + 1
+            self._current = rules
+            self.loaded_at = time.time()
+            self.reloads += 1
+            return True
+
+    def watch(self, interval: float = config.RULE_RELOAD_INTERVAL) -> None:
+        """Poll the pack's mtime every interval seconds on a daemon thread and reload on change (0 disables)."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="rule-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                if self.reload():
+                    logger.info(f"Reloaded rule pack {self.path}: {self.current.name} v{self.current.version}")
+            except Exception as e:
+                logger.error(f"Rule pack reload failed, keeping the current rules: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def info(self) -> Dict[str, Any]:
+        rules = self.current
+        return {
+            "name": rules.name,
+            "version": rules.version,
+            "digest": rules.digest,
+            "generation": rules.generation,
+            "loadedAt": self.loaded_at,
+            "reloads": self.reloads,
+            "reloadErrors": self.reload_errors,
+            "lastError": self.last_error
+        }
+
+rule_registry = RuleRegistry()
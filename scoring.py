@@ -0,0 +1,137 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional: only the batch scorer needs it
+    np = None
+
+from signals import SignalMatcher
+from rules import rule_registry
+from config import config
+
+class BatchScores:
+    """
+    Scores for a batch of messages. Hits are kept as a CSR-style sparse
+    matrix: the pattern ids of message i are indices[indptr[i]:indptr[i + 1]],
+    in report order.
+    """
+
+    __slots__ = ("confidence", "scam_detected", "indptr", "indices", "_matcher")
+
+    def __init__(self, confidence: "np.ndarray", scam_detected: "np.ndarray", indptr: "np.ndarray",
+                 indices: "np.ndarray", matcher: SignalMatcher):
+        self.confidence = confidence
+        self.scam_detected = scam_detected
+        self.indptr = indptr
+        self.indices = indices
+        self._matcher = matcher
+
+    def __len__(self) -> int:
+        return len(self.confidence)
+
+    def hits(self, i: int) -> List[int]:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]].tolist()
+
+    def reasons(self, i: int) -> List[str]:
+        """The reasons detect_scam reports for message i."""
+        _, reasons = self._matcher.score(self.hits(i))
+        return reasons or ["No scam indicators detected"]
+
+class BatchScorer:
+    """
+    Vectorized scam scoring for large batches of messages.
+
+    Each message is scanned once with the shared SignalMatcher (repeated
+    texts in a chunk are scanned once) into a sparse hit matrix. Confidences
+    are then the hit matrix times a per-pattern weight vector. The product is
+    taken column by column over hits padded to the widest row, so every
+    message sums its weights in the same order as detect_scam and the result
+    is bit-for-bit the same.
+
+    matcher defaults to the rules in force when the scorer is built.
+    weights overrides category weights by label; threshold defaults to
+    config.SCAM_THRESHOLD, as in detect_scam. Requires numpy.
+    """
+
+    def __init__(
+        self,
+        matcher: Optional[SignalMatcher] = None,
+        weights: Optional[Dict[str, float]] = None,
+        threshold: float = config.SCAM_THRESHOLD,
+        chunk_size: int = 65536
+    ):
+        if np is None:
+            raise ImportError("BatchScorer requires numpy")
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        category_weights = list(matcher.weights)
+        for label, weight in (weights or {}).items():
+            if label not in matcher.labels:
+                raise ValueError(f"Unknown signal category: {label}")
+            category_weights[matcher.labels.index(label)] = weight
+
+        self.matcher = matcher
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.category_weights = category_weights
+        # One weight per pattern id, plus a trailing 0.0 used as padding
+        self.pattern_weights = np.array([category_weights[c] for c in matcher.pattern_category] + [0.0])
+        self._pad = len(matcher.patterns)
+
+    def hit_matrix(self, messages: Iterable[str]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Scan messages into (indptr, indices)."""
+        scan = self.matcher.scan
+        seen: Dict[str, List[int]] = {}
+        indptr = array("q", [0])
+        indices = array("i")
+        for text in messages:
+            hits = seen.get(text)
+            if hits is None:
+                hits = seen[text] = scan(text.lower())
+            indices.extend(hits)
+            indptr.append(len(indices))
+        return np.frombuffer(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32)
+
+    def confidences(self, indptr: "np.ndarray", indices: "np.ndarray") -> "np.ndarray":
+        """Capped confidence per row of a hit matrix."""
+        rows = len(indptr) - 1
+        counts = np.diff(indptr)
+        width = int(counts.max()) if rows else 0
+
+        padded = np.full((rows, width), self._pad, dtype=np.int32)
+        row_of_hit = np.repeat(np.arange(rows), counts)
+        column_of_hit = np.arange(len(indices)) - np.repeat(indptr[:-1], counts)
+        padded[row_of_hit, column_of_hit] = indices
+        weights = self.pattern_weights[padded]
+
+        # Left to right, like detect_scam; adding the 0.0 padding is exact
+        confidence = np.zeros(rows)
+        for column in range(width):
+            confidence += weights[:, column]
+        return np.minimum(confidence, 1.0)
+
+    def score(self, messages: Iterable[str]) -> BatchScores:
+        """Score every message. Work is done in chunks to bound memory."""
+        parts = list(self._score_chunks(messages))
+        if not parts:
+            empty_ptr = np.zeros(1, dtype=np.int64)
+            return BatchScores(np.zeros(0), np.zeros(0, dtype=bool), empty_ptr, np.zeros(0, dtype=np.int32), self.matcher)
+
+        confidence = np.concatenate([part[0] for part in parts])
+        indices = np.concatenate([part[2] for part in parts])
+        offsets = np.cumsum([0] + [len(part[2]) for part in parts[:-1]])
+        indptr = np.concatenate([parts[0][1][:1]] + [part[1][1:] + offset for part, offset in zip(parts, offsets)])
+        return BatchScores(confidence, confidence >= self.threshold, indptr, indices, self.matcher)
+
+    def _score_chunks(self, messages: Iterable[str]) -> Iterator[Tuple["np.ndarray", "np.ndarray", "np.ndarray"]]:
+        chunk: List[str] = []
+        for text in messages:
+            chunk.append(text)
+            if len(chunk) >= self.chunk_size:
+                indptr, indices = self.hit_matrix(chunk)
+                yield self.confidences(indptr, indices), indptr, indices
+                chunk = []
+        if chunk:
+            indptr, indices = self.hit_matrix(chunk)
+            yield self.confidences(indptr, indices), indptr, indices
@@ -0,0 +1,412 @@
+import logging
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from models import HoneypotRequest
+from handler import HoneypotHandler, extract_artifacts, score_messages
+from artifact_index import ArtifactIndex
+from campaigns import CampaignIndex
+from detection_cache import DetectionCache
+from sessions import SessionStore
+from session_backends import MemorySessionBackend
+from offload import OffloadPool
+from stream import ConversationStream
+from history import HistoryMismatch
+from rules import CompiledRules, RulePackError
+from batch import BatchDecoder, encode_results
+from auth import validate_api_key
+from asgi_client import ASGIClient
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from config import config
+import codec
+
+logger = logging.getLogger(__name__)
+
+BATCH_CHUNK = 256
+# Scored batch results are held in memory up to this size, then on disk
+BATCH_SPOOL_BYTES = 4 * 1024 * 1024
+BATCH_READ_BYTES = 64 * 1024
+
+WARMUP_SESSION_ID = "__warmup__"
+WARMUP_REQUEST = {
+    "sessionId": WARMUP_SESSION_ID,
+    "message": {
+        "sender": "scammer",
+        "text": "URGENT: your SBI account will be blocked today. Verify KYC at http://bit.ly/kyc-verify, "
+                "pay the fee to verify@ybl or call +919876543210",
+        "timestamp": "2024-01-01T10:00:00Z"
+    },
+    "conversationHistory": [],
+    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+}
+
+def warmup_handler(handler: HoneypotHandler) -> HoneypotHandler:
+    """
+    A handler for the warm-up conversation: the same rules and callback path
+    as handler, with its own session store, caches, indexes and metrics, so
+    warming up leaves no session, campaign, artifact or counter behind.
+    """
+    return HoneypotHandler(
+        stateless=handler.stateless,
+        campaign_fast_path=handler.campaign_fast_path,
+        session_store=SessionStore(MemorySessionBackend(max_sessions=1, idle_ttl=0)),
+        callback_manager=handler.callback_manager,
+        callback_dispatcher=handler.callback_dispatcher,
+        artifact_index=ArtifactIndex(),
+        metrics=Metrics(),
+        detection_cache=DetectionCache(),
+        rule_registry=handler.rule_registry,
+        campaigns=CampaignIndex()
+    )
+
+def warm_up(handler: HoneypotHandler) -> Dict[str, float]:
+    """
+    Exercise every engine on the request path once so the first real request
+    does not pay for regex compilation, validator setup or thread start-up.
+    Returns the time each step took, in milliseconds.
+    """
+    text = WARMUP_REQUEST["message"]["text"]
+    timings: Dict[str, float] = {}
+
+    def step(name: str, fn: Any) -> None:
+        start = time.perf_counter()
+        fn()
+        timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    rules = handler.rule_registry.current
+    step("signals", lambda: rules.signal_matcher.score(rules.signal_matcher.scan(text.lower())))
+    step("keywords", lambda: rules.keyword_index.scan(text.lower()))
+    step("extraction", lambda: extract_artifacts(text, rules.keyword_index.scan(text.lower())))
+    step("models", lambda: HoneypotRequest(**WARMUP_REQUEST))
+    step("batch", lambda: encode_results(score_messages([text], rules=rules)))
+
+    scratch = warmup_handler(handler)
+    step("handler", lambda: scratch.handle_message(HoneypotRequest(**WARMUP_REQUEST)))
+    step("callbacks", handler.callback_dispatcher.start)
+    return timings
+
+async def warm_up_routes(app: FastAPI) -> float:
+    """
+    Send one request to each honeypot route in-process, so routing, request
+    validation and response serialization are set up before real traffic.
+    The routes are served by a warmup_handler() meanwhile, so the app's own
+    state is untouched; this runs before the app accepts traffic.
+    Returns the time taken, in milliseconds.
+    """
+    client = ASGIClient(app, headers={"x-api-key": config.API_KEY or ""})
+    handler = app.state.handler
+    app.state.handler = warmup_handler(handler)
+    start = time.perf_counter()
+    try:
+        await client.post("/honeypot/message", WARMUP_REQUEST, json_body=True)
+        await client.post("/honeypot/batch", [WARMUP_REQUEST], json_body=True)
+    finally:
+        app.state.handler = handler
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def register_metrics(metrics: Metrics, handler: HoneypotHandler) -> None:
+    """Values read from the handler's components whenever /metrics is scraped."""
+    def scam_rate() -> float:
+        counters, _ = metrics.snapshot()
+        requests = counters.get("requests_total", 0)
+        return counters.get("scam_replies_total", 0) / requests if requests else 0.0
+
+    metrics.register("sessions", "gauge", "Sessions in the session store",
+                     lambda: handler.session_store.stats().get("size", 0))
+    metrics.register("scam_rate", "gauge", "Share of requests answered in scam-engagement mode", scam_rate)
+    metrics.register("callbacks_sent_total", "counter", "Final callbacks accepted by GUVI",
+                     lambda: handler.callback_manager.stats.snapshot()["sent"])
+    metrics.register("callbacks_failed_total", "counter", "Final callback attempts that failed",
+                     lambda: handler.callback_manager.stats.snapshot()["failed"])
+    metrics.register("callback_retries_total", "counter", "Final callback retries",
+                     lambda: handler.callback_manager.stats.snapshot()["retries"])
+    metrics.register("artifact_index_entries", "gauge", "Artifacts in the cross-session index",
+                     lambda: handler.artifact_index.stats()["size"])
+    metrics.register("detection_cache_hits_total", "counter", "Messages answered from the detection cache",
+                     lambda: handler.detection_cache.hits)
+    metrics.register("detection_cache_misses_total", "counter", "Messages analyzed from scratch",
+                     lambda: handler.detection_cache.misses)
+    metrics.register("detection_cache_evictions_total", "counter", "Detection cache entries evicted",
+                     lambda: handler.detection_cache.evictions)
+    metrics.register("campaigns", "gauge", "Near-duplicate message campaigns being tracked",
+                     lambda: len(handler.campaigns.campaigns))
+    metrics.register("campaign_evictions_total", "counter", "Campaigns evicted to stay within the bound",
+                     lambda: handler.campaigns.evictions)
+    metrics.register("rule_reloads_total", "counter", "Rule pack reloads that changed the rules in force",
+                     lambda: handler.rule_registry.reloads)
+    metrics.register("rule_reload_errors_total", "counter", "Rule pack reloads rejected as malformed or unreadable",
+                     lambda: handler.rule_registry.reload_errors)
+
+def _score_chunk(items: List[Any], start: int, rules: CompiledRules) -> bytes:
+    return encode_results(score_messages(items, start, rules))
+
+async def _score_batch(request: Request) -> IO[bytes]:
+    """
+    Decode a batch body as it arrives and score it BATCH_CHUNK items at a
+    time, in the threadpool, so a body of any size holds at most about one
+    chunk of items. Results are spooled (to disk past BATCH_SPOOL_BYTES) and
+    sent once the body is in: most HTTP clients do not read a response
+    until they have finished sending, and answering sooner would deadlock
+    them on a large batch. Every chunk is scored with the app handler's
+    rules in force when the batch starts.
+    """
+    rules = request.app.state.handler.rule_registry.current
+    results = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_BYTES)
+    decoder = BatchDecoder()
+    pending: List[Any] = []
+    start = 0
+    try:
+        async for chunk in request.stream():
+            pending.extend(decoder.feed(chunk))
+            while len(pending) >= BATCH_CHUNK:
+                items, pending = pending[:BATCH_CHUNK], pending[BATCH_CHUNK:]
+                results.write(await run_in_threadpool(_score_chunk, items, start, rules))
+                start += len(items)
+        pending.extend(decoder.close())
+        for offset in range(0, len(pending), BATCH_CHUNK):
+            results.write(await run_in_threadpool(_score_chunk, pending[offset:offset + BATCH_CHUNK], start + offset, rules))
+    except BaseException:
+        results.close()
+        raise
+    results.seek(0)
+    return results
+
+def _read_results(results: IO[bytes]) -> Iterator[bytes]:
+    while True:
+        block = results.read(BATCH_READ_BYTES)
+        if not block:
+            return
+        yield block
+
+async def handle_message_offloaded(app: FastAPI, request: Any) -> Dict[str, Any]:
+    """
+    handler.handle_message(), with the message analyzed on the offload pool
+    when the app has one and the message is long or the event loop is
+    backed up. A message already in the detection cache is not sent. With
+    a blocking session backend, the handler runs on the thread pool.
+    """
+    handler = app.state.handler
+    pool = app.state.offload
+    text = request.message.text
+    if pool is None or not pool.should_offload(text):
+        return await _run_handler(handler, request)
+    rules = handler.rule_registry.current
+    cached = handler.detection_cache.peek(text)
+    if cached is not None and cached.rules is rules:
+        return await _run_handler(handler, request, rules)
+    return await _run_handler(handler, request, rules, await pool.analyze(text, rules))
+
+async def _run_handler(handler: HoneypotHandler, request: Any, *args: Any) -> Dict[str, Any]:
+    # A shared session backend waits on its database or server (and on other
+    # workers' session locks): keep that off the event loop
+    if handler.session_store.blocking:
+        return await run_in_threadpool(handler.handle_message, request, *args)
+    return handler.handle_message(request, *args)
+
+def create_app(
+    handler: Optional[HoneypotHandler] = None,
+    warmup: bool = config.WARMUP,
+    fast_codec: bool = config.FAST_CODEC,
+    offload_workers: int = config.OFFLOAD_WORKERS
+) -> FastAPI:
+    """
+    The production app: the real HoneypotHandler behind /honeypot/message and
+    /honeypot/batch. With warmup, the lifespan startup hook runs warm_up() and
+    warm_up_routes() before the server accepts traffic, and /ready reports 503
+    until startup has finished. With fast_codec, /honeypot/message decodes
+    with codec.parse_request() and answers with pre-encoded bytes.
+    While the app runs, the rule pack is watched for changes and reloaded
+    (every config.RULE_RELOAD_INTERVAL seconds; /admin/rules/reload forces it).
+    With offload_workers, long messages are analyzed on that many worker
+    processes (see offload.py), started before the server accepts traffic.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # A malformed rule pack fails start-up, not the first request
+        app.state.handler.rule_registry.load()
+        if offload_workers > 0:
+            pool = OffloadPool(offload_workers, registry=app.state.handler.rule_registry)
+            await pool.start()
+            app.state.offload = pool
+            metrics = app.state.handler.metrics
+            metrics.register("offloaded_total", "counter", "Messages analyzed on the offload pool",
+                             lambda: pool.offloaded)
+            metrics.register("offload_fallbacks_total", "counter", "Offloaded messages analyzed in process instead",
+                             lambda: pool.fallbacks)
+        if warmup:
+            app.state.warmup = warm_up(app.state.handler)
+            app.state.warmup["routes"] = await warm_up_routes(app)
+            logger.info(f"Warm-up complete: {app.state.warmup}")
+        app.state.handler.rule_registry.watch()
+        app.state.ready = True
+        yield
+        app.state.ready = False
+        app.state.handler.rule_registry.stop()
+        if app.state.offload is not None:
+            await app.state.offload.stop()
+            app.state.offload = None
+        # Give queued final callbacks a chance to go out
+        app.state.handler.callback_dispatcher.stop()
+
+    app = FastAPI(title="Honeypot API", version="1.0.0", lifespan=lifespan)
+    app.state.handler = handler or HoneypotHandler()
+    app.state.ready = False
+    app.state.warmup = {}
+    app.state.offload = None
+    app.state.streams = 0
+    register_metrics(app.state.handler.metrics, app.state.handler)
+    app.state.handler.metrics.register("streams", "gauge", "Open conversation streams", lambda: app.state.streams)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.exception_handler(HistoryMismatch)
+    async def history_mismatch(request: Request, exc: HistoryMismatch):
+        # Delta mode: ask the client for a full resync
+        return JSONResponse(status_code=409, content=exc.to_dict())
+
+    @app.get("/")
+    async def root():
+        return {"status": "running", "message": "Honeypot API is working"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        handler = app.state.handler
+        # The sessions gauge asks the session backend
+        if handler.session_store.blocking:
+            body = await run_in_threadpool(handler.metrics.render)
+        else:
+            body = handler.metrics.render()
+        return PlainTextResponse(body, media_type=METRICS_CONTENT_TYPE)
+
+    @app.get("/ready")
+    async def ready():
+        if not app.state.ready:
+            return JSONResponse(status_code=503, content={"status": "starting"})
+        return {"status": "ready", "warmupMs": app.state.warmup}
+
+    if fast_codec:
+        @app.post("/honeypot/message")
+        async def handle_message_fast(request: Request, api_key: str = Depends(validate_api_key)):
+            parsed, errors = codec.parse_request(await request.body())
+            if errors:
+                return Response(codec.dumps({"detail": errors}), status_code=422, media_type="application/json")
+            try:
+                result = await handle_message_offloaded(app, parsed)
+            except HistoryMismatch:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling message: {e}")
+                raise HTTPException(status_code=500, detail="Internal server error")
+            return Response(codec.encode_response(result), media_type="application/json")
+    else:
+        @app.post("/honeypot/message")
+        async def handle_message(request: HoneypotRequest, api_key: str = Depends(validate_api_key)):
+            try:
+                return await handle_message_offloaded(app, request)
+            except HistoryMismatch:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling message: {e}")
+                raise HTTPException(status_code=500, detail="Internal server error")
+
+    @app.websocket("/honeypot/stream/{session_id}")
+    async def stream_conversation(websocket: WebSocket, session_id: str, channel: str = "SMS",
+                                  language: str = "English", locale: str = "IN",
+                                  api_key: str = Depends(validate_api_key)):
+        """
+        A conversation over one connection (see stream.py): each text frame
+        is a message object, answered by one frame with the
+        /honeypot/message response. Metadata is given once, as query
+        parameters.
+        """
+        await websocket.accept()
+        handler = app.state.handler
+        metadata = codec.RequestMetadata(channel, language, locale)
+        handle = partial(handle_message_offloaded, app)
+        if handler.session_store.blocking:
+            stream = await run_in_threadpool(ConversationStream, handler, session_id, metadata, handle)
+        else:
+            stream = ConversationStream(handler, session_id, metadata, handle)
+        app.state.streams += 1
+        app.state.handler.metrics.inc("streams_opened_total")
+        try:
+            async for frame in websocket.iter_text():
+                try:
+                    answer = await stream.turn(frame)
+                except Exception as e:
+                    logger.error(f"Error handling streamed turn: {e}")
+                    answer = codec.dumps({"error": "internal", "detail": "Internal server error"})
+                await websocket.send_text(answer.decode("utf-8"))
+        finally:
+            app.state.streams -= 1
+
+    @app.get("/intelligence/lookup")
+    async def lookup_artifact(value: str, api_key: str = Depends(validate_api_key)):
+        """Which sessions used a UPI ID, phone number, account, URL or email, and when."""
+        entry = app.state.handler.artifact_index.lookup(value)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Artifact not seen")
+        return entry
+
+    @app.get("/campaigns")
+    async def list_campaigns(limit: int = 20, scam_only: bool = False, api_key: str = Depends(validate_api_key)):
+        """The largest near-duplicate campaigns seen, with their size and a sample message."""
+        return {"campaigns": app.state.handler.campaigns.top(limit, scam_only)}
+
+    @app.get("/campaigns/{campaign_id}")
+    async def get_campaign(campaign_id: int, api_key: str = Depends(validate_api_key)):
+        campaign = app.state.handler.campaigns.get(campaign_id)
+        if campaign is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        return campaign.to_dict()
+
+    @app.get("/admin/rules")
+    async def rules_info(api_key: str = Depends(validate_api_key)):
+        """The rule pack in force and the reload history."""
+        return app.state.handler.rule_registry.info()
+
+    @app.post("/admin/rules/reload")
+    async def reload_rules(force: bool = False, api_key: str = Depends(validate_api_key)):
+        """
+        Reload the rule pack now rather than at the next mtime check. It is
+        compiled on a worker thread; requests keep being served on the
+        current rules until the new ones are published.
+        """
+        registry = app.state.handler.rule_registry
+        try:
+            reloaded = await run_in_threadpool(registry.reload, force)
+        except (RulePackError, OSError) as e:
+            raise HTTPException(status_code=400, detail=f"Rule pack rejected, current rules kept: {e}")
+        return {"reloaded": reloaded, **registry.info()}
+
+    @app.post("/honeypot/batch")
+    async def handle_batch(request: Request, api_key: str = Depends(validate_api_key)):
+        """
+        Score a JSON array or NDJSON stream of messages as the body arrives;
+        results stream back as NDJSON.
+        """
+        results = await _score_batch(request)
+        return StreamingResponse(_read_results(results), media_type="application/x-ndjson",
+                                 background=BackgroundTask(results.close))
+
+    return app
@@ -0,0 +1,563 @@
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+from records import SessionRecord
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Called as hook(session_id, session_state, reason) just before a session is dropped
+EvictionHook = Callable[[str, SessionRecord, str], None]
+
+def _encode(session_state: SessionRecord) -> str:
+    return json.dumps(session_state.to_dict(), separators=(",", ":"))
+
+def _decode(data: Union[str, bytes]) -> SessionRecord:
+    return SessionRecord.from_dict(json.loads(data))
+
+class SessionBackend(ABC):
+    """
+    Storage interface behind SessionStore.
+
+    load() returns None for unknown or expired sessions; save() writes the
+    whole state. A load, change and save of one session is only safe from
+    other workers inside locked(session_id). Backends that drop sessions
+    themselves (TTL, capacity) call the registered eviction hooks first
+    when they can observe it. A hook
+    that is a bound method is held weakly, so registering it does not keep
+    its object alive.
+
+    blocking is true when load() and save() wait on I/O, so async callers
+    run them on a worker thread.
+    """
+
+    name = "base"
+    blocking = True
+
+    def __init__(self):
+        self._eviction_hooks: List[Callable[[], Optional[EvictionHook]]] = []
+
+    def add_eviction_hook(self, hook: EvictionHook) -> None:
+        ref = weakref.WeakMethod(hook) if hasattr(hook, "__self__") else (lambda: hook)
+        if hook not in self._live_hooks():
+            self._eviction_hooks.append(ref)
+
+    def _live_hooks(self) -> List[EvictionHook]:
+        hooks = [ref() for ref in self._eviction_hooks]
+        if None in hooks:
+            self._eviction_hooks = [ref for ref, hook in zip(self._eviction_hooks, hooks) if hook is not None]
+        return [hook for hook in hooks if hook is not None]
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        """The session's state, or None if it is unknown or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, session_state: SessionRecord) -> None:
+        """Write the session's whole state."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> Optional[SessionRecord]:
+        """Drop the session without running eviction hooks; returns its state, if it had one."""
+
+    @contextmanager
+    def locked(self, session_id: str) -> Iterator[None]:
+        """Hold session_id exclusively while it is loaded, changed and saved. Re-entrant."""
+        yield
+
+    def expire(self) -> int:
+        """Drop idle sessions now. Returns how many were dropped."""
+        return 0
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """size, max_sessions, idle_ttl, evictions and expirations (None where the backend cannot tell)."""
+
+    def _run_hooks(self, dropped: List[Tuple[str, SessionRecord, str]]) -> None:
+        if not dropped:
+            return
+        hooks = self._live_hooks()
+        for session_id, session_state, reason in dropped:
+            for hook in hooks:
+                try:
+                    hook(session_id, session_state, reason)
+                except Exception as e:
+                    logger.error(f"Eviction hook failed for session {session_id}: {e}")
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Process-local sessions with idle TTL expiry and an LRU cap.
+
+    Sessions idle for longer than idle_ttl seconds expire, and once more than
+    max_sessions are live the least recently used one is evicted.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(
+        self,
+        max_sessions: int = config.MAX_SESSIONS,
+        idle_ttl: float = config.SESSION_IDLE_TTL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        super().__init__()
+        # Ordered from least to most recently used
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self._last_seen: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        # Sessions hash onto a fixed set of locks for locked()
+        self._session_locks = [threading.RLock() for _ in range(64)]
+        self.evictions = 0
+        self.expirations = 0
+
+    @contextmanager
+    def locked(self, session_id: str) -> Iterator[None]:
+        with self._session_locks[hash(session_id) % len(self._session_locks)]:
+            yield
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            now = self.clock()
+            dropped = self._expire(now)
+            session_state = self.sessions.get(session_id)
+            if session_state is not None:
+                self.sessions.move_to_end(session_id)
+                self._last_seen[session_id] = now
+        self._run_hooks(dropped)
+        return session_state
+
+    def save(self, session_id: str, session_state: SessionRecord) -> None:
+        with self._lock:
+            self.sessions[session_id] = session_state
+            self.sessions.move_to_end(session_id)
+            self._last_seen[session_id] = self.clock()
+            dropped = self._enforce_capacity()
+        self._run_hooks(dropped)
+
+    def delete(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            self._last_seen.pop(session_id, None)
+            return self.sessions.pop(session_id, None)
+
+    def expire(self) -> int:
+        with self._lock:
+            dropped = self._expire(self.clock())
+        self._run_hooks(dropped)
+        return len(dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl": self.idle_ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+    def _expire(self, now: float) -> List[Tuple[str, SessionRecord, str]]:
+        # Recency order is also last-seen order, so expired sessions sit at the front
+        dropped = []
+        if self.idle_ttl <= 0:
+            return dropped
+        while self.sessions:
+            session_id = next(iter(self.sessions))
+            if now - self._last_seen[session_id] < self.idle_ttl:
+                break
+            dropped.append((session_id, self.sessions.pop(session_id), "expired"))
+            del self._last_seen[session_id]
+            self.expirations += 1
+        return dropped
+
+    def _enforce_capacity(self) -> List[Tuple[str, SessionRecord, str]]:
+        # The session being saved was just moved to the end, so it is never the victim
+        dropped = []
+        while self.max_sessions > 0 and len(self.sessions) > self.max_sessions:
+            session_id, session_state = self.sessions.popitem(last=False)
+            del self._last_seen[session_id]
+            dropped.append((session_id, session_state, "evicted"))
+            self.evictions += 1
+        return dropped
+
+class SharedSessionBackend(SessionBackend):
+    """
+    A backend shared by worker processes. locked() takes a lease on the
+    session in the store, lock_ttl seconds long so a crashed worker cannot
+    hold a session forever, and the store is only touched by the lease
+    itself and the load() and save() inside it, so other sessions are never
+    held up. Threads of one process queue on an in-process lock first; a
+    lease held by another process is polled for, backing off from 1 ms to
+    50 ms, for up to lock_ttl seconds.
+
+    Subclasses implement _acquire(session_id, token) and
+    _release(session_id, token).
+    """
+
+    def __init__(self, lock_ttl: float = 10.0):
+        super().__init__()
+        self.lock_ttl = lock_ttl
+        self._session_locks = [threading.RLock() for _ in range(64)]
+        # Session ids this thread holds the lease of
+        self._held = threading.local()
+
+    @contextmanager
+    def locked(self, session_id: str) -> Iterator[None]:
+        held = self._held.__dict__.setdefault("ids", set())
+        if session_id in held:
+            yield
+            return
+        with self._session_locks[hash(session_id) % len(self._session_locks)]:
+            token = uuid.uuid4().hex
+            deadline = time.monotonic() + self.lock_ttl
+            delay = 0.001
+            while not self._acquire(session_id, token):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Session {session_id} is still locked by another worker")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+            held.add(session_id)
+            try:
+                yield
+            finally:
+                held.discard(session_id)
+                self._release(session_id, token)
+
+    @abstractmethod
+    def _acquire(self, session_id: str, token: str) -> bool:
+        """Take the lease on session_id for token if no one holds it. Returns whether it was taken."""
+
+    @abstractmethod
+    def _release(self, session_id: str, token: str) -> None:
+        """Give the lease up, if token still holds it."""
+
+class SQLiteSessionBackend(SharedSessionBackend):
+    """
+    Sessions in a SQLite database in WAL mode, shared by every worker process
+    on the host. Expiry and the capacity cap are enforced by a sweep that runs
+    at most once per sweep_interval seconds per process. Leases are rows of
+    a session_locks table; every statement commits on its own, so the
+    database's single writer lock is only held for one statement at a time.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str = config.SESSION_SQLITE_PATH,
+        max_sessions: int = config.MAX_SESSIONS,
+        idle_ttl: float = config.SESSION_IDLE_TTL,
+        clock: Callable[[], float] = time.time,
+        sweep_interval: float = 1.0,
+        lock_ttl: float = 10.0
+    ):
+        super().__init__(lock_ttl)
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Wall-clock time, so every process agrees on idle times
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self.evictions = 0
+        self.expirations = 0
+
+        db = self._db()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks ("
+            "session_id TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _acquire(self, session_id: str, token: str) -> bool:
+        # Takes a free session, or one whose lease has run out
+        now = self.clock()
+        row = self._db().execute(
+            "INSERT INTO session_locks (session_id, token, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+            "WHERE session_locks.expires_at <= ? RETURNING token",
+            (session_id, token, now + self.lock_ttl, now)
+        ).fetchone()
+        return row is not None
+
+    def _release(self, session_id: str, token: str) -> None:
+        self._db().execute("DELETE FROM session_locks WHERE session_id = ? AND token = ?", (session_id, token))
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        self._maybe_sweep()
+        row = self._db().execute(
+            "SELECT state, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self.idle_ttl > 0 and self.clock() - row[1] >= self.idle_ttl:
+            self._maybe_sweep(force=True)
+            return None
+        return _decode(row[0])
+
+    def save(self, session_id: str, session_state: SessionRecord) -> None:
+        self._db().execute(
+            "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, _encode(session_state), self.clock())
+        )
+        self._maybe_sweep()
+
+    def delete(self, session_id: str) -> Optional[SessionRecord]:
+        row = self._db().execute(
+            "DELETE FROM sessions WHERE session_id = ? RETURNING state", (session_id,)
+        ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def expire(self) -> int:
+        return self._maybe_sweep(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        size = self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "size": size,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+    def _maybe_sweep(self, force: bool = False) -> int:
+        now = self.clock()
+        with self._sweep_lock:
+            if not force and now < self._next_sweep:
+                return 0
+            self._next_sweep = now + self.sweep_interval
+
+        db = self._db()
+        dropped = []
+        if self.idle_ttl > 0:
+            rows = db.execute(
+                "DELETE FROM sessions WHERE updated_at <= ? RETURNING session_id, state",
+                (now - self.idle_ttl,)
+            ).fetchall()
+            dropped += [(session_id, _decode(state), "expired") for session_id, state in rows]
+            self.expirations += len(rows)
+        if self.max_sessions > 0:
+            rows = db.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?"
+                ") RETURNING session_id, state",
+                (self.max_sessions,)
+            ).fetchall()
+            dropped += [(session_id, _decode(state), "evicted") for session_id, state in rows]
+            self.evictions += len(rows)
+        # Leases left behind by workers that died holding them
+        db.execute("DELETE FROM session_locks WHERE expires_at <= ?", (now,))
+
+        self._run_hooks(dropped)
+        return len(dropped)
+
+class RedisClient:
+    """Minimal RESP2 client: one connection per thread, commands return decoded replies."""
+
+    def __init__(self, url: str = config.REDIS_URL, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def execute(self, *args: Any) -> Any:
+        return self.pipeline(args)[0]
+
+    def pipeline(self, *commands: Sequence[Any]) -> List[Any]:
+        """Send several commands in one round trip; returns their replies in order."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+        try:
+            return self._roundtrip(conn, commands)
+        except (OSError, ConnectionError):
+            # Reconnect once if the server closed an idle connection
+            self._local.conn = None
+            conn = self._connect()
+            return self._roundtrip(conn, commands)
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        self._local.conn = conn
+        if self.password:
+            self._roundtrip(conn, [("AUTH", self.password)])
+        if self.db:
+            self._roundtrip(conn, [("SELECT", self.db)])
+        return conn
+
+    def _roundtrip(self, conn: Tuple[socket.socket, Any], commands: Sequence[Sequence[Any]]) -> List[Any]:
+        sock, reader = conn
+        parts = []
+        for args in commands:
+            parts.append(b"*%d\r\n" % len(args))
+            for arg in args:
+                data = arg if isinstance(arg, bytes) else str(arg).encode()
+                parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        sock.sendall(b"".join(parts))
+        # Every reply is read before an error is raised, so the connection stays in step
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(self._read_reply(reader))
+            except RuntimeError as e:
+                replies.append(None)
+                error = error or e
+        if error is not None:
+            raise error
+        return replies
+
+    def _read_reply(self, reader: Any) -> Any:
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {body.decode()}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+class RedisSessionBackend(SharedSessionBackend):
+    """
+    Sessions in Redis (or anything speaking its protocol), shared by every
+    worker and container. Idle expiry uses the server's key TTL; capacity is
+    left to the server's maxmemory policy, and eviction hooks do not run
+    because the server drops keys on its own.
+
+    Beside the sessions, a sorted set (index_key) holds every session id
+    scored by when it expires, so stats() counts live sessions without
+    scanning the keyspace. A session the server evicts for memory stays
+    counted until its idle TTL would have run out.
+
+    A lease is a lock key (SET NX with a PX lease), released only by the
+    worker still holding it, checked under WATCH.
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = config.REDIS_URL,
+        idle_ttl: float = config.SESSION_IDLE_TTL,
+        key_prefix: str = "honeypot:session:",
+        client: Optional[RedisClient] = None,
+        lock_prefix: str = "honeypot:lock:",
+        lock_ttl: float = 10.0,
+        index_key: str = "honeypot:sessions"
+    ):
+        super().__init__(lock_ttl)
+        self.client = client or RedisClient(url)
+        self.idle_ttl = idle_ttl
+        self.key_prefix = key_prefix
+        self.lock_prefix = lock_prefix
+        self.index_key = index_key
+
+    def _acquire(self, session_id: str, token: str) -> bool:
+        key = self.lock_prefix + session_id
+        return self.client.execute("SET", key, token, "PX", max(1, int(self.lock_ttl * 1000)), "NX") is not None
+
+    def _release(self, session_id: str, token: str) -> None:
+        # The lease may have lapsed and the lock gone to another worker: only delete our own
+        key = self.lock_prefix + session_id
+        self.client.execute("WATCH", key)
+        if self.client.execute("GET", key) != token.encode():
+            self.client.execute("UNWATCH")
+            return
+        self.client.pipeline(("MULTI",), ("DEL", key), ("EXEC",))
+
+    def _expires_at(self) -> str:
+        return repr(time.time() + self.idle_ttl) if self.idle_ttl > 0 else "+inf"
+
+    def load(self, session_id: str) -> Optional[SessionRecord]:
+        key = self.key_prefix + session_id
+        data = self.client.execute("GET", key)
+        if data is None:
+            return None
+        if self.idle_ttl > 0:
+            # Reading a session counts as activity
+            self.client.pipeline(("EXPIRE", key, max(1, int(self.idle_ttl))),
+                                 ("ZADD", self.index_key, self._expires_at(), session_id))
+        return _decode(data)
+
+    def save(self, session_id: str, session_state: SessionRecord) -> None:
+        args = ["SET", self.key_prefix + session_id, _encode(session_state)]
+        if self.idle_ttl > 0:
+            args += ["EX", max(1, int(self.idle_ttl))]
+        self.client.pipeline(args, ("ZADD", self.index_key, self._expires_at(), session_id))
+
+    def delete(self, session_id: str) -> Optional[SessionRecord]:
+        session_state = self.load(session_id)
+        self.client.pipeline(("DEL", self.key_prefix + session_id), ("ZREM", self.index_key, session_id))
+        return session_state
+
+    def stats(self) -> Dict[str, Any]:
+        _, size = self.client.pipeline(("ZREMRANGEBYSCORE", self.index_key, "-inf", repr(time.time())),
+                                       ("ZCARD", self.index_key))
+        return {
+            "size": size,
+            "max_sessions": None,
+            "idle_ttl": self.idle_ttl,
+            "evictions": None,
+            "expirations": None
+        }
+
+def create_backend(kind: str = config.SESSION_BACKEND, **options: Any) -> SessionBackend:
+    """Build the session backend named by SESSION_BACKEND (memory, sqlite or redis)."""
+    backends = {
+        "memory": MemorySessionBackend,
+        "sqlite": SQLiteSessionBackend,
+        "redis": RedisSessionBackend
+    }
+    if kind not in backends:
+        raise ValueError(f"Unknown session backend: {kind}")
+    return backends[kind](**options)
@@ -1,25 +1,67 @@
-from typing import Dict
-from models import SessionState
+from typing import Any, ContextManager, Dict, Optional
+from records import SessionRecord
+from config import config
+from session_backends import SessionBackend, EvictionHook, create_backend
 
 class SessionStore:
-    def __init__(self):
-        self.sessions: Dict[str, SessionState] = {}
-    
-    def get_session(self, session_id: str) -> SessionState:
-        if session_id not in self.sessions:
-            self.sessions[session_id] = SessionState(
-                conversation_history=[],
-                scam_detected=False,
-                total_message_count=0,
-                extracted_intelligence={},
-                consecutive_no_new_intel=0
-            )
-        return self.sessions[session_id]
-    
-    def update_session(self, session_id: str, session_state: SessionState) -> None:
-        self.sessions[session_id] = session_state
-    
-    def should_stop_session(self, session_state: SessionState) -> bool:
+    """
+    Session lookup in front of a pluggable SessionBackend.
+
+    The default in-memory backend is process-local; set SESSION_BACKEND to
+    sqlite or redis to share sessions between workers and containers.
+    Backend options (max_sessions, idle_ttl, clock, ...) are passed through
+    when no backend is given.
+    """
+
+    def __init__(self, backend: Optional[SessionBackend] = None, **backend_options: Any):
+        self.backend = backend or create_backend(config.SESSION_BACKEND, **backend_options)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def blocking(self) -> bool:
+        """Whether session lookups wait on I/O (see SessionBackend)."""
+        return self.backend.blocking
+
+    def add_eviction_hook(self, hook: EvictionHook) -> None:
+        self.backend.add_eviction_hook(hook)
+
+    def get_session(self, session_id: str) -> SessionRecord:
+        session_state = self.backend.load(session_id)
+        if session_state is None:
+            self.misses += 1
+            session_state = SessionRecord()
+            self.backend.save(session_id, session_state)
+        else:
+            self.hits += 1
+        return session_state
+
+    def update_session(self, session_id: str, session_state: SessionRecord) -> None:
+        self.backend.save(session_id, session_state)
+
+    def locked(self, session_id: str) -> ContextManager[None]:
+        """
+        Hold a session against other workers sharing the backend: get it,
+        change it and update it inside, so neither overwrites the other.
+        """
+        return self.backend.locked(session_id)
+
+    def remove_session(self, session_id: str) -> Optional[SessionRecord]:
+        """Drop a session without running eviction hooks."""
+        return self.backend.delete(session_id)
+
+    def expire_sessions(self) -> int:
+        """Expire every idle session now. Returns how many were dropped."""
+        return self.backend.expire()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"backend": self.backend.name}
+        stats.update(self.backend.stats())
+        stats["hits"] = self.hits
+        stats["misses"] = self.misses
+        return stats
+
+    def should_stop_session(self, session_state: SessionRecord) -> bool:
         return (
             session_state.total_message_count >= 15 or
             session_state.consecutive_no_new_intel >= 3
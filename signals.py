@@ -0,0 +1,160 @@
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+_WORD_CHAR_RE = re.compile(r'\w')
+_BOUNDED_RE = re.compile(r'^\\b(.*)\\b$', re.DOTALL)
+
+
+def _expand_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Expand a word-bounded pattern such as r'\\bu?pi\\b' into the literal
+    strings it can match ("upi", "pi"). Returns None when the pattern uses
+    anything beyond plain characters, escaped punctuation and single-character
+    '?' optionals, in which case it has to be run as a regex.
+    """
+    bounded = _BOUNDED_RE.match(pattern)
+    if not bounded:
+        return None
+
+    body = bounded.group(1)
+    alternatives = [""]
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\":
+            if i + 1 >= len(body) or body[i + 1].isalnum():
+                return None
+            char = body[i + 1]
+            i += 1
+        elif char in ".^$*+{}[]|()?":
+            return None
+        i += 1
+
+        if i < len(body) and body[i] == "?":
+            alternatives = [alt + char for alt in alternatives] + alternatives
+            i += 1
+        else:
+            alternatives = [alt + char for alt in alternatives]
+
+    literals = []
+    for literal in alternatives:
+        # \b only behaves like a plain token boundary when the literal starts
+        # and ends with a word character
+        if not literal or not _WORD_CHAR_RE.match(literal[0]) or not _WORD_CHAR_RE.match(literal[-1]):
+            return None
+        literals.append(literal)
+    return literals
+
+
+class SignalMatcher:
+    """
+    Precompiled scam signal matcher.
+
+    Word-bounded literal patterns are indexed by their first word, so a
+    message is tokenized once and each token costs a single dict lookup.
+    Patterns that are real regexes (the phone request patterns) are compiled
+    once. A category can declare in requires a regex that every message its
+    patterns match contains (the pack's "requires" field); its regexes are
+    only searched in messages where that cheap prefilter matches.
+    Results are identical to running re.search for every pattern in order.
+
+    A matcher pickles without its compiled regexes (see rules.py): an
+    unpickled one compiles each regex the first time a scan reaches it, so
+    loading a large rule pack does not wait on the regex compiler.
+    """
+
+    def __init__(self, categories: Sequence[Tuple[str, float, Sequence[str], bool]],
+                 requires: Optional[Mapping[str, str]] = None):
+        # Flat pattern table, indexed by pattern id in report order
+        self.labels: List[str] = []
+        self.weights: List[float] = []
+        self.patterns: List[str] = []
+        self.pattern_category: List[int] = []
+        self.category_first_only: List[bool] = []
+
+        # first word -> [(literal, pattern ids)]
+        self._literal_index: Dict[str, List[Tuple[str, Tuple[int, ...]]]] = {}
+        # (category, prefilter, [(pattern id, pattern)]) for non-literal patterns
+        self._regex_groups: List[Tuple[int, Optional["re.Pattern[str]"], List[Tuple[int, str]]]] = []
+        # pattern id -> compiled regex
+        self._compiled: Dict[int, "re.Pattern[str]"] = {}
+
+        literal_ids: Dict[str, List[int]] = {}
+        for category, (label, weight, patterns, first_only) in enumerate(categories):
+            self.labels.append(label)
+            self.weights.append(weight)
+            self.category_first_only.append(first_only)
+
+            regexes = []
+            for pattern in patterns:
+                pattern_id = len(self.patterns)
+                self.patterns.append(pattern)
+                self.pattern_category.append(category)
+
+                literals = None if first_only else _expand_literals(pattern)
+                if literals is None:
+                    self._compiled[pattern_id] = re.compile(pattern)
+                    regexes.append((pattern_id, pattern))
+                    continue
+                for literal in literals:
+                    ids = literal_ids.setdefault(literal, [])
+                    if pattern_id not in ids:
+                        ids.append(pattern_id)
+            if regexes:
+                prefilter = (requires or {}).get(label)
+                self._regex_groups.append((category, re.compile(prefilter) if prefilter else None, regexes))
+
+        for literal, ids in literal_ids.items():
+            first_word = _WORD_RE.match(literal).group(0)
+            self._literal_index.setdefault(first_word, []).append((literal, tuple(ids)))
+        # The category labels in order, shared by every tally built on this matcher (see tally.py)
+        self.layout: Tuple[str, ...] = tuple(self.labels)
+
+    def scan(self, message_lower: str) -> List[int]:
+        """Return the ids of all patterns matching the lowercased message, in report order."""
+        hits = set()
+        index = self._literal_index
+
+        for token in _WORD_RE.finditer(message_lower):
+            candidates = index.get(token.group(0))
+            if candidates is None:
+                continue
+            start = token.start()
+            for literal, ids in candidates:
+                end = start + len(literal)
+                if not message_lower.startswith(literal, start):
+                    continue
+                if end < len(message_lower) and _WORD_CHAR_RE.match(message_lower, end):
+                    continue
+                hits.update(ids)
+
+        compiled = self._compiled
+        for category, prefilter, regexes in self._regex_groups:
+            if prefilter is not None and not prefilter.search(message_lower):
+                continue
+            for pattern_id, pattern in regexes:
+                regex = compiled.get(pattern_id)
+                if regex is None:
+                    regex = compiled[pattern_id] = re.compile(pattern)
+                if regex.search(message_lower):
+                    hits.add(pattern_id)
+                    if self.category_first_only[category]:
+                        break
+
+        return sorted(hits)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_compiled"] = {}
+        return state
+
+    def score(self, hits: Sequence[int]) -> Tuple[float, List[str]]:
+        """Accumulate confidence and reasons for the given pattern ids, in report order."""
+        reasons = []
+        confidence = 0.0
+        for pattern_id in hits:
+            category = self.pattern_category[pattern_id]
+            reasons.append(f"{self.labels[category]}: {self.patterns[pattern_id]}")
+            confidence += self.weights[category]
+        return confidence, reasons
@@ -0,0 +1,64 @@
+"""
+Long-lived honeypot conversations over one connection: the
+/honeypot/stream/{session_id} WebSocket in server.py.
+
+Over POST /honeypot/message every turn carries the whole envelope: headers,
+session id, metadata and, outside delta mode, the entire
+conversationHistory. A stream sends those once, when it opens; each turn is
+then just the message object and each answer the handle_message() result.
+The stream keeps the session's historySeq and historyDigest and sends them
+with every turn, so the session runs in delta mode (see history.py) and its
+history is never resent or rebuilt.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Union
+
+import codec
+from codec import FastRequest, RequestMetadata
+from handler import HoneypotHandler
+from history import HistoryMismatch
+
+class ConversationStream:
+    """
+    One connection's side of a conversation. handle runs a request through
+    the handler pipeline (in server.py, with the offload pool when the app
+    has one). Frames in and out are JSON; an answer is either a
+    handle_message() result or an object with an "error" field.
+    """
+
+    def __init__(self, handler: HoneypotHandler, session_id: str, metadata: RequestMetadata,
+                 handle: Callable[[FastRequest], Awaitable[Dict[str, Any]]]):
+        self.session_id = session_id
+        self.metadata = metadata
+        self.handle = handle
+        # A stream joining a conversation already under way picks it up where it is.
+        # Held like a turn: a new session created here must not overwrite one
+        # another worker saves at the same time
+        with handler.session_store.locked(session_id):
+            session_state = handler.session_store.get_session(session_id)
+        self.history_seq = session_state.history_seq
+        self.history_digest = session_state.history_digest
+        self.turns = 0
+
+    async def turn(self, frame: Union[bytes, str]) -> bytes:
+        """Handle one turn frame; returns the frame to send back."""
+        message, errors = codec.parse_turn(frame)
+        if errors:
+            return codec.dumps({"error": "invalid_turn", "detail": errors})
+
+        request = FastRequest(self.session_id, message, [], self.metadata, self.history_seq, self.history_digest)
+        try:
+            result = await self.handle(request)
+        except HistoryMismatch as e:
+            # Another client (a POST, another stream) moved the session on: follow it
+            self.history_seq, self.history_digest = e.history_seq, e.history_digest
+            return codec.dumps({
+                "error": "history_mismatch",
+                "detail": "The session was advanced by another client; the turn was not recorded, send it again",
+                "historySeq": e.history_seq,
+                "historyDigest": e.history_digest
+            })
+        self.history_seq = result["historySeq"]
+        self.history_digest = result["historyDigest"]
+        self.turns += 1
+        return codec.encode_response(result)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GUVI callback endpoint, used by the callback tests
+and benchmarks.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubCallbackServer:
+    """
+    Threaded HTTP server that records payloads and replies with scripted
+    statuses. With record=False it only counts them, for long soaks.
+    """
+
+    def __init__(self, statuses=None, delay=0.0, record=True):
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.record = record
+        self.received = []
+        self.count = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Write status, headers and body as one segment on keep-alive connections
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stub.delay)
+                with stub._lock:
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                    stub.count += 1
+                    if stub.record:
+                        stub.received.append((status, json.loads(body)))
+                self.send_response(status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/callback"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Redis server, speaking enough of RESP2 (PING, AUTH,
+SELECT, GET, SET [EX|PX] [NX], DEL, EXPIRE, TTL, SCAN, DBSIZE, FLUSHDB,
+ZADD, ZREM, ZCARD, ZREMRANGEBYSCORE, and WATCH/UNWATCH/MULTI/EXEC
+transactions) for the session backend tests and benchmarks.
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class StubRedisServer:
+    """Threaded in-memory RESP server with key expiry."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        # Sorted sets, as member -> score; they never expire
+        self.zsets = {}
+        # Bumped whenever a key changes, for WATCH
+        self.versions = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                # This connection's WATCHed key versions, and its queued commands inside MULTI
+                self.watched = {}
+                self.queued = None
+                while True:
+                    command = self.read_command()
+                    if command is None:
+                        return
+                    self.wfile.write(self.transact(command))
+
+            def transact(self, command):
+                name = command[0].upper()
+                if name == b"WATCH":
+                    with stub.lock:
+                        for key in command[1:]:
+                            stub._alive(key)
+                            self.watched[key] = stub.versions.get(key, 0)
+                    return b"+OK\r\n"
+                if name == b"UNWATCH":
+                    self.watched = {}
+                    return b"+OK\r\n"
+                if name == b"MULTI":
+                    self.queued = []
+                    return b"+OK\r\n"
+                if name == b"EXEC":
+                    queued, self.queued = self.queued or [], None
+                    watched, self.watched = self.watched, {}
+                    with stub.lock:
+                        for key in watched:
+                            stub._alive(key)
+                        if any(stub.versions.get(key, 0) != version for key, version in watched.items()):
+                            return b"*-1\r\n"
+                        replies = [stub.execute(queued_command, locked=True) for queued_command in queued]
+                    return b"*%d\r\n" % len(replies) + b"".join(replies)
+                if self.queued is not None:
+                    self.queued.append(command)
+                    return b"+QUEUED\r\n"
+                return stub.execute(command)
+
+            def read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                count = int(line[1:-2])
+                args = []
+                for _ in range(count):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                return args
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.url = f"redis://127.0.0.1:{self.server.server_address[1]}/0"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and time.monotonic() >= deadline:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+            self._touch(key)
+        return key in self.data
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def execute(self, args, locked=False):
+        if locked:
+            return self._execute(args)
+        with self.lock:
+            return self._execute(args)
+
+    def _execute(self, args):
+        name = args[0].upper()
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT", b"FLUSHDB"):
+            if name == b"FLUSHDB":
+                self.data.clear()
+                self.expires.clear()
+                self.zsets.clear()
+            return b"+OK\r\n"
+        if name == b"GET":
+            if not self._alive(args[1]):
+                return b"$-1\r\n"
+            value = self.data[args[1]]
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            options = [arg.upper() for arg in args[3:]]
+            if b"NX" in options and self._alive(args[1]):
+                return b"$-1\r\n"
+            self.data[args[1]] = args[2]
+            self.expires.pop(args[1], None)
+            self._touch(args[1])
+            for unit, scale in ((b"EX", 1), (b"PX", 1000)):
+                if unit in options:
+                    seconds = float(args[3 + options.index(unit) + 1]) / scale
+                    self.expires[args[1]] = time.monotonic() + seconds
+            return b"+OK\r\n"
+        if name == b"DEL":
+            removed = 0
+            for key in args[1:]:
+                if self._alive(key):
+                    del self.data[key]
+                    self.expires.pop(key, None)
+                    self._touch(key)
+                    removed += 1
+            return b":%d\r\n" % removed
+        if name == b"EXPIRE":
+            if not self._alive(args[1]):
+                return b":0\r\n"
+            self.expires[args[1]] = time.monotonic() + float(args[2])
+            self._touch(args[1])
+            return b":1\r\n"
+        if name == b"TTL":
+            if not self._alive(args[1]):
+                return b":-2\r\n"
+            deadline = self.expires.get(args[1])
+            return b":%d\r\n" % (-1 if deadline is None else int(deadline - time.monotonic()))
+        if name == b"DBSIZE":
+            return b":%d\r\n" % sum(1 for key in list(self.data) if self._alive(key))
+        if name == b"SCAN":
+            pattern = b"*"
+            if b"MATCH" in [arg.upper() for arg in args]:
+                pattern = args[[arg.upper() for arg in args].index(b"MATCH") + 1]
+            keys = [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern.decode())]
+            reply = [b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys)]
+            reply += [b"$%d\r\n%s\r\n" % (len(key), key) for key in keys]
+            return b"".join(reply)
+        if name == b"ZADD":
+            zset = self.zsets.setdefault(args[1], {})
+            added = 0
+            for score, member in zip(args[2::2], args[3::2]):
+                added += member not in zset
+                zset[member] = float(score)
+            return b":%d\r\n" % added
+        if name == b"ZREM":
+            zset = self.zsets.get(args[1], {})
+            return b":%d\r\n" % sum(zset.pop(member, None) is not None for member in args[2:])
+        if name == b"ZCARD":
+            return b":%d\r\n" % len(self.zsets.get(args[1], {}))
+        if name == b"ZREMRANGEBYSCORE":
+            zset = self.zsets.get(args[1], {})
+            low, high = float(args[2]), float(args[3])
+            removed = [member for member, score in zset.items() if low <= score <= high]
+            for member in removed:
+                del zset[member]
+            return b":%d\r\n" % len(removed)
+        return b"-ERR unknown command '%s'\r\n" % name
@@ -0,0 +1,152 @@
+from collections import deque
+from typing import Any, Deque, Iterable, List, Optional, Sequence, Tuple
+
+from signals import SignalMatcher
+from rules import rule_registry
+from config import config
+
+# Per-turn contributions kept for the reasons breakdown
+RECENT_TURNS = 8
+
+class SignalTally:
+    """
+    Running per-category signal weights for one conversation.
+
+    Each scammer turn decays the totals by config.SIGNAL_DECAY and adds the
+    weights of the categories that turn hit, so the conversation-level
+    confidence costs O(new message) per turn instead of a rescan of the
+    history. A category counts at most once (its own weight), so the
+    conversation score rises when different kinds of signal arrive across
+    turns, not when one mild phrase is repeated.
+
+    Totals are kept by category position, with the category labels they
+    were built under. After a rule reload changes the categories, the
+    totals are carried over by label: a category that is still there keeps
+    its total, a removed one is dropped and a new one starts at zero.
+    """
+
+    __slots__ = ("totals", "turn", "recent", "labels")
+
+    def __init__(
+        self,
+        totals: Optional[List[float]] = None,
+        turn: int = 0,
+        recent: Iterable[Tuple[int, List[float]]] = (),
+        matcher: Optional[SignalMatcher] = None,
+        labels: Optional[Sequence[str]] = None
+    ):
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        if totals is None:
+            totals, labels = [0.0] * len(matcher.labels), matcher.layout
+        self.totals = list(totals)
+        # None for tallies stored before labels were kept: taken to be the current layout if the sizes agree
+        self.labels: Optional[Tuple[str, ...]] = tuple(labels) if labels is not None else None
+        self.turn = turn
+        self.recent: Deque[Tuple[int, List[float]]] = deque(
+            ((n, list(weights)) for n, weights in recent), maxlen=RECENT_TURNS
+        )
+
+    @classmethod
+    def from_history(cls, history: Iterable[Any], matcher: Optional[SignalMatcher] = None) -> "SignalTally":
+        """Fold the scammer turns of a history (Turn records or dicts) into a new tally."""
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        tally = cls(matcher=matcher)
+        for entry in history:
+            if isinstance(entry, dict):
+                sender, text = entry.get("sender"), entry.get("text")
+            else:
+                sender, text = getattr(entry, "sender_name", None), getattr(entry, "text", None)
+            if sender == "scammer" and isinstance(text, str):
+                tally.fold(matcher.scan(text.lower()), matcher)
+        return tally
+
+    def fold(self, hits: Sequence[int], matcher: Optional[SignalMatcher] = None,
+             decay: float = config.SIGNAL_DECAY) -> List[float]:
+        """
+        Add one turn's pattern hits; returns that turn's weight per category.
+        A tally started under a rule pack with other categories (before a
+        reload) is first carried over to the matcher's.
+        """
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        self._align(matcher)
+        turn_weights = [0.0] * len(self.totals)
+        for pattern_id in hits:
+            category = matcher.pattern_category[pattern_id]
+            turn_weights[category] += matcher.weights[category]
+
+        self.totals = [total * decay + weight for total, weight in zip(self.totals, turn_weights)]
+        self.turn += 1
+        if any(turn_weights):
+            self.recent.append((self.turn, turn_weights))
+        return turn_weights
+
+    def _align(self, matcher: SignalMatcher) -> None:
+        layout = matcher.layout
+        if self.labels is layout:
+            return
+        if self.labels is None:
+            if len(self.totals) != len(layout):
+                # Built under some other layout that was not recorded: start over
+                self.totals = [0.0] * len(layout)
+                self.recent.clear()
+        elif self.labels != layout:
+            positions = {label: i for i, label in enumerate(self.labels)}
+
+            def carry(values: List[float]) -> List[float]:
+                return [values[positions[label]] if label in positions else 0.0 for label in layout]
+
+            self.totals = carry(self.totals)
+            recent = ((n, carry(weights)) for n, weights in self.recent)
+            self.recent = deque(((n, weights) for n, weights in recent if any(weights)), maxlen=RECENT_TURNS)
+        # Equal labels read back from storage are swapped for the matcher's shared tuple
+        self.labels = layout
+
+    def confidence(self, matcher: Optional[SignalMatcher] = None) -> float:
+        """Conversation-level confidence: each category's decayed total, capped at its weight."""
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        self._align(matcher)
+        confidence = 0.0
+        for total, weight in zip(self.totals, matcher.weights):
+            confidence += min(total, weight)
+        return min(confidence, 1.0)
+
+    def spans_turns(self) -> bool:
+        """Whether any earlier turn still contributes."""
+        return bool(self.recent) and self.recent[0][0] < self.turn
+
+    def reasons(self, matcher: Optional[SignalMatcher] = None, decay: float = config.SIGNAL_DECAY) -> List[str]:
+        """Per-turn breakdown: what each recent turn added and what is left of it now."""
+        if matcher is None:
+            matcher = rule_registry.current.signal_matcher
+        self._align(matcher)
+        reasons = []
+        for n, turn_weights in self.recent:
+            factor = decay ** (self.turn - n)
+            for category, weight in enumerate(turn_weights):
+                if weight:
+                    reasons.append(
+                        f"Conversation turn {n}: {matcher.labels[category]} +{weight:.2f} (now {weight * factor:.2f})"
+                    )
+        reasons.append(f"Conversation confidence: {self.confidence(matcher):.2f}")
+        return reasons
+
+    def to_list(self) -> List[Any]:
+        """Compact form for SessionRecord.to_dict()."""
+        return [self.totals, self.turn, [[n, weights] for n, weights in self.recent], self.labels]
+
+    @classmethod
+    def from_list(cls, data: List[Any]) -> "SignalTally":
+        totals, turn, recent, *labels = data
+        return cls(totals, turn, recent, labels=labels[0] if labels else None)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SignalTally):
+            return NotImplemented
+        return self.to_list() == other.to_list()
+
+    def __repr__(self) -> str:
+        return f"SignalTally(turn={self.turn}, totals={self.totals})"
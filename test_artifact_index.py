@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the cross-session artifact index: sessions are recorded as messages
+are processed, lookups normalize their query, cold artifacts are evicted,
+and /intelligence/lookup serves it.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from artifact_index import ArtifactIndex
+from server import create_app
+from asgi_client import ASGIClient, run
+from test_helpers import make_handler, send
+
+SCAM = "URGENT: your account will be blocked. Pay to Fraud@ybl or call +91 98765 43210"
+
+
+def test_sessions_are_indexed():
+    handler = make_handler(artifact_index=ArtifactIndex(max_entries=100, max_sessions=10))
+    send(handler, "a", SCAM, 0)
+    send(handler, "b", SCAM, 5)
+    send(handler, "a", "Pay to fraud@ybl", 9)
+
+    entry = handler.artifact_index.lookup("FRAUD@ybl ")
+    assert entry["category"] == "upi_ids"
+    assert entry["sessionIds"] == ["b", "a"]
+    assert entry["sightings"] == 3
+    assert entry["firstSeen"] == 1704103200000
+    assert entry["lastSeen"] == 1704103200000 + 9 * 60000
+
+    # Any way of writing the number finds it
+    for number in ("+91-9876543210", "9876543210", "09876543210", "+91 98765 43210", "919876543210"):
+        entry = handler.artifact_index.lookup(number)
+        assert entry["value"] == "+919876543210" and entry["sessionIds"] == ["a", "b"]
+    assert handler.artifact_index.lookup("urgent") is None
+
+
+def test_bounded_memory():
+    index = ArtifactIndex(max_entries=3, max_sessions=2)
+    for i in range(5):
+        index.record(f"s{i}", {"upi_ids": [f"u{i}@ybl", "shared@ybl"]}, i)
+    assert index.stats()["size"] == 3
+    assert index.lookup("u0@ybl") is None
+    assert index.lookup("u4@ybl") is not None
+    assert index.lookup("shared@ybl")["sessionIds"] == ["s3", "s4"]
+
+
+def test_lookup_endpoint():
+    handler = make_handler(artifact_index=ArtifactIndex(max_entries=100, max_sessions=10))
+    app = create_app(handler, warmup=True)
+    client = ASGIClient(app, headers={"x-api-key": "test-key-12345"})
+
+    async def scenario():
+        async with client.lifespan():
+            send(handler, "endpoint", SCAM, 0)
+            found = await client.get("/intelligence/lookup?value=fraud%40ybl")
+            missing = await client.get("/intelligence/lookup?value=nobody%40ybl")
+            return found, missing
+
+    found, missing = run(scenario())
+    assert found.status_code == 200 and found.json()["sessionIds"] == ["endpoint"]
+    assert missing.status_code == 404
+    # The warm-up conversation is not left in the index
+    assert handler.artifact_index.lookup("verify@ybl") is None
+
+
+if __name__ == "__main__":
+    test_sessions_are_indexed()
+    print("✓ PASS sessions are indexed")
+    test_bounded_memory()
+    print("✓ PASS memory is bounded")
+    test_lookup_endpoint()
+    print("✓ PASS lookup endpoint")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the single-pass artifact scanner: each span is classified once (UPI vs
+email, mobile vs landline vs international vs account), values are
+normalized, offsets point back into the text, and extract_artifacts()
+groups the result into intelligence categories.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from artifacts import scan_artifacts, UPI, EMAIL, MOBILE, LANDLINE, INTERNATIONAL, ACCOUNT, URL
+from handler import extract_artifacts
+
+
+def kinds(text):
+    return [(artifact.kind, artifact.value) for artifact in scan_artifacts(text)]
+
+
+def test_handles():
+    assert kinds("Pay fraud@ybl or mail John.Doe@Gmail.com.") == [(UPI, "fraud@ybl"), (EMAIL, "john.doe@gmail.com")]
+    # The number in a UPI ID is not also a phone number
+    assert kinds("Send to 9876543210@paytm now") == [(UPI, "9876543210@paytm")]
+    assert kinds("ravi.9876543210@okaxis") == [(UPI, "ravi.9876543210@okaxis")]
+
+
+def test_numbers():
+    # Every way of writing an Indian mobile comes out as +91XXXXXXXXXX
+    assert kinds("Call 9876543210, +91 98765 43210, 0-9876543210, 919876543210 or +91 987 654 3210") == [
+        (MOBILE, "+919876543210")
+    ] * 5
+    assert kinds("Office 01123456789, US +14155552671") == [(LANDLINE, "01123456789"), (INTERNATIONAL, "+14155552671")]
+    # International numbers written in groups
+    assert kinds("UK +44 20 7946 0958, US +1-202-555-0123, FR +33 1 23 45 67 89.") == [
+        (INTERNATIONAL, "+442079460958"), (INTERNATIONAL, "+12025550123"), (INTERNATIONAL, "+33123456789")
+    ]
+    assert kinds("Call +44 20 7946 0958 9876543210") == [(INTERNATIONAL, "+442079460958"), (MOBILE, "+919876543210")]
+    # STD code set apart: a landline, even where the digits alone would read as a mobile
+    assert kinds("Call 022-12345678, 080 12345678, 0120-1234567 or 04872 123456") == [
+        (LANDLINE, "02212345678"), (LANDLINE, "08012345678"), (LANDLINE, "01201234567"), (LANDLINE, "04872123456")
+    ]
+    assert kinds("Ring 022-123456789 or 0-9876543210") == [(MOBILE, "+919876543210")]
+    # A digit run is a phone number or an account, never both
+    assert kinds("A/c 1234567890123456 or 5876543210") == [(ACCOUNT, "1234567890123456"), (ACCOUNT, "5876543210")]
+    assert kinds("OTP 123456, ref a9876543210, id 12345678901234567890") == []
+
+
+def test_urls_and_offsets():
+    text = "Visit HTTP://bit.ly/kyc. Then pay fraud@ybl"
+    artifacts = scan_artifacts(text)
+    assert [(artifact.kind, artifact.value) for artifact in artifacts] == [(URL, "HTTP://bit.ly/kyc"), (UPI, "fraud@ybl")]
+    for artifact in artifacts:
+        assert text[artifact.start:artifact.end].lower() == artifact.value.lower()
+
+
+def test_extract_artifacts_groups_by_category():
+    artifacts = extract_artifacts("Pay a@ybl, mail a@bank.com, call 9876543210 or 01123456789, see http://x.in/a")
+    assert artifacts["upi_ids"] == ["a@ybl"]
+    assert artifacts["emails"] == ["a@bank.com"]
+    assert artifacts["phone_numbers"] == ["+919876543210", "01123456789"]
+    assert artifacts["bank_accounts"] == []
+    assert artifacts["urls"] == ["http://x.in/a"]
+
+
+if __name__ == "__main__":
+    test_handles()
+    print("✓ PASS UPI IDs and emails")
+    test_numbers()
+    print("✓ PASS phone numbers and accounts")
+    test_urls_and_offsets()
+    print("✓ PASS URLs and offsets")
+    test_extract_artifacts_groups_by_category()
+    print("✓ PASS extract_artifacts groups by category")
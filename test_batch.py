@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test bulk scoring: the batch decoder (JSON array and NDJSON, fed in
+arbitrary chunks), handler.score_messages, and POST /honeypot/batch, which
+scores the body while it is still arriving.
+"""
+
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from batch import BatchDecoder, BatchError, decode_batch
+from handler import score_messages, detect_scam, extract_artifacts
+from app import app
+from asgi_client import ASGIClient, run
+import server
+from server import BATCH_CHUNK
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+MESSAGES = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+MESSAGES += [test["message"] for test in EDGE_CASES]
+
+
+def test_decoder_handles_any_chunking():
+    items = [{"id": i, "text": text} for i, text in enumerate(MESSAGES)]
+    for body in (json.dumps(items).encode(), "".join(json.dumps(item) + "\n" for item in items).encode()):
+        for size in (1, 7, 64, len(body)):
+            decoder = BatchDecoder()
+            decoded = []
+            for offset in range(0, len(body), size):
+                decoded += decoder.feed(body[offset:offset + size])
+            decoded += decoder.close()
+            assert decoded == items
+
+
+def test_decoder_reports_bad_items():
+    decoded = decode_batch(b'"ok"\n{not json}\n"also ok"')
+    assert decoded[0] == "ok" and decoded[2] == "also ok"
+    assert isinstance(decoded[1], BatchError)
+    assert isinstance(decode_batch(b'["ok", ')[-1], BatchError)
+
+
+def test_score_messages_matches_single_path():
+    items = [{"id": f"m{i}", "text": text} for i, text in enumerate(MESSAGES)]
+    results = list(score_messages(items))
+    assert [result["index"] for result in results] == list(range(len(MESSAGES)))
+    for text, result in zip(MESSAGES, results):
+        detection = detect_scam(text, [])
+        assert result["scamDetected"] == detection.scamDetected
+        assert result["confidence"] == detection.confidence
+        assert result["reasons"] == detection.reasons
+        assert result["extractedIntelligence"] == extract_artifacts(text)
+
+    request_shaped = {"sessionId": "s1", "message": {"sender": "scammer", "text": MESSAGES[0]}}
+    assert next(score_messages([request_shaped]))["id"] == "s1"
+    assert "error" in next(score_messages([42]))
+
+
+def test_batch_endpoint_streams_ndjson():
+    client = ASGIClient(app)
+    response = run(client.post("/honeypot/batch", MESSAGES, json_body=True))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.ndjson() == list(score_messages(MESSAGES))
+
+    body = "".join(json.dumps({"text": text}) + "\n" for text in MESSAGES[:3]).encode()
+    chunks = [body[offset:offset + 10] for offset in range(0, len(body), 10)]
+    response = run(client.post("/honeypot/batch", chunks, headers={"content-type": "application/x-ndjson"}))
+    assert [result["index"] for result in response.ndjson()] == [0, 1, 2]
+
+
+def test_batch_endpoint_scores_while_reading():
+    events = []
+    texts = [MESSAGES[i % len(MESSAGES)] for i in range(4 * BATCH_CHUNK)]
+
+    def body():
+        for offset in range(0, len(texts), 64):
+            events.append("read")
+            yield "".join(json.dumps({"text": text}) + "\n" for text in texts[offset:offset + 64]).encode()
+
+    def recording_score(items, start, rules):
+        events.append("scored")
+        return score_chunk(items, start, rules)
+
+    async def recording_app(scope, receive, send):
+        async def recording_send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                events.append("sent")
+            await send(message)
+        await app(scope, receive, recording_send)
+
+    score_chunk = server._score_chunk
+    server._score_chunk = recording_score
+    try:
+        response = run(ASGIClient(recording_app).post("/honeypot/batch", body(),
+                                                       headers={"content-type": "application/x-ndjson"}))
+    finally:
+        server._score_chunk = score_chunk
+    assert [result["index"] for result in response.ndjson()] == list(range(len(texts)))
+    # The first chunk was scored once its share of the body was in (the client reads one
+    # piece ahead to know whether more follow), not after all of it
+    assert events.index("scored") == BATCH_CHUNK // 64 + 1
+    assert events.count("scored") == 4
+    # Results go out only after the whole body, for clients that send before they read
+    assert events.index("sent") > max(i for i, event in enumerate(events) if event == "read")
+
+
+if __name__ == "__main__":
+    test_decoder_handles_any_chunking()
+    print("✓ PASS decoder handles any chunking")
+    test_decoder_reports_bad_items()
+    print("✓ PASS decoder reports bad items")
+    test_score_messages_matches_single_path()
+    print("✓ PASS score_messages matches single path")
+    test_batch_endpoint_streams_ndjson()
+    print("✓ PASS batch endpoint streams NDJSON")
+    test_batch_endpoint_scores_while_reading()
+    print("✓ PASS batch endpoint scores while reading")
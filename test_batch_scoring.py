@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized BatchScorer: bit-for-bit agreement with detect_scam on
+the test_data corpus, configurable weights and threshold, and chunking.
+Needs numpy (requirements-extras.txt); skipped without it.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from scoring import BatchScorer
+from handler import detect_scam
+from test_data import TEST_SCENARIOS, EDGE_CASES, generate_conversation_test
+
+MESSAGES = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+MESSAGES += [test["message"] for test in EDGE_CASES]
+MESSAGES += [step["message"] for step in generate_conversation_test()]
+MESSAGES += ["", "hello", "call 9876543210 for help, urgent payment to bank"]
+
+
+def test_matches_detect_scam_exactly():
+    # A small chunk size also exercises stitching chunks back together
+    for chunk_size in (7, 65536):
+        scores = BatchScorer(chunk_size=chunk_size).score(MESSAGES)
+        assert len(scores) == len(MESSAGES)
+        for i, text in enumerate(MESSAGES):
+            expected = detect_scam(text, [])
+            assert scores.confidence[i] == expected.confidence, (text, scores.confidence[i], expected.confidence)
+            assert bool(scores.scam_detected[i]) == expected.scamDetected
+            assert scores.reasons(i) == expected.reasons
+
+
+def test_weights_and_threshold():
+    text = "URGENT: pay now"
+    default = BatchScorer().score([text])
+    assert default.confidence[0] == 0.5 and default.scam_detected[0]
+
+    scorer = BatchScorer(weights={"Urgency language": 0.05}, threshold=0.5)
+    scores = scorer.score([text])
+    assert scores.confidence[0] == 0.05 + 0.25
+    assert not scores.scam_detected[0]
+
+    try:
+        BatchScorer(weights={"Nonexistent": 1.0})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert len(BatchScorer().score([])) == 0
+
+
+if __name__ == "__main__":
+    test_matches_detect_scam_exactly()
+    print("✓ PASS matches detect_scam exactly")
+    test_weights_and_threshold()
+    print("✓ PASS weights and threshold")
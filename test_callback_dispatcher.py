@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the background callback dispatcher against a local stub of the GUVI
+callback endpoint: delivery, retries with backoff, dead-lettering, that
+submit() never waits on the network, and that stop() lets queued callbacks
+go out first.
+"""
+
+import json
+import tempfile
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from callback import CallbackManager
+from dispatcher import CallbackDispatcher
+from models import SessionState
+from stub_callback_server import StubCallbackServer
+
+
+def make_state():
+    return SessionState(
+        conversation_history=[],
+        scam_detected=True,
+        total_message_count=15,
+        extracted_intelligence={"upi_ids": ["scammer@upi"]},
+        consecutive_no_new_intel=0
+    )
+
+
+def make_dispatcher(stub, dead_letter_path, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    return CallbackDispatcher(manager=CallbackManager(url=stub.url), workers=2,
+                              dead_letter_path=dead_letter_path, **kwargs)
+
+
+def test_delivers_and_dedupes():
+    stub = StubCallbackServer()
+    with tempfile.TemporaryDirectory() as tmp:
+        dispatcher = make_dispatcher(stub, os.path.join(tmp, "dead.jsonl"))
+        assert dispatcher.submit("session-1", make_state())
+        # Still in flight
+        assert not dispatcher.submit("session-1", make_state())
+        assert dispatcher.join(5)
+        dispatcher.stop()
+    stub.close()
+
+    assert len(stub.received) == 1
+    assert stub.received[0][1]["sessionId"] == "session-1"
+    assert stub.received[0][1]["extractedIntelligence"] == {"upi_ids": ["scammer@upi"]}
+
+
+def test_retries_server_errors():
+    stub = StubCallbackServer(statuses=[503, 500, 200])
+    with tempfile.TemporaryDirectory() as tmp:
+        dead_letter_path = os.path.join(tmp, "dead.jsonl")
+        dispatcher = make_dispatcher(stub, dead_letter_path)
+        dispatcher.submit("session-2", make_state())
+        assert dispatcher.join(5)
+        dispatcher.stop()
+        assert not os.path.exists(dead_letter_path)
+    stub.close()
+
+    assert [status for status, _ in stub.received] == [503, 500, 200]
+    stats = dispatcher.manager.stats.snapshot()
+    assert (stats["sent"], stats["failed"], stats["retries"]) == (1, 2, 2)
+
+
+def test_dead_letters_after_retries():
+    stub = StubCallbackServer(statuses=[503] * 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        dead_letter_path = os.path.join(tmp, "dead.jsonl")
+        dispatcher = make_dispatcher(stub, dead_letter_path, max_retries=2)
+        dispatcher.submit("session-3", make_state())
+        assert dispatcher.join(5)
+        dispatcher.stop()
+        with open(dead_letter_path) as f:
+            records = [json.loads(line) for line in f]
+    stub.close()
+
+    assert len(stub.received) == 3
+    assert len(records) == 1
+    assert records[0]["attempts"] == 3
+    assert records[0]["error"] == "HTTP 503"
+    assert records[0]["payload"]["sessionId"] == "session-3"
+
+
+def test_submit_does_not_wait_for_slow_endpoint():
+    stub = StubCallbackServer(delay=0.5)
+    with tempfile.TemporaryDirectory() as tmp:
+        dispatcher = make_dispatcher(stub, os.path.join(tmp, "dead.jsonl"))
+        dispatcher.start()
+        start = time.perf_counter()
+        for i in range(4):
+            dispatcher.submit(f"slow-{i}", make_state())
+        elapsed = time.perf_counter() - start
+        assert dispatcher.join(5)
+        dispatcher.stop()
+    stub.close()
+
+    assert elapsed < 0.1
+    assert len(stub.received) == 4
+
+
+def test_stop_flushes_queued_callbacks():
+    stub = StubCallbackServer(delay=0.1)
+    with tempfile.TemporaryDirectory() as tmp:
+        dead_letter_path = os.path.join(tmp, "dead.jsonl")
+        dispatcher = make_dispatcher(stub, dead_letter_path)
+        for i in range(3):
+            dispatcher.submit(f"stop-{i}", make_state())
+        # Straight to stop(), as the app's lifespan does on shutdown
+        dispatcher.stop()
+        assert not os.path.exists(dead_letter_path)
+    stub.close()
+
+    assert sorted(payload["sessionId"] for _, payload in stub.received) == ["stop-0", "stop-1", "stop-2"]
+
+
+if __name__ == "__main__":
+    test_delivers_and_dedupes()
+    print("✓ PASS delivers and dedupes")
+    test_retries_server_errors()
+    print("✓ PASS retries server errors")
+    test_dead_letters_after_retries()
+    print("✓ PASS dead-letters after retries")
+    test_submit_does_not_wait_for_slow_endpoint()
+    print("✓ PASS submit does not wait for slow endpoint")
+    test_stop_flushes_queued_callbacks()
+    print("✓ PASS stop flushes queued callbacks")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test CallbackManager connection reuse and counters against
+a local stub of the GUVI callback endpoint.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from callback import CallbackManager
+from models import SessionState
+from stub_callback_server import StubCallbackServer
+
+
+def make_state(count=15):
+    return SessionState(
+        conversation_history=[],
+        scam_detected=True,
+        total_message_count=count,
+        extracted_intelligence={},
+        consecutive_no_new_intel=3
+    )
+
+
+def test_reuses_connections():
+    stub = StubCallbackServer()
+    manager = CallbackManager(url=stub.url)
+    states = [make_state() for _ in range(20)]
+    for i, state in enumerate(states):
+        assert manager.send_final_callback(f"pooled-{i}", state)
+    assert not manager.send_final_callback("pooled-0", states[0])
+    stub.close()
+
+    assert len(stub.received) == 20
+    assert stub.connections == 1
+    stats = manager.stats.snapshot()
+    assert stats["sent"] == 20 and stats["failed"] == 0
+    assert stats["latency_max_ms"] >= stats["latency_avg_ms"] > 0
+
+
+def test_counts_failures():
+    stub = StubCallbackServer(statuses=[500])
+    manager = CallbackManager(url=stub.url)
+    state = make_state()
+    assert not manager.send_final_callback("failing", state)
+    stub.close()
+
+    assert manager.stats.snapshot()["failed"] == 1
+    assert not state.callback_sent
+
+
+if __name__ == "__main__":
+    test_reuses_connections()
+    print("✓ PASS reuses connections")
+    test_counts_failures()
+    print("✓ PASS counts failures")
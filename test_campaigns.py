@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test near-duplicate campaign clustering: variants of a template that differ
+in names, amounts and numbers share a campaign, the index stays bounded, a
+known scam campaign short-circuits detection, and /campaigns serves it.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from campaigns import BANDS, CampaignIndex
+from server import create_app
+from asgi_client import ASGIClient, run
+from test_helpers import make_handler, send
+
+TEMPLATE = ("Dear {name}, your SBI account will be blocked today due to pending KYC. "
+            "Pay Rs {amount} immediately to {upi} or call {phone} to verify.")
+NAMES = ["Ravi", "Priya", "Amit", "Sunita"]
+
+
+def variant(i):
+    return TEMPLATE.format(name=NAMES[i % len(NAMES)], amount=999 + 1000 * i,
+                           upi=f"kyc{i}@ybl", phone=f"98765{i:05d}")
+
+
+def test_variants_share_a_campaign():
+    index = CampaignIndex(clock=lambda: 1000.0)
+    ids = {index.assign(variant(i)).id for i in range(20)}
+    assert len(ids) == 1
+    other = index.assign("Hi, the meeting moved to Tuesday afternoon, please bring the signed documents along")
+    assert other.id not in ids
+    assert index.assign("Hello, who is this?") is None
+
+    campaign = index.get(ids.pop())
+    assert campaign.size == 20
+    assert campaign.to_dict()["sample"] == variant(0)
+    assert [c["size"] for c in index.top(limit=5)] == [20, 1]
+
+    signature = index.signature(variant(0))
+    assert signature.similarity(signature) == 1.0
+    assert signature.similarity(other.signature) < 0.2
+
+
+def test_bounded_memory():
+    index = CampaignIndex(max_campaigns=3, max_tokens=40)
+    words = "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima".split()
+    first = index.assign(" ".join(words[:6]))
+    for i in range(1, 6):
+        index.assign(" ".join(word + "x" * i for word in words))
+    stats = index.stats()
+    assert (stats["campaigns"], stats["evictions"]) == (3, 3)
+    assert index.get(first.id) is None
+    assert len(index._bands) <= 3 * BANDS
+    assert stats["cached_tokens"] <= 40
+
+
+def test_scam_campaign_skips_detection():
+    handler = make_handler()
+    send(handler, "first", variant(0))
+    campaign = handler.campaigns.assign(variant(1))
+    assert campaign.scam
+
+    result = send(handler, "second", variant(2))
+    state = handler.session_store.get_session("second")
+    assert result["scamDetected"] and state.scam_detected
+    # Detection did not run, but extraction did
+    assert state.signal_tally.turn == 0
+    assert state.extracted_intelligence["upi_ids"] == ["kyc2@ybl"]
+    counters, _ = handler.metrics.snapshot()
+    assert counters["campaign_fast_path_total"] == 1
+
+    # Clustered, but never detected as a scam: detection still runs
+    benign = "Hi, the meeting moved to Tuesday afternoon, please bring the signed documents along"
+    send(handler, "b1", benign)
+    send(handler, "b2", benign)
+    assert not handler.session_store.get_session("b2").scam_detected
+    assert handler.campaigns.assign(benign).size == 3
+
+
+def test_campaign_endpoints():
+    handler = make_handler()
+    app = create_app(handler, warmup=True)
+    client = ASGIClient(app, headers={"x-api-key": "test-key-12345"})
+
+    async def scenario():
+        async with client.lifespan():
+            for i in range(3):
+                send(handler, f"target-{i}", variant(i))
+            listing = await client.get("/campaigns?limit=5&scam_only=true")
+            campaign_id = listing.json()["campaigns"][0]["campaignId"]
+            found = await client.get(f"/campaigns/{campaign_id}")
+            missing = await client.get("/campaigns/999999")
+            return listing, found, missing
+
+    listing, found, missing = run(scenario())
+    assert listing.status_code == 200
+    assert [c["size"] for c in listing.json()["campaigns"]] == [3]
+    assert found.status_code == 200 and found.json()["scam"] is True
+    assert missing.status_code == 404
+    # The warm-up message is not counted in any campaign
+    assert handler.campaigns.stats()["campaigns"] == 1
+
+
+if __name__ == "__main__":
+    test_variants_share_a_campaign()
+    print("✓ PASS template variants share a campaign")
+    test_bounded_memory()
+    print("✓ PASS memory is bounded")
+    test_scam_campaign_skips_detection()
+    print("✓ PASS known scam campaign skips detection")
+    test_campaign_endpoints()
+    print("✓ PASS campaign endpoints")
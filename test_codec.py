@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the opt-in fast codec: decoding matches Pydantic, unusual bodies fall
+back to full validation, responses and callback payloads encode the same
+as the default path.
+"""
+
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import codec
+from models import HoneypotRequest
+from records import SessionRecord
+from callback import CallbackManager
+from handler import HoneypotHandler
+from sessions import SessionStore
+from server import create_app
+from asgi_client import ASGIClient, run
+
+
+def make_body(session_id="codec", turns=20, timestamp="2024-01-01T10:00:00Z"):
+    return {
+        "sessionId": session_id,
+        "message": {"sender": "scammer", "text": "URGENT: verify your account at http://bit.ly/x", "timestamp": timestamp},
+        "conversationHistory": [
+            {"sender": "scammer" if i % 2 == 0 else "user", "text": f"turn {i}", "timestamp": timestamp, "extra": {"n": i}}
+            for i in range(turns)
+        ],
+        "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+    }
+
+
+def test_decode_matches_pydantic():
+    body = make_body()
+    fast = codec.decode_request(json.dumps(body).encode())
+    model = HoneypotRequest(**body)
+    assert fast.sessionId == model.sessionId
+    assert (fast.message.sender, fast.message.text, fast.message.timestamp) == (model.message.sender, model.message.text, model.message.timestamp)
+    assert fast.conversationHistory == model.conversationHistory
+    assert fast.metadata.locale == model.metadata.locale
+    assert not hasattr(fast, "__dict__")
+
+
+def test_falls_back_to_pydantic():
+    # Epoch timestamps are valid for Pydantic but not for the fast decoder
+    body = json.dumps(make_body(timestamp=1704103200)).encode()
+    try:
+        codec.decode_request(body)
+        assert False, "expected CodecError"
+    except codec.CodecError:
+        pass
+    parsed, errors = codec.parse_request(body)
+    assert errors is None and isinstance(parsed, HoneypotRequest)
+
+    parsed, errors = codec.parse_request(b'{"sessionId": 1}')
+    assert parsed is None
+    assert {"type": "string_type", "loc": ["body", "sessionId"], "msg": "Input should be a valid string"} in errors
+
+
+def test_encode_response_matches_json():
+    for result in ({"reply": "I see. What should I do now?", "scamDetected": True, "sessionId": "s-é\"1"},
+                   {"reply": "Thank you for your message. How can I help you today?", "scamDetected": False, "sessionId": "s2"},
+                   {"reply": "x", "other": 1}):
+        assert json.loads(codec.encode_response(result)) == result
+
+
+def test_callback_payload_matches_model():
+    record = SessionRecord(scam_detected=True, total_message_count=4, extracted_intelligence={"upi_ids": ["a@upi"]})
+    state = record.to_state()
+    fast = CallbackManager(url="http://127.0.0.1:9", fast_codec=True)
+    slow = CallbackManager(url="http://127.0.0.1:9", fast_codec=False)
+    for session_state in (record, state):
+        assert fast.payload_dict("s", session_state) == slow.payload_dict("s", session_state)
+
+
+def test_fast_app_matches_default_app():
+    responses = []
+    for fast_codec in (False, True):
+        handler = HoneypotHandler(session_store=SessionStore(max_sessions=100, idle_ttl=0))
+        client = ASGIClient(create_app(handler, warmup=False, fast_codec=fast_codec))
+        ok = run(client.post("/honeypot/message", make_body(), json_body=True))
+        bad = run(client.post("/honeypot/message", {"sessionId": "x"}, json_body=True))
+        assert ok.status_code == 200 and bad.status_code == 422
+        responses.append((ok.json()["scamDetected"], ok.json()["sessionId"], sorted(ok.json())))
+        assert handler.session_store.get_session("codec").total_message_count == 1
+    assert responses[0] == responses[1]
+
+
+if __name__ == "__main__":
+    test_decode_matches_pydantic()
+    print("✓ PASS decode matches Pydantic")
+    test_falls_back_to_pydantic()
+    print("✓ PASS falls back to Pydantic")
+    test_encode_response_matches_json()
+    print("✓ PASS encode response matches json")
+    test_callback_payload_matches_model()
+    print("✓ PASS callback payload matches model")
+    test_fast_app_matches_default_app()
+    print("✓ PASS fast app matches default app")
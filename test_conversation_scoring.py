@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test conversation-level scoring: a scam spread over several mild turns is
+flagged through the session's running SignalTally, repeating one mild
+signal is not, the tally survives the backend round trip, and it follows
+category changes in a reloaded rule pack.
+"""
+
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import HoneypotHandler, detect_scam
+from models import HoneypotRequest
+from records import SessionRecord
+from sessions import SessionStore
+from rules import rule_registry
+from signals import SignalMatcher
+from tally import SignalTally
+
+AUTHORITY = "This is the RBI office"
+PAYMENT = "Please share the details"
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+
+
+def test_single_messages_are_mild():
+    for text in (AUTHORITY, PAYMENT):
+        result = detect_scam(text, [])
+        assert not result.scamDetected, text
+        assert not any(reason.startswith("Conversation") for reason in result.reasons)
+
+
+def test_history_flags_a_spread_out_scam():
+    history = [{"sender": "scammer", "text": AUTHORITY}, {"sender": "user", "text": "Okay"}]
+    result = detect_scam(PAYMENT, history)
+    assert result.scamDetected
+    assert result.confidence == 0.2 * 0.8 + 0.25
+    assert "Conversation turn 1: Authority impersonation +0.20 (now 0.16)" in result.reasons
+    assert "Conversation turn 2: Payment/verification request +0.25 (now 0.25)" in result.reasons
+    assert result.reasons[0] == "Payment/verification request: \\bshare\\b"
+
+
+def test_repeating_one_signal_does_not_add_up():
+    history = [{"sender": "scammer", "text": AUTHORITY}] * 5
+    assert not detect_scam(AUTHORITY, history).scamDetected
+
+
+def test_running_tally_matches_history():
+    tally = SignalTally()
+    detect_scam(AUTHORITY, [], tally)
+    incremental = detect_scam(PAYMENT, [], tally)
+    assert incremental == detect_scam(PAYMENT, [{"sender": "scammer", "text": AUTHORITY}])
+    assert tally.turn == 2
+
+
+def test_stale_signals_decay():
+    tally = SignalTally()
+    tally.fold(rule_registry.current.signal_matcher.scan(AUTHORITY.lower()))
+    for _ in range(5):
+        tally.fold([])
+    assert not detect_scam(PAYMENT, [], tally).scamDetected
+
+
+def test_session_flags_across_turns():
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=10, idle_ttl=0))
+    for turn, text in enumerate(["Hello?", AUTHORITY, PAYMENT]):
+        result = handler.handle_message(HoneypotRequest(
+            sessionId="spread",
+            message={"sender": "scammer", "text": text, "timestamp": datetime(2024, 1, 1, 10, turn, tzinfo=timezone.utc)},
+            metadata=METADATA
+        ))
+    assert result["scamDetected"]
+    assert handler.session_store.get_session("spread").signal_tally.turn == 3
+
+
+def test_tally_round_trips():
+    record = SessionRecord()
+    detect_scam(AUTHORITY, [], record.signal_tally)
+    restored = SessionRecord.from_dict(record.to_dict())
+    assert restored.signal_tally == record.signal_tally
+    assert SessionRecord.from_dict({k: v for k, v in record.to_dict().items() if k != "t"}).signal_tally.turn == 0
+
+
+def test_tally_follows_category_changes():
+    before = SignalMatcher([("Alpha", 0.2, [r"\balpha\b"], False), ("Beta", 0.3, [r"\bbeta\b"], False)])
+    after = SignalMatcher([("Beta", 0.3, [r"\bbeta\b"], False), ("Gamma", 0.4, [r"\bgamma\b"], False)])
+    tally = SignalTally(matcher=before)
+    tally.fold(before.scan("alpha beta"), before, decay=0.5)
+    # Stored under the old rules, read back after a reload: totals follow their labels
+    tally = SignalTally.from_list(tally.to_list())
+    tally.fold(after.scan("gamma"), after, decay=0.5)
+    assert tally.totals == [0.15, 0.4] and tally.labels is after.layout
+    assert tally.reasons(after, decay=0.5)[:2] == ["Conversation turn 1: Beta +0.30 (now 0.15)",
+                                                   "Conversation turn 2: Gamma +0.40 (now 0.40)"]
+    # A tally stored before labels were kept, under a layout of another size, starts over
+    legacy = SignalTally.from_list([[0.2, 0.3, 0.1], 1, [[1, [0.2, 0.3, 0.1]]]])
+    legacy.fold([], after)
+    assert legacy.totals == [0.0, 0.0] and not legacy.recent
+
+
+if __name__ == "__main__":
+    test_single_messages_are_mild()
+    print("✓ PASS single mild messages are not flagged")
+    test_history_flags_a_spread_out_scam()
+    print("✓ PASS history flags a scam spread over turns")
+    test_repeating_one_signal_does_not_add_up()
+    print("✓ PASS repeating one signal does not add up")
+    test_running_tally_matches_history()
+    print("✓ PASS running tally matches a history rescan")
+    test_stale_signals_decay()
+    print("✓ PASS stale signals decay")
+    test_session_flags_across_turns()
+    print("✓ PASS session flags across turns")
+    test_tally_round_trips()
+    print("✓ PASS tally round-trips through the backend form")
+    test_tally_follows_category_changes()
+    print("✓ PASS tally follows category changes")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test delta conversation mode: the server's history chain matches what a
+client computes, delta turns are accepted while in sync, and a mismatch asks
+for a full resync (409) that brings the session back in sync. Full-history
+requests only hash the entries the session has not chained yet.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import history
+import records
+from history import GENESIS, chain, history_digest, HistoryMismatch
+from models import HoneypotRequest
+from records import SessionRecord
+from server import create_app
+from asgi_client import ASGIClient, run
+from test_helpers import METADATA, make_handler
+
+SCRIPT = [
+    "URGENT: your account will be blocked today",
+    "Verify your KYC now at http://bit.ly/kyc",
+    "Pay the fee to fraud@ybl",
+    "Call 9876543210 immediately",
+]
+
+
+def request(session_id, text, history=None, seq=None, digest=None):
+    body = {
+        "sessionId": session_id,
+        "message": {"sender": "scammer", "text": text, "timestamp": "2024-01-01T10:00:00Z"},
+        "metadata": METADATA
+    }
+    if history is not None:
+        body["conversationHistory"] = history
+    if seq is not None:
+        body["historySeq"] = seq
+    if digest is not None:
+        body["historyDigest"] = digest
+    return body
+
+
+def test_chain_matches_client_history():
+    entries = [{"sender": "scammer", "text": "a"}, {"sender": "user", "text": "b"}]
+    assert history_digest([]) == GENESIS
+    assert history_digest(entries) == chain(chain(GENESIS, "scammer", "a"), "user", "b")
+    assert history_digest(entries[1:], history_digest(entries[:1])) == history_digest(entries)
+
+
+def count_hashes(action):
+    """How many chain() steps action() takes."""
+    calls = 0
+    original = history.chain
+
+    def counting(*args):
+        nonlocal calls
+        calls += 1
+        return original(*args)
+
+    history.chain = records.chain = counting
+    try:
+        action()
+    finally:
+        history.chain = records.chain = original
+    return calls
+
+
+def test_full_history_hashes_new_entries_only():
+    entries = [{"sender": "scammer" if i % 2 == 0 else "user", "text": f"turn {i}"} for i in range(200)]
+    record = SessionRecord()
+    record.rebase_history(entries[:100])
+    # Same history again: only its last entry is checked
+    assert count_hashes(lambda: record.rebase_history(entries[:100])) == 1
+    # Longer history: the check, then the new entries (chain and tail digest each)
+    assert count_hashes(lambda: record.rebase_history(entries)) == 1 + 2 * 100
+    assert (record.history_seq, record.history_digest) == (200, history_digest(entries))
+    # A history that does not continue the chain is hashed from scratch
+    entries[-1] = {"sender": "user", "text": "edited"}
+    record.rebase_history(entries)
+    assert record.history_digest == history_digest(entries)
+
+
+def test_delta_turns_stay_in_sync():
+    handler = make_handler()
+    full_history = []
+    result = None
+    for turn, text in enumerate(SCRIPT):
+        if turn == 0:
+            body = request("delta", text, history=[])
+        else:
+            body = request("delta", text, seq=result["historySeq"], digest=result["historyDigest"])
+        result = handler.handle_message(HoneypotRequest(**body))
+        full_history += [{"sender": "scammer", "text": text}, {"sender": "user", "text": result["reply"]}]
+        # What the client would compute over the full conversation
+        assert result["historySeq"] == len(full_history)
+        assert result["historyDigest"] == history_digest(full_history)
+    assert handler.session_store.get_session("delta").total_message_count == len(SCRIPT)
+
+
+def test_mismatch_requires_resync():
+    handler = make_handler()
+    first = handler.handle_message(HoneypotRequest(**request("resync", SCRIPT[0], history=[])))
+    try:
+        handler.handle_message(HoneypotRequest(**request("resync", SCRIPT[1], seq=first["historySeq"] + 2)))
+        assert False, "expected HistoryMismatch"
+    except HistoryMismatch as e:
+        assert (e.history_seq, e.history_digest) == (first["historySeq"], first["historyDigest"])
+    # Nothing was recorded for the rejected turn
+    assert handler.session_store.get_session("resync").total_message_count == 1
+
+    # A node that never saw the session asks for the full history too
+    other = make_handler()
+    app = create_app(other, warmup=False)
+    client = ASGIClient(app)
+    response = run(client.post("/honeypot/message", request("resync", SCRIPT[1], seq=first["historySeq"],
+                                                             digest=first["historyDigest"]), json_body=True))
+    assert response.status_code == 409
+    assert response.json()["resync"] is True and response.json()["historySeq"] == 0
+
+    history = [{"sender": "scammer", "text": SCRIPT[0]}, {"sender": "user", "text": first["reply"]}]
+    response = run(client.post("/honeypot/message", request("resync", SCRIPT[1], history=history), json_body=True))
+    assert response.status_code == 200
+    resynced = response.json()
+    response = run(client.post("/honeypot/message", request("resync", SCRIPT[2], seq=resynced["historySeq"],
+                                                             digest=resynced["historyDigest"]), json_body=True))
+    assert response.status_code == 200 and response.json()["historySeq"] == 6
+
+
+if __name__ == "__main__":
+    test_chain_matches_client_history()
+    print("✓ PASS chain matches client history")
+    test_full_history_hashes_new_entries_only()
+    print("✓ PASS full history hashes new entries only")
+    test_delta_turns_stay_in_sync()
+    print("✓ PASS delta turns stay in sync")
+    test_mismatch_requires_resync()
+    print("✓ PASS mismatch requires resync")
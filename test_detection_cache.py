@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the detection cache: repeated template texts are analyzed once, the
+cache stays bounded, and every session's own state is still updated on a
+hit.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from detection_cache import DetectionCache, cache_key
+from handler import MessageAnalysis, detect_scam
+from rules import rule_registry
+from test_helpers import make_handler, send
+
+TEMPLATE = "URGENT: your SBI account will be blocked today. Pay the fee to verify@ybl or call 9876543210"
+
+
+def test_counts_and_bound():
+    cache = DetectionCache(max_entries=2)
+    calls = []
+
+    def compute(text):
+        calls.append(text)
+        return len(text)
+
+    for text in ["a", "b", " a ", "c", "b"]:
+        cache.get_or_compute(text, compute)
+    assert calls == ["a", "b", "c", "b"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 4, 2, 2)
+    assert cache_key("Pay now") != cache_key("pay now")
+
+
+def test_analysis_matches_detect_scam():
+    analysis = MessageAnalysis(TEMPLATE, rule_registry.current)
+    assert analysis.detection == detect_scam(TEMPLATE, [])
+    assert analysis.artifacts["upi_ids"] == ["verify@ybl"]
+
+
+def test_sessions_updated_on_hit():
+    # Without the campaign fast path, so every session runs its own detection
+    handler = make_handler(campaign_fast_path=False)
+    for target in range(3):
+        send(handler, f"target-{target}", TEMPLATE)
+    assert handler.detection_cache.stats()["hits"] == 2
+
+    states = [handler.session_store.get_session(f"target-{target}") for target in range(3)]
+    for state in states:
+        assert state.scam_detected
+        assert state.total_message_count == 1
+        assert state.signal_tally.turn == 1
+        assert state.extracted_intelligence["upi_ids"] == ["verify@ybl"]
+    assert handler.artifact_index.lookup("verify@ybl")["sessionCount"] >= 3
+
+    # The repeat inside one session still counts as a message without new intel
+    send(handler, "target-0", TEMPLATE)
+    assert handler.session_store.get_session("target-0").consecutive_no_new_intel == 1
+
+
+def test_disabled_cache_gives_same_results():
+    cached = make_handler(campaign_fast_path=False)
+    uncached = make_handler(campaign_fast_path=False, detection_cache=DetectionCache(max_entries=0))
+    for handler in (cached, uncached):
+        for text in ["Hello", "This is the RBI office", "Please share the details", TEMPLATE]:
+            send(handler, "same", text)
+    a = cached.session_store.get_session("same")
+    b = uncached.session_store.get_session("same")
+    assert a.scam_detected == b.scam_detected and a.signal_tally == b.signal_tally
+    assert a.extracted_intelligence == b.extracted_intelligence
+    assert uncached.detection_cache.stats()["size"] == 0
+
+
+if __name__ == "__main__":
+    test_counts_and_bound()
+    print("✓ PASS hit/miss/eviction counters and bound")
+    test_analysis_matches_detect_scam()
+    print("✓ PASS cached analysis matches detect_scam")
+    test_sessions_updated_on_hit()
+    print("✓ PASS sessions are updated on a hit")
+    test_disabled_cache_gives_same_results()
+    print("✓ PASS disabled cache gives the same results")
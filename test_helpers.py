@@ -0,0 +1,42 @@
+"""
+Shared pieces of the handler tests: request metadata, a handler on its own
+state, and sending a scammer message through it.
+"""
+
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from artifact_index import ArtifactIndex
+from campaigns import CampaignIndex
+from detection_cache import DetectionCache
+from handler import HoneypotHandler
+from metrics import Metrics
+from models import HoneypotRequest
+from sessions import SessionStore
+
+METADATA = {"channel": "SMS", "language": "English", "locale": "IN"}
+
+
+def make_handler(**options):
+    """
+    A HoneypotHandler with its own session store, caches, indexes and
+    metrics, so tests do not see each other's sessions. options are
+    HoneypotHandler arguments and replace the defaults here.
+    """
+    options.setdefault("session_store", SessionStore(max_sessions=100, idle_ttl=0))
+    options.setdefault("detection_cache", DetectionCache())
+    options.setdefault("campaigns", CampaignIndex())
+    options.setdefault("artifact_index", ArtifactIndex())
+    options.setdefault("metrics", Metrics())
+    return HoneypotHandler(**options)
+
+
+def send(handler, session_id, text, minute=0):
+    """One scammer message to session_id, sent at 10:minute; returns the handler's answer."""
+    return handler.handle_message(HoneypotRequest(
+        sessionId=session_id,
+        message={"sender": "scammer", "text": text, "timestamp": datetime(2024, 1, 1, 10, minute, tzinfo=timezone.utc)},
+        metadata=METADATA
+    ))
@@ -102,7 +102,7 @@ def test_intelligence_extraction():
         {
             "name": "Phone Extraction",
             "message": "Call +919876543210 or 01123456789 or 8877665544",
-            "expected_phones": ["+919876543210", "01123456789", "8877665544"]
+            "expected_phones": ["+919876543210", "01123456789", "+918877665544"]
         },
         {
             "name": "URL Extraction",
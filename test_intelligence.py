@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test the incremental IntelligenceStore: per-message deltas, insertion-ordered
+serialization, and the no-new-intel counter driven by the delta.
+"""
+
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from intelligence import IntelligenceStore, INTELLIGENCE_CATEGORIES
+from records import SessionRecord
+from handler import extract_artifacts, extract_intelligence, HoneypotHandler
+from models import HoneypotRequest, Message, Metadata
+from sessions import SessionStore
+
+
+def test_update_returns_delta():
+    store = IntelligenceStore()
+    assert store.update({"upi_ids": ["a@upi", "b@upi"], "urls": []}) == {"upi_ids": ["a@upi", "b@upi"]}
+    assert store.update({"upi_ids": ["b@upi", "c@upi", "a@upi"]}) == {"upi_ids": ["c@upi"]}
+    assert store.update({"upi_ids": ["c@upi"]}) == {}
+    assert len(store) == 3
+
+
+def test_serialization_keeps_insertion_order():
+    store = IntelligenceStore()
+    for item in ["z@upi", "a@upi", "m@upi"]:
+        store.add("upi_ids", item)
+    data = store.to_dict()
+    assert list(data) == list(INTELLIGENCE_CATEGORIES)
+    assert data["upi_ids"] == ["z@upi", "a@upi", "m@upi"]
+
+    record = SessionRecord(extracted_intelligence=store)
+    assert SessionRecord.from_dict(record.to_dict()).extracted_intelligence["upi_ids"] == ["z@upi", "a@upi", "m@upi"]
+    assert SessionRecord.from_state(record.to_state()).extracted_intelligence == store
+
+
+def test_extraction_matches_legacy_dict_api():
+    text = "Pay to fraud@ybl or fraud@ybl, call 9876543210, visit http://bad.example/kyc"
+    artifacts = extract_artifacts(text)
+    assert artifacts["upi_ids"] == ["fraud@ybl"]
+    assert artifacts["phone_numbers"] == ["+919876543210"]
+    assert artifacts["urls"] == ["http://bad.example/kyc"]
+
+    previous = {"upi_ids": ["old@upi"]}
+    merged = extract_intelligence(text, previous)
+    assert merged["upi_ids"] == ["old@upi", "fraud@ybl"]
+    assert previous == {"upi_ids": ["old@upi"]}
+
+
+def test_counter_driven_by_delta():
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=10, idle_ttl=0))
+
+    def send(text):
+        request = HoneypotRequest(
+            sessionId="intel",
+            message=Message(sender="scammer", text=text, timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            conversationHistory=[],
+            metadata=Metadata(channel="SMS", language="English", locale="IN")
+        )
+        handler.handle_message(request)
+        return handler.session_store.get_session("intel")
+
+    send("URGENT: your account will be blocked, verify now")
+    state = send("Pay to fraud@ybl immediately")
+    assert state.consecutive_no_new_intel == 0
+    state = send("Pay to fraud@ybl immediately")
+    assert state.consecutive_no_new_intel == 1
+    state = send("Or call 9876543210")
+    assert state.consecutive_no_new_intel == 0
+    assert state.extracted_intelligence["upi_ids"] == ["fraud@ybl"]
+
+
+if __name__ == "__main__":
+    test_update_returns_delta()
+    print("✓ PASS update returns delta")
+    test_serialization_keeps_insertion_order()
+    print("✓ PASS serialization keeps insertion order")
+    test_extraction_matches_legacy_dict_api()
+    print("✓ PASS extraction matches legacy dict API")
+    test_counter_driven_by_delta()
+    print("✓ PASS counter driven by delta")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test that the shared Aho-Corasick keyword index finds exactly the keywords
+that `keyword in text` finds, for every keyword set.
+"""
+
+import random
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from keywords import KeywordIndex
+from rules import rule_registry
+from test_data import TEST_SCENARIOS, EDGE_CASES
+
+rules = rule_registry.current
+keyword_index = rules.keyword_index
+
+
+def reference_scan(keyword_sets, text):
+    return {name: [keyword for keyword in keywords if keyword in text]
+            for name, keywords in keyword_sets.items()}
+
+
+def test_matches_substring_checks():
+    """Corpus messages give the same hits as substring checks."""
+    messages = [test["message"].lower() for tests in TEST_SCENARIOS.values() for test in tests]
+    messages += [test["message"].lower() for test in EDGE_CASES]
+    messages += ["", "opinion company", "share your account number and otp asap!!"]
+    for text in messages:
+        assert keyword_index.scan(text) == reference_scan(rules.keyword_sets, text), text
+
+
+def test_overlapping_keywords():
+    """Keywords that are prefixes, suffixes or inside other keywords are all reported."""
+    keyword_sets = {"a": ["he", "she", "his", "hers"], "b": ["hers", "s", "rs"]}
+    index = KeywordIndex(keyword_sets)
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = "".join(rng.choices("hersi ", k=rng.randint(0, 20)))
+        assert index.scan(text) == reference_scan(keyword_sets, text), text
+
+
+def test_shared_between_threads():
+    """One index serves concurrent scans without interference."""
+    texts = ["urgent payment via otp", "hello there", "transfer the fee right now"]
+    expected = [reference_scan(rules.keyword_sets, text) for text in texts]
+    failures = []
+
+    def worker():
+        for _ in range(500):
+            for text, hits in zip(texts, expected):
+                if keyword_index.scan(text) != hits:
+                    failures.append(text)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failures
+
+
+if __name__ == "__main__":
+    test_matches_substring_checks()
+    print("✓ PASS corpus matches substring checks")
+    test_overlapping_keywords()
+    print("✓ PASS overlapping keywords")
+    test_shared_between_threads()
+    print("✓ PASS shared between threads")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test the pipeline metrics: per-thread shards add up, histograms are
+cumulative in Prometheus text, a request recorded in one record() call
+counts as its separate observations would, and /metrics reports every
+handler stage.
+"""
+
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import Metrics
+from handler import HoneypotHandler
+from sessions import SessionStore
+from server import create_app
+from asgi_client import ASGIClient, run
+
+REQUEST = {
+    "sessionId": "metrics-test",
+    "message": {"sender": "scammer", "text": "URGENT: your account will be blocked, pay to fraud@ybl", "timestamp": "2024-01-01T10:00:00Z"},
+    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+}
+
+
+def test_shards_add_up():
+    metrics = Metrics(buckets=(0.001, 0.01))
+
+    def work():
+        for _ in range(1000):
+            metrics.inc("requests_total")
+            metrics.observe("detect", 0.005)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.observe("detect", 0.0001)
+    metrics.observe("detect", 5)
+
+    counters, histograms = metrics.snapshot()
+    assert counters == {"requests_total": 4000}
+    assert histograms["detect"][:3] == [1, 4000, 1]
+
+    text = metrics.render()
+    assert "honeypot_requests_total 4000" in text
+    assert 'honeypot_stage_seconds_bucket{stage="detect",le="0.001"} 1' in text
+    assert 'honeypot_stage_seconds_bucket{stage="detect",le="0.01"} 4001' in text
+    assert 'honeypot_stage_seconds_bucket{stage="detect",le="+Inf"} 4002' in text
+    assert 'honeypot_stage_seconds_count{stage="detect"} 4002' in text
+
+
+def test_record_matches_observe():
+    recorded, observed = Metrics(buckets=(0.001, 0.01)), Metrics(buckets=(0.001, 0.01))
+    stages = [("detect", 0.005), ("extract", 0.0001), ("total", 5)]
+    for _ in range(3):
+        recorded.record(stages, ("requests_total", "scam_replies_total"))
+        for stage, seconds in stages:
+            observed.observe(stage, seconds)
+        observed.inc("requests_total")
+        observed.inc("scam_replies_total")
+    assert recorded.snapshot() == observed.snapshot()
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics(enabled=False)
+    metrics.inc("requests_total")
+    metrics.observe("detect", 0.1)
+    metrics.record([("total", 0.1)], ("requests_total",))
+    assert metrics.snapshot() == ({}, {})
+
+
+def test_metrics_endpoint():
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=100, idle_ttl=0), metrics=Metrics())
+    client = ASGIClient(create_app(handler, warmup=False), headers={"x-api-key": "test-key-12345"})
+
+    async def scenario():
+        await client.post("/honeypot/message", REQUEST, json_body=True)
+        return await client.get("/metrics")
+
+    response = run(scenario())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "honeypot_requests_total 1" in text
+    assert "honeypot_scam_rate 1" in text
+    assert "honeypot_sessions 1" in text
+    for stage in ("session", "detect", "extract", "reply", "store", "total"):
+        assert f'honeypot_stage_seconds_count{{stage="{stage}"}} 1' in text, stage
+
+
+if __name__ == "__main__":
+    test_shards_add_up()
+    print("✓ PASS per-thread shards add up")
+    test_record_matches_observe()
+    print("✓ PASS record matches observe")
+    test_disabled_records_nothing()
+    print("✓ PASS disabled metrics record nothing")
+    test_metrics_endpoint()
+    print("✓ PASS /metrics reports every stage")
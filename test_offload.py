@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test the offload pool: a worker's analysis matches the in-process one,
+a worker that cannot load the request's rules hands the message back, and
+the message route sends long messages to the pool and answers as it would
+inline.
+"""
+
+import json
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import offload
+from asgi_client import ASGIClient, run
+from config import config
+from handler import MessageAnalysis
+from rules import load_rules, rule_registry
+from server import create_app
+from test_helpers import METADATA, make_handler
+
+SHORT = "URGENT: your SBI account will be blocked. Pay the fee to verify@ybl or call +919876543210"
+LONG = (SHORT + " Kindly share the OTP. ") * 100
+
+
+def test_worker_matches_in_process():
+    offload._init_worker(rule_registry.path, rule_registry.artifact)
+    rules = rule_registry.current
+    for text in (SHORT, LONG, "hello there"):
+        hits, keyword_hits, artifacts = offload.analyze_text(text, rules.digest)
+        local = MessageAnalysis(text, rules)
+        remote = MessageAnalysis.precomputed(text, rules, hits, keyword_hits, artifacts)
+        assert (hits, keyword_hits, artifacts) == (local.hits, local.keyword_hits, local.artifacts)
+        assert remote.detection == local.detection
+
+
+def test_worker_follows_reloads():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        with open(config.RULE_PACK, "rb") as f:
+            pack = json.load(f)
+        with open(path, "w") as f:
+            json.dump(pack, f)
+        offload._init_worker(path, path + ".compiled")
+        first = offload._rules.digest
+
+        pack["signals"][0]["patterns"].append(r"\bzorblax\b")
+        with open(path, "w") as f:
+            json.dump(pack, f)
+        reloaded = load_rules(path)
+        # The request's digest is newer than the worker's rules: the worker loads the pack again
+        assert offload.analyze_text("zorblax", reloaded.digest)[0]
+        # A digest the pack on disk no longer has: handed back
+        assert offload.analyze_text("zorblax", first) is None
+
+
+def post(client, session_id, text):
+    return client.post("/honeypot/message", {
+        "sessionId": session_id,
+        "message": {"sender": "scammer", "text": text, "timestamp": "2024-01-01T10:00:00Z"},
+        "conversationHistory": [],
+        "metadata": METADATA
+    }, json_body=True)
+
+
+def test_route_offloads_long_messages():
+    async def scenario(workers):
+        app = create_app(make_handler(), warmup=False, offload_workers=workers)
+        client = ASGIClient(app, headers={"x-api-key": config.API_KEY or ""})
+        async with client.lifespan():
+            responses = [(await post(client, "short", SHORT)).json(), (await post(client, "long", LONG)).json()]
+            pool = app.state.offload
+            counts = (pool.offloaded, pool.fallbacks) if pool is not None else None
+            intelligence = app.state.handler.session_store.get_session("long").extracted_intelligence.to_dict()
+        return responses, counts, intelligence
+
+    inline, _, inline_intelligence = run(scenario(0))
+    offloaded, counts, intelligence = run(scenario(1))
+    assert counts == (1, 0), counts
+    assert [r["scamDetected"] for r in offloaded] == [r["scamDetected"] for r in inline] == [True, True]
+    assert intelligence == inline_intelligence and intelligence["upi_ids"] == ["verify@ybl"]
+
+
+if __name__ == "__main__":
+    test_worker_matches_in_process()
+    print("✓ PASS worker analysis matches in-process analysis")
+    test_worker_follows_reloads()
+    print("✓ PASS worker follows rule reloads")
+    test_route_offloads_long_messages()
+    print("✓ PASS route offloads long messages")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test stateless rehydration: a node that never saw a session rebuilds it from
+conversationHistory to the same state as the node that served it, later
+turns only process the new suffix, and a history that does not repeat the
+replies is lined up by the scammer's turns.
+"""
+
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from campaigns import CampaignIndex
+from detection_cache import DetectionCache
+from handler import HoneypotHandler
+from models import HoneypotRequest
+from sessions import SessionStore
+from history import history_digest
+from test_helpers import METADATA
+
+SCRIPT = [
+    "Hello, this is your bank",
+    "URGENT: your account will be blocked today",
+    "Verify your KYC now at http://bit.ly/kyc",
+    "Pay the fee to fraud@ybl",
+    "Pay the fee to fraud@ybl",
+    "Call 9876543210 immediately",
+]
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, session_state):
+        self.submitted.append(session_id)
+        return True
+
+
+class CountingHandler(HoneypotHandler):
+    def __init__(self):
+        super().__init__(stateless=True, session_store=SessionStore(max_sessions=100, idle_ttl=0),
+                         detection_cache=DetectionCache(), campaigns=CampaignIndex(),
+                         callback_dispatcher=RecordingDispatcher())
+        self.processed = 0
+
+    def process_message(self, *args, **kwargs):
+        self.processed += 1
+        return super().process_message(*args, **kwargs)
+
+
+def request(text, history, turn):
+    return HoneypotRequest(
+        sessionId="stateless",
+        message={"sender": "scammer", "text": text, "timestamp": datetime(2024, 1, 1, 10, turn, tzinfo=timezone.utc)},
+        conversationHistory=history,
+        metadata=METADATA
+    )
+
+
+def converse(handlers):
+    """Send SCRIPT with full history, turn i going to handlers[i % len(handlers)]."""
+    history = []
+    for turn, text in enumerate(SCRIPT):
+        handler = handlers[turn % len(handlers)]
+        result = handler.handle_message(request(text, list(history), turn))
+        timestamp = datetime(2024, 1, 1, 10, turn, tzinfo=timezone.utc).isoformat()
+        history += [{"sender": "scammer", "text": text, "timestamp": timestamp},
+                    {"sender": "user", "text": result["reply"], "timestamp": timestamp}]
+    return history
+
+
+def state_of(handler):
+    record = handler.session_store.get_session("stateless")
+    return (record.scam_detected, record.total_message_count, record.consecutive_no_new_intel,
+            record.extracted_intelligence.to_dict(), [turn.text for turn in record.history],
+            record.history_seq, record.history_digest)
+
+
+def test_any_node_rebuilds_the_same_session():
+    sticky = CountingHandler()
+    converse([sticky])
+    assert sticky.processed == len(SCRIPT)
+
+    node_a, node_b = CountingHandler(), CountingHandler()
+    history = converse([node_a, node_b])
+    assert state_of(node_a)[:4] != state_of(sticky)[:4]  # node A missed the last turn
+    # Replies are picked at random, so only the digest differs between the two conversations
+    assert state_of(node_b)[:-1] == state_of(sticky)[:-1]
+    assert state_of(node_b)[-1] == history_digest(history)
+
+
+def test_only_suffix_is_processed():
+    handler = CountingHandler()
+    history = converse([handler])
+    handler.processed = 0
+    handler.handle_message(request("One more thing", history, 10))
+    assert handler.processed == 1
+
+    fresh = CountingHandler()
+    fresh.handle_message(request("One more thing", history, 10))
+    assert fresh.processed == len(SCRIPT) + 1
+
+
+def test_changed_reply_is_not_a_divergence():
+    handler = CountingHandler()
+    history = converse([handler])
+    # The client does not repeat the last reply word for word: lined up by the scammer's turns
+    history[-1]["text"] = "a reply this node never sent"
+    handler.processed = 0
+    handler.handle_message(request("One more thing", history, 10))
+    assert handler.processed == 1
+
+
+def test_diverged_history_rebuilds():
+    handler = CountingHandler()
+    history = converse([handler])
+    before = handler.session_store.get_session("stateless")
+    # The last turn, and the reply to it, are not the ones this node took in
+    history[-2]["text"] = "a message this node never saw"
+    history[-1]["text"] = "a reply this node never sent"
+    handler.processed = 0
+    handler.handle_message(request("One more thing", history, 10))
+    assert handler.processed == len(SCRIPT) + 1
+    after = handler.session_store.get_session("stateless")
+    # Replayed turns are not counted again, nor is the final callback sent again
+    assert after.total_message_count == before.total_message_count + 1
+    assert after.callback_sent == before.callback_sent
+
+
+def test_scammer_only_history():
+    handler = CountingHandler()
+    texts = [f"{SCRIPT[turn % len(SCRIPT)]} ({turn})" for turn in range(20)]
+    history = []
+    for turn, text in enumerate(texts):
+        handler.handle_message(request(text, list(history), turn % 60))
+        history.append({"sender": "scammer", "text": text, "timestamp": "2024-01-01T10:00:00Z"})
+    # Every message is taken in once, and finishing the session sends one callback
+    assert handler.processed == len(texts)
+    assert handler.session_store.get_session("stateless").total_message_count == len(texts)
+    assert handler.callback_dispatcher.submitted == ["stateless"]
+    clustered = [text for text in texts if handler.campaigns.signature(text) is not None]
+    assert sum(campaign.size for campaign in handler.campaigns.campaigns.values()) == len(clustered)
+
+
+if __name__ == "__main__":
+    test_any_node_rebuilds_the_same_session()
+    print("✓ PASS any node rebuilds the same session")
+    test_only_suffix_is_processed()
+    print("✓ PASS only suffix is processed")
+    test_changed_reply_is_not_a_divergence()
+    print("✓ PASS changed reply is not a divergence")
+    test_diverged_history_rebuilds()
+    print("✓ PASS diverged history rebuilds")
+    test_scammer_only_history()
+    print("✓ PASS scammer-only history")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test hot reload of the rule pack: a changed pack is published with a new
+generation, a malformed one is rejected and the current rules kept, the
+watcher picks up edits, requests served during reloads each see one
+pack from start to finish, campaign marks only count under the rules
+that made them, and the batch route scores with the app handler's rules.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from asgi_client import ASGIClient, run
+from config import config
+from handler import get_safe_reply, score_messages
+from rules import RulePackError, RuleRegistry
+from server import create_app
+from sessions import SessionStore
+from test_helpers import make_handler, send
+
+# Harmless under the shipped pack, a scam once "zorblax" is an urgency and account-threat pattern
+MESSAGE = "zorblax zorblax, reply soon"
+
+
+def pack(variant):
+    """The shipped pack with every reply bank replaced by one reply naming the variant; B also knows zorblax."""
+    with open(config.RULE_PACK, "rb") as f:
+        data = json.load(f)
+    data["version"] = variant
+    data["replies"] = {name: [f"reply from {variant}"] for name in data["replies"]}
+    if variant == "B":
+        for category in data["signals"]:
+            if category["label"] in ("Urgency language", "Account threat"):
+                category["patterns"].append(r"\bzorblax\b")
+    return data
+
+
+def write_pack(path, data):
+    # Written to the side and renamed in, as a deploy would, so a reader never sees half a file
+    with open(path + ".tmp", "w") as f:
+        f.write(data if isinstance(data, str) else json.dumps(data))
+    os.replace(path + ".tmp", path)
+
+
+def test_reload_publishes_new_generation():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        write_pack(path, pack("A"))
+        registry = RuleRegistry(path)
+        first = registry.current
+        assert first.generation == 1 and not registry.reload()
+
+        write_pack(path, pack("B"))
+        assert registry.reload()
+        assert registry.current.version == "B" and registry.current.generation == 2
+        assert registry.reload(force=True) is False  # same digest: nothing to publish
+
+        write_pack(path, '{"signals": ')
+        try:
+            registry.reload()
+            assert False
+        except RulePackError:
+            pass
+        info = registry.info()
+        assert info["version"] == "B" and info["generation"] == 2
+        assert (info["reloads"], info["reloadErrors"]) == (1, 1) and info["lastError"]
+        # A broken pack is not retried until it changes again
+        assert not registry.reload()
+
+        write_pack(path, pack("A"))
+        assert registry.reload() and registry.current.generation == 3
+        assert registry.info()["lastError"] is None
+
+
+def test_watcher_picks_up_edits():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        write_pack(path, pack("A"))
+        registry = RuleRegistry(path)
+        handler = make_handler(campaign_fast_path=False, rule_registry=registry,
+                               session_store=SessionStore(max_sessions=100000, idle_ttl=0))
+        assert send(handler, "before", MESSAGE)["reply"] == get_safe_reply()
+
+        registry.watch(interval=0.02)
+        try:
+            write_pack(path, pack("B"))
+            deadline = time.time() + 10
+            while registry.current.generation == 1 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            registry.stop()
+        assert registry.current.version == "B"
+        # The cached analysis of MESSAGE under A is not reused
+        result = send(handler, "after", MESSAGE)
+        assert result["scamDetected"] and result["reply"] == "reply from B"
+
+
+def test_requests_see_one_pack_during_reloads():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        write_pack(path, pack("A"))
+        registry = RuleRegistry(path)
+        handler = make_handler(campaign_fast_path=False, rule_registry=registry,
+                               session_store=SessionStore(max_sessions=100000, idle_ttl=0))
+        results, errors = [], []
+        stop = threading.Event()
+
+        def client(n):
+            i = 0
+            while not stop.is_set():
+                try:
+                    # A fresh session each time, so the outcome depends only on the pack in force
+                    results.append(send(handler, f"client-{n}-{i}", MESSAGE))
+                except Exception as e:
+                    errors.append(e)
+                i += 1
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        reloads = 0
+        try:
+            for variant in "BABABABABA" * 2:
+                write_pack(path, pack(variant))
+                reloads += registry.reload(force=True)
+                time.sleep(0.02)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        assert not errors, errors[:3]
+        assert reloads == 20 and registry.current.generation == 21
+        # Under A the message is harmless; under B it is a scam answered from B's replies.
+        # Detection from one pack with a reply from the other would be a torn snapshot.
+        outcomes = {(result["scamDetected"], result["reply"]) for result in results}
+        assert outcomes <= {(False, get_safe_reply()), (True, "reply from B")}, outcomes
+        assert len(outcomes) == 2, outcomes
+        assert not send(handler, "final", MESSAGE)["scamDetected"]
+
+
+def test_campaign_marks_follow_reloads():
+    text = "zorblax zorblax, reply soon about the parcel for grandma"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        write_pack(path, pack("B"))
+        registry = RuleRegistry(path)
+        handler = make_handler(campaign_fast_path=True, rule_registry=registry)
+        assert send(handler, "under-b", text)["scamDetected"]
+
+        # Rolled back to A: the campaign's mark from B no longer flags anyone
+        write_pack(path, pack("A"))
+        assert registry.reload()
+        assert not send(handler, "under-a", text)["scamDetected"]
+        assert "campaign_fast_path_total" not in handler.metrics.snapshot()[0]
+
+        # Forward to B again: a new detection marks the campaign for the new generation
+        write_pack(path, pack("B"))
+        assert registry.reload()
+        assert send(handler, "under-b-again", text)["scamDetected"]
+        assert send(handler, "fast", text)["scamDetected"]
+        assert handler.metrics.snapshot()[0]["campaign_fast_path_total"] == 1
+
+
+def test_batch_uses_handler_rules():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        write_pack(path, pack("B"))
+        app = create_app(make_handler(rule_registry=RuleRegistry(path)), warmup=False)
+        response = run(ASGIClient(app).post("/honeypot/batch", [MESSAGE], json_body=True))
+        assert response.ndjson()[0]["scamDetected"]
+        # The shipped pack, which the process-wide registry serves, does not flag it
+        assert not next(score_messages([MESSAGE]))["scamDetected"]
+
+
+if __name__ == "__main__":
+    test_reload_publishes_new_generation()
+    print("✓ PASS reload publishes a new generation, malformed packs rejected")
+    test_watcher_picks_up_edits()
+    print("✓ PASS watcher picks up edits")
+    test_requests_see_one_pack_during_reloads()
+    print("✓ PASS requests see one pack during reloads")
+    test_campaign_marks_follow_reloads()
+    print("✓ PASS campaign marks follow reloads")
+    test_batch_uses_handler_rules()
+    print("✓ PASS batch uses the handler's rules")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test rule packs: the shipped pack compiles to the matchers the handler
+uses, the compiled artifact is reused until the pack or the code pickled
+into it changes, the registry
+loads the pack on first use, malformed packs are rejected, and the reply banks drive agent_reply().
+"""
+
+from datetime import datetime, timezone
+import json
+import os
+import sys
+import shutil
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import rules as rules_module
+from config import config
+from handler import agent_reply
+from records import SessionRecord
+from rules import RulePackError, RuleRegistry, compile_rule_pack, load_rules, read_artifact, rule_registry
+
+SCAM = "URGENT: your SBI account will be blocked. Pay the fee or call +919876543210 for help"
+
+
+def default_pack():
+    with open(config.RULE_PACK, "rb") as f:
+        return json.load(f)
+
+
+def test_shipped_pack():
+    rules = rule_registry.current
+    compiled = compile_rule_pack(json.dumps(default_pack()).encode("utf-8"))
+    assert compiled.name == "default" and compiled.version == rules.version
+    text = SCAM.lower()
+    assert compiled.signal_matcher.scan(text) == rules.signal_matcher.scan(text)
+    assert compiled.keyword_index.scan(text) == rules.keyword_index.scan(text)
+    assert [label for label, _, _, _ in compiled.signal_categories][0] == "Urgency language"
+
+
+def test_artifact_reused_until_pack_changes():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        artifact = path + ".compiled"
+        pack = default_pack()
+        with open(path, "w") as f:
+            json.dump(pack, f)
+
+        first = load_rules(path, artifact)
+        assert os.path.exists(artifact)
+        compiles = []
+        original = rules_module.compile_rule_pack
+        rules_module.compile_rule_pack = lambda *args: compiles.append(1) or original(*args)
+        try:
+            second = load_rules(path, artifact)
+            assert compiles == [] and second.digest == first.digest
+            # The unpickled matcher compiles its regexes on first use
+            assert second.signal_matcher.scan(SCAM.lower()) == first.signal_matcher.scan(SCAM.lower())
+
+            pack["signals"][0]["patterns"].append(r"\bkindly\b")
+            with open(path, "w") as f:
+                json.dump(pack, f)
+            third = load_rules(path, artifact)
+            assert compiles == [1] and third.digest != first.digest
+            assert third.signal_matcher.scan("kindly pay")[0] == len(pack["signals"][0]["patterns"]) - 1
+
+            with open(artifact, "wb") as f:
+                f.write(b"not a pickle")
+            assert read_artifact(artifact, third.digest) is None
+            assert load_rules(path, artifact).digest == third.digest
+            assert compiles == [1, 1]
+        finally:
+            rules_module.compile_rule_pack = original
+
+
+def test_artifact_depends_on_rules_code():
+    # CompiledRules is pickled into the artifact too: a change to rules.py must rebuild it
+    original = rules_module.__file__
+    with tempfile.TemporaryDirectory() as directory:
+        changed = os.path.join(directory, "rules.py")
+        shutil.copy(original, changed)
+        with open(changed, "a") as f:
+            f.write("\n# changed\n")
+        rules_module.__file__ = changed
+        try:
+            assert rules_module._code_digest() != rules_module._CODE_DIGEST
+        finally:
+            rules_module.__file__ = original
+    assert rules_module._code_digest() == rules_module._CODE_DIGEST
+
+
+def test_registry_loads_on_first_use():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pack.json")
+        with open(path, "w") as f:
+            json.dump(default_pack(), f)
+        registry = RuleRegistry(path)
+        # Nothing is read or compiled until the rules are wanted
+        assert not os.path.exists(registry.artifact)
+        rules = registry.current
+        assert os.path.exists(registry.artifact) and rules.generation == 1
+        assert registry.current is rules and not registry.reload()
+
+
+def test_malformed_packs_rejected():
+    def broken(change):
+        pack = default_pack()
+        change(pack)
+        try:
+            compile_rule_pack(json.dumps(pack).encode("utf-8"))
+        except RulePackError:
+            return True
+        return False
+
+    assert broken(lambda pack: pack["signals"][0].update(weight="high"))
+    assert broken(lambda pack: pack["signals"][4]["patterns"].append(r"\bcall (\d+"))
+    assert broken(lambda pack: pack["signals"][4].update(requires=10))
+    assert broken(lambda pack: pack["signals"][4].update(requires=r"(\d{10}"))
+    assert broken(lambda pack: pack["replies"].pop("default"))
+    assert broken(lambda pack: pack["replies"].update(lottery=["Which lottery?"]))
+    assert broken(lambda pack: pack["keywords"].pop("suspicious"))
+    assert broken(lambda pack: pack.update(signals=[]))
+    try:
+        compile_rule_pack(b"{not json")
+        assert False
+    except RulePackError:
+        pass
+
+
+def test_reply_banks():
+    rules = rule_registry.current
+    banks = rules.reply_banks
+    assert rules.replies_for({"personal_info": ["otp"], "payment": ["pay"]}) is banks["personal_info"]
+    assert rules.replies_for({"personal_info": [], "payment": ["pay"], "urgency": ["urgent"]}) is banks["payment"]
+    assert rules.replies_for({"personal_info": [], "payment": [], "urgency": []}) is banks["default"]
+
+    session = SessionRecord()
+    session.add_turn("scammer", "Share your OTP now", datetime(2024, 1, 1, tzinfo=timezone.utc))
+    assert agent_reply(session) in banks["personal_info"]
+
+
+if __name__ == "__main__":
+    test_shipped_pack()
+    print("✓ PASS shipped pack compiles to the handler's matchers")
+    test_artifact_reused_until_pack_changes()
+    print("✓ PASS artifact reused until the pack changes")
+    test_artifact_depends_on_rules_code()
+    print("✓ PASS artifact depends on the rules code")
+    test_registry_loads_on_first_use()
+    print("✓ PASS registry loads on first use")
+    test_malformed_packs_rejected()
+    print("✓ PASS malformed packs rejected")
+    test_reply_banks()
+    print("✓ PASS reply banks")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test the production app factory: readiness after warm-up, the real handler
+behind /honeypot/message (on the thread pool when the session backend
+blocks), and the legacy entry modules pointing at it.
+"""
+
+import tempfile
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server import create_app, WARMUP_SESSION_ID
+from handler import HoneypotHandler
+from metrics import Metrics
+from sessions import SessionStore
+from session_backends import SQLiteSessionBackend
+from detection_cache import DetectionCache
+from asgi_client import ASGIClient, run
+
+REQUEST = {
+    "sessionId": "server-test",
+    "message": {"sender": "scammer", "text": "URGENT: your account will be blocked, verify KYC now", "timestamp": "2024-01-01T10:00:00Z"},
+    "conversationHistory": [],
+    "metadata": {"channel": "SMS", "language": "English", "locale": "IN"}
+}
+
+
+def make_app():
+    handler = HoneypotHandler(session_store=SessionStore(max_sessions=100, idle_ttl=0),
+                              metrics=Metrics(), detection_cache=DetectionCache())
+    return create_app(handler, warmup=True), handler
+
+
+def test_ready_only_after_warmup():
+    app, handler = make_app()
+    client = ASGIClient(app)
+
+    async def scenario():
+        before = await client.get("/ready")
+        async with client.lifespan():
+            after = await client.get("/ready")
+        return before, after
+
+    before, after = run(scenario())
+    assert before.status_code == 503
+    assert after.status_code == 200
+    assert set(after.json()["warmupMs"]) >= {"signals", "keywords", "extraction", "handler"}
+    # The warm-up conversation is not left behind
+    assert handler.session_store.stats()["size"] == 0
+    assert WARMUP_SESSION_ID not in handler.session_store.backend.sessions
+    # Nor counted as traffic or cached as if a client had sent it
+    counters, histograms = handler.metrics.snapshot()
+    assert "requests_total" not in counters and "total" not in histograms
+    assert handler.detection_cache.stats()["size"] == handler.detection_cache.misses == 0
+
+
+def test_message_uses_real_handler():
+    app, handler = make_app()
+    client = ASGIClient(app)
+
+    async def scenario():
+        async with client.lifespan():
+            return await client.post("/honeypot/message", REQUEST, json_body=True)
+
+    response = run(scenario())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sessionId"] == "server-test"
+    assert body["scamDetected"] is True
+    assert body["reply"]
+    assert handler.session_store.get_session("server-test").total_message_count == 1
+
+
+class ThreadRecordingHandler(HoneypotHandler):
+    def handle_message(self, *args, **kwargs):
+        self.thread = threading.current_thread()
+        return super().handle_message(*args, **kwargs)
+
+
+def test_blocking_backend_runs_off_the_event_loop():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(SQLiteSessionBackend(os.path.join(tmp, "sessions.db")))
+        handler = ThreadRecordingHandler(session_store=store, metrics=Metrics(), detection_cache=DetectionCache())
+        client = ASGIClient(create_app(handler, warmup=False))
+
+        async def scenario():
+            async with client.lifespan():
+                loop_thread = threading.current_thread()
+                response = await client.post("/honeypot/message", REQUEST, json_body=True)
+                metrics = await client.get("/metrics")
+                return loop_thread, response, metrics
+
+        loop_thread, response, metrics = run(scenario())
+        assert response.status_code == 200 and metrics.status_code == 200
+        assert store.blocking
+        assert handler.thread is not loop_thread
+        assert store.get_session("server-test").total_message_count == 1
+
+
+def test_entry_points_share_the_app():
+    import app, main, index, simple_app
+    assert main.app is app.app and index.app is app.app and simple_app.app is app.app
+
+
+if __name__ == "__main__":
+    test_ready_only_after_warmup()
+    print("✓ PASS ready only after warm-up")
+    test_message_uses_real_handler()
+    print("✓ PASS message uses real handler")
+    test_blocking_backend_runs_off_the_event_loop()
+    print("✓ PASS blocking backend runs off the event loop")
+    test_entry_points_share_the_app()
+    print("✓ PASS entry points share the app")
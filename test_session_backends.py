@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Test the shared session backends: two SessionStore instances standing in for
+two workers must see one conversation's state, using SQLite (WAL) and a
+local stand-in Redis server. Workers updating one session at the same time
+under locked() must not overwrite each other, a session held by one worker
+must not hold up the others, and a session's final callback goes out once
+whichever worker finishes it.
+"""
+
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import HoneypotHandler
+from models import HoneypotRequest, Message, Metadata
+from session_backends import SessionBackend, SQLiteSessionBackend, RedisSessionBackend, create_backend
+from sessions import SessionStore
+from stub_redis_server import StubRedisServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def alternate_workers(worker_a, worker_b):
+    """Send six messages of one conversation to two workers in turn."""
+    for turn in range(6):
+        store = worker_a if turn % 2 == 0 else worker_b
+        state = store.get_session("shared")
+        state.add_turn("scammer", f"turn {turn}", datetime(2024, 1, 1, 10, 0, turn))
+        state.total_message_count += 1
+        state.extracted_intelligence.add("upi_ids", f"id{turn}@upi")
+        if turn == 1:
+            state.scam_detected = True
+        store.update_session("shared", state)
+    return worker_a.get_session("shared")
+
+
+def race_workers(worker_a, worker_b, rounds=50):
+    """Two workers on threads bump one session's counter, each under the session lock."""
+    def bump(store):
+        for _ in range(rounds):
+            with store.locked("race"):
+                state = store.get_session("race")
+                state.total_message_count += 1
+                store.update_session("race", state)
+
+    threads = [threading.Thread(target=bump, args=(store,)) for store in (worker_a, worker_b)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return worker_a.get_session("race").total_message_count
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, session_state):
+        self.submitted.append(session_id)
+        return True
+
+
+def finish_on_two_workers(worker_a, worker_b):
+    """Turns of one scam session alternate between two handlers until well past its stop."""
+    dispatchers = [RecordingDispatcher(), RecordingDispatcher()]
+    handlers = [HoneypotHandler(session_store=store, callback_dispatcher=dispatcher)
+                for store, dispatcher in zip((worker_a, worker_b), dispatchers)]
+    for turn in range(8):
+        handlers[turn % 2].handle_message(HoneypotRequest(
+            sessionId="finished",
+            message=Message(sender="scammer", text=f"URGENT: pay the fee to fraud@ybl now ({turn})",
+                            timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            metadata=Metadata(channel="SMS", language="English", locale="IN")
+        ))
+    return dispatchers[0].submitted + dispatchers[1].submitted
+
+
+def test_sqlite_shared_between_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        worker_a = SessionStore(SQLiteSessionBackend(path))
+        worker_b = SessionStore(SQLiteSessionBackend(path))
+        state = alternate_workers(worker_a, worker_b)
+
+        assert state.total_message_count == 6
+        assert state.scam_detected
+        assert [turn.text for turn in state.history] == [f"turn {i}" for i in range(6)]
+        assert state.extracted_intelligence["upi_ids"] == [f"id{i}@upi" for i in range(6)]
+        assert worker_a.backend._db().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_locked_updates_and_one_callback():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        worker_a = SessionStore(SQLiteSessionBackend(path))
+        worker_b = SessionStore(SQLiteSessionBackend(path))
+        assert race_workers(worker_a, worker_b) == 100
+        assert finish_on_two_workers(worker_a, worker_b) == ["finished"]
+        assert worker_b.get_session("finished").callback_sent
+
+
+def held_session_only_holds_itself(worker_a, worker_b):
+    """While worker_a holds one session, worker_b updates another at once and times out on the held one."""
+    with worker_a.locked("held"):
+        start = time.monotonic()
+        with worker_b.locked("other"):
+            state = worker_b.get_session("other")
+            state.total_message_count += 1
+            worker_b.update_session("other", state)
+        assert time.monotonic() - start < 0.1
+        try:
+            with worker_b.locked("held"):
+                pass
+        except TimeoutError:
+            pass
+        else:
+            raise AssertionError("a held session was locked twice")
+    # Released: the other worker takes it now
+    with worker_b.locked("held"):
+        pass
+
+
+def test_sqlite_lease_holds_one_session():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        worker_a = SessionStore(SQLiteSessionBackend(path))
+        worker_b = SessionStore(SQLiteSessionBackend(path, lock_ttl=0.2))
+        held_session_only_holds_itself(worker_a, worker_b)
+        assert worker_a.backend._db().execute("SELECT COUNT(*) FROM session_locks").fetchone()[0] == 0
+
+
+def test_sqlite_expiry_and_cap_run_hooks():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = SQLiteSessionBackend(os.path.join(tmp, "sessions.db"), max_sessions=2, idle_ttl=60, clock=clock, sweep_interval=0)
+        store = SessionStore(backend)
+        dropped = []
+        store.add_eviction_hook(lambda session_id, state, reason: dropped.append((session_id, reason, state.total_message_count)))
+
+        for session_id in ["a", "b", "c"]:
+            state = store.get_session(session_id)
+            state.total_message_count = 1
+            store.update_session(session_id, state)
+            clock.now += 1
+        assert dropped == [("a", "evicted", 1)]
+
+        clock.now += 120
+        assert store.get_session("b").total_message_count == 0
+        assert sorted(dropped[1:]) == [("b", "expired", 1), ("c", "expired", 1)]
+        assert store.stats()["size"] == 1
+
+
+def test_redis_shared_between_workers():
+    server = StubRedisServer()
+    try:
+        worker_a = SessionStore(RedisSessionBackend(server.url))
+        worker_b = SessionStore(RedisSessionBackend(server.url))
+        state = alternate_workers(worker_a, worker_b)
+
+        assert state.total_message_count == 6
+        assert state.scam_detected
+        assert state.extracted_intelligence["upi_ids"] == [f"id{i}@upi" for i in range(6)]
+        assert worker_b.stats()["size"] == 1
+        assert 0 < worker_a.backend.client.execute("TTL", "honeypot:session:shared") <= 1800
+
+        assert worker_b.remove_session("shared").total_message_count == 6
+        assert worker_a.stats()["size"] == 0
+        assert worker_a.get_session("shared").total_message_count == 0
+        assert worker_a.stats()["size"] == 1
+    finally:
+        server.close()
+
+
+def test_redis_locked_updates_and_one_callback():
+    server = StubRedisServer()
+    try:
+        worker_a = SessionStore(RedisSessionBackend(server.url))
+        worker_b = SessionStore(RedisSessionBackend(server.url))
+        assert race_workers(worker_a, worker_b) == 100
+        assert finish_on_two_workers(worker_a, worker_b) == ["finished"]
+        assert worker_b.get_session("finished").callback_sent
+        # Every lock was released
+        assert worker_a.backend.client.execute("SCAN", "0", "MATCH", "honeypot:lock:*")[1] == []
+    finally:
+        server.close()
+
+
+def test_redis_lease_holds_one_session():
+    server = StubRedisServer()
+    try:
+        worker_a = SessionStore(RedisSessionBackend(server.url))
+        worker_b = SessionStore(RedisSessionBackend(server.url, lock_ttl=0.2))
+        held_session_only_holds_itself(worker_a, worker_b)
+    finally:
+        server.close()
+
+
+def test_create_backend():
+    assert create_backend("memory").name == "memory"
+    # A backend missing part of the interface fails when it is built, not on first use
+    class Incomplete(SessionBackend):
+        def load(self, session_id):
+            return None
+    try:
+        Incomplete()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("incomplete backend built")
+    try:
+        create_backend("cassandra")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown backend accepted")
+
+
+if __name__ == "__main__":
+    test_sqlite_shared_between_workers()
+    print("✓ PASS sqlite shared between workers")
+    test_sqlite_expiry_and_cap_run_hooks()
+    print("✓ PASS sqlite expiry and cap run hooks")
+    test_sqlite_locked_updates_and_one_callback()
+    print("✓ PASS sqlite locked updates and one callback")
+    test_sqlite_lease_holds_one_session()
+    print("✓ PASS sqlite lease holds one session")
+    test_redis_shared_between_workers()
+    print("✓ PASS redis shared between workers")
+    test_redis_locked_updates_and_one_callback()
+    print("✓ PASS redis locked updates and one callback")
+    test_redis_lease_holds_one_session()
+    print("✓ PASS redis lease holds one session")
+    test_create_backend()
+    print("✓ PASS create backend")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the compact SessionRecord: interned senders, epoch timestamps, the
+bounded turn ring buffer, and conversion to and from the Pydantic
+SessionState and the backend JSON form.
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import SessionState
+from records import SessionRecord, Sender
+
+
+def test_turns_are_compact():
+    record = SessionRecord()
+    turn = record.add_turn("scammer", "Pay now", datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+    assert turn.sender is Sender.SCAMMER
+    assert turn.timestamp == 1704103200000
+    assert not hasattr(turn, "__dict__") and not hasattr(record, "__dict__")
+
+    other = record.add_turn("".join(["bank", "-bot"]), "Hello", datetime(2024, 1, 1, 10, 1, tzinfo=timezone.utc))
+    again = record.add_turn("".join(["bank", "-", "bot"]), "Hello", datetime(2024, 1, 1, 10, 2, tzinfo=timezone.utc))
+    assert other.sender is again.sender
+    assert record.last_text() == "Hello"
+
+
+def test_history_is_a_bounded_ring_buffer():
+    record = SessionRecord(history=deque(maxlen=3))
+    for i in range(5):
+        record.add_turn("scammer", f"message {i}", datetime(2024, 1, 1, 10, i, tzinfo=timezone.utc))
+    assert [turn.text for turn in record.history] == ["message 2", "message 3", "message 4"]
+
+
+def test_converts_at_the_boundary():
+    record = SessionRecord(scam_detected=True, total_message_count=2,
+                           extracted_intelligence={"upi_ids": ["a@upi"]}, consecutive_no_new_intel=1)
+    record.add_turn("scammer", "Send to a@upi", datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+    record.add_turn("user", "Why?", datetime(2024, 1, 1, 10, 1, 30, 500000, tzinfo=timezone.utc))
+
+    state = record.to_state()
+    assert isinstance(state, SessionState)
+    assert state.conversation_history == [
+        {"sender": "scammer", "text": "Send to a@upi", "timestamp": "2024-01-01T10:00:00+00:00"},
+        {"sender": "user", "text": "Why?", "timestamp": "2024-01-01T10:01:30.500000+00:00"}
+    ]
+    assert state.extracted_intelligence["upi_ids"] == ["a@upi"]
+    assert state.extracted_intelligence["urls"] == []
+
+    assert SessionRecord.from_state(state) == record
+    assert SessionRecord.from_dict(record.to_dict()) == record
+
+
+if __name__ == "__main__":
+    test_turns_are_compact()
+    print("✓ PASS turns are compact")
+    test_history_is_a_bounded_ring_buffer()
+    print("✓ PASS history is a bounded ring buffer")
+    test_converts_at_the_boundary()
+    print("✓ PASS converts at the boundary")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test the bounded session store: idle expiry, LRU eviction, eviction hooks,
+stats, and that memory stays flat when many sessions pass through.
+Handlers hook into the store they are given and are not kept alive by it,
+and a finished session is marked when its final callback is queued so later
+turns do not send it again.
+"""
+
+import gc
+import tracemalloc
+import weakref
+from datetime import datetime, timezone
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import HoneypotHandler
+from models import HoneypotRequest, Message, Metadata
+from records import SessionRecord
+from sessions import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(max_sessions=100, idle_ttl=60, clock=clock)
+    dropped = []
+    store.add_eviction_hook(lambda session_id, state, reason: dropped.append((session_id, reason)))
+
+    store.get_session("old").total_message_count = 5
+    clock.now = 30
+    store.get_session("recent")
+    clock.now = 61
+    assert store.get_session("recent").total_message_count == 0
+    assert "old" not in store.backend.sessions
+    assert dropped == [("old", "expired")]
+
+    # An expired session starts over
+    clock.now = 200
+    assert store.get_session("old").total_message_count == 0
+    assert store.stats()["expirations"] == 2
+
+
+def test_lru_cap_evicts_least_recently_used():
+    store = SessionStore(max_sessions=3, idle_ttl=0)
+    dropped = []
+    store.add_eviction_hook(lambda session_id, state, reason: dropped.append((session_id, reason)))
+
+    for session_id in ["a", "b", "c"]:
+        store.get_session(session_id)
+    store.get_session("a")
+    store.get_session("d")
+
+    assert list(store.backend.sessions) == ["c", "a", "d"]
+    assert dropped == [("b", "evicted")]
+    assert store.stats() == {
+        "backend": "memory", "size": 3, "max_sessions": 3, "idle_ttl": 0,
+        "hits": 1, "misses": 4, "evictions": 1, "expirations": 0
+    }
+
+
+def test_hook_sees_pending_intelligence():
+    store = SessionStore(max_sessions=1, idle_ttl=0)
+    flushed = {}
+    store.add_eviction_hook(lambda session_id, state, reason: flushed.update({session_id: state.extracted_intelligence["upi_ids"]}))
+
+    state = store.get_session("scam")
+    state.scam_detected = True
+    state.extracted_intelligence.add("upi_ids", "fraud@upi")
+    store.update_session("scam", state)
+    store.get_session("next")
+
+    assert flushed == {"scam": ["fraud@upi"]}
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, session_state):
+        self.submitted.append(session_id)
+        return True
+
+
+def test_handler_hooks_its_own_store():
+    store = SessionStore(max_sessions=1, idle_ttl=0)
+    dispatcher = RecordingDispatcher()
+    handler = HoneypotHandler(session_store=store, callback_dispatcher=dispatcher)
+
+    state = store.get_session("scam")
+    state.scam_detected = True
+    store.update_session("scam", state)
+    store.get_session("next")
+    assert dispatcher.submitted == ["scam"]
+
+    # The store's hook does not keep the handler alive
+    ref = weakref.ref(handler)
+    del handler
+    gc.collect()
+    assert ref() is None
+    store.get_session("after")
+
+
+def test_callback_sent_once():
+    store = SessionStore(max_sessions=10, idle_ttl=0)
+    dispatcher = RecordingDispatcher()
+    handler = HoneypotHandler(session_store=store, callback_dispatcher=dispatcher)
+    for turn in range(20):
+        handler.handle_message(HoneypotRequest(
+            sessionId="finished",
+            message=Message(sender="scammer", text=f"URGENT: pay the fee to fraud@ybl now ({turn})",
+                            timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            metadata=Metadata(channel="SMS", language="English", locale="IN")
+        ))
+
+    # The session stopped on its third turn without new intelligence
+    assert dispatcher.submitted == ["finished"]
+    state = store.get_session("finished")
+    assert state.callback_sent
+    assert SessionRecord.from_dict(state.to_dict()).callback_sent
+    # Evicting it later does not send it again either
+    store.remove_session("finished")
+    handler.flush_session("finished", state, "evicted")
+    assert dispatcher.submitted == ["finished"]
+
+
+def test_memory_flat_under_churn():
+    store = SessionStore(max_sessions=1000, idle_ttl=0)
+    now = datetime(2024, 1, 1)
+    tracemalloc.start()
+
+    def churn(start, count):
+        for i in range(start, start + count):
+            state = store.get_session(f"soak-{i}")
+            state.total_message_count += 1
+            state.add_turn("scammer", "pay now", now)
+            store.update_session(f"soak-{i}", state)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+
+    warm = churn(0, 5000)
+    after = churn(5000, 50000)
+    tracemalloc.stop()
+
+    assert len(store.backend.sessions) == 1000
+    assert after < warm * 1.1
+
+
+if __name__ == "__main__":
+    test_idle_sessions_expire()
+    print("✓ PASS idle sessions expire")
+    test_lru_cap_evicts_least_recently_used()
+    print("✓ PASS LRU cap evicts least recently used")
+    test_hook_sees_pending_intelligence()
+    print("✓ PASS hook sees pending intelligence")
+    test_handler_hooks_its_own_store()
+    print("✓ PASS handler hooks its own store")
+    test_callback_sent_once()
+    print("✓ PASS callback sent once")
+    test_memory_flat_under_churn()
+    print("✓ PASS memory flat under churn")
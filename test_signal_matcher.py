@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test that the precompiled signal matcher used by detect_scam() reports the
+same reasons and confidence as running every pattern with re.search.
+"""
+
+import random
+import re
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from handler import detect_scam
+from rules import rule_registry
+from signals import SignalMatcher
+from test_data import TEST_SCENARIOS, EDGE_CASES, generate_conversation_test
+
+
+def reference_detect(message):
+    """Pattern-by-pattern re.search, exactly as detect_scam used to do it."""
+    message_lower = message.lower()
+    reasons = []
+    confidence = 0.0
+    for label, weight, patterns, first_only in rule_registry.current.signal_categories:
+        for pattern in patterns:
+            if re.search(pattern, message_lower):
+                reasons.append(f"{label}: {pattern}")
+                confidence += weight
+                if first_only:
+                    break
+    return min(confidence, 1.0), reasons
+
+
+def corpus():
+    messages = [test["message"] for tests in TEST_SCENARIOS.values() for test in tests]
+    messages += [test["message"] for test in EDGE_CASES]
+    messages += [step["message"] for step in generate_conversation_test()]
+    messages += [
+        "This is SBI support. Call me on 9876543210 to complete verification.",
+        "Your bank account will be blocked today. Verify immediately.",
+        "Income Tax court case: pay the penalty via UPI, don't delay!",
+        "Reserve Bank notice - account frozen; call +919876543210 for help",
+        "upi pi u-pi supi upi@bank pi's 24 hours48 hours",
+        "blocked blocking unblock block-chain close, closed; court-case",
+        "",
+    ]
+    return messages
+
+
+def test_matches_reference_on_corpus():
+    """Every corpus message gets identical reasons and confidence."""
+    for message in corpus():
+        result = detect_scam(message, [])
+        confidence, reasons = reference_detect(message)
+        assert result.confidence == confidence, message
+        assert result.reasons == (reasons or ["No scam indicators detected"]), message
+        assert result.scamDetected == (confidence >= 0.40), message
+
+
+def test_matches_reference_on_random_mixes():
+    """Randomly stitched pattern words and punctuation agree with re.search."""
+    rng = random.Random(1234)
+    vocabulary = ["upi", "pi", "court", "case", "income", "tax", "account", "blocked",
+                  "don't", "delay", "24", "hours", "call", "me", "on", "9876543210",
+                  "+919876543210", "for", "help", "reserve", "bank", "right", "now",
+                  "fee", "fees", "verify", "immediately", "ACT", "FAST", "é", "_"]
+    separators = [" ", "  ", "-", ".", ",", "'", "", "\n"]
+    for _ in range(2000):
+        words = rng.choices(vocabulary, k=rng.randint(0, 12))
+        message = "".join(word + rng.choice(separators) for word in words)
+        result = detect_scam(message, [])
+        confidence, reasons = reference_detect(message)
+        assert result.confidence == confidence, message
+        assert result.reasons == (reasons or ["No scam indicators detected"]), message
+
+
+def test_custom_categories():
+    """Non-literal patterns fall back to compiled regexes, gated by a category's requires."""
+    matcher = SignalMatcher([
+        ("Prize", 0.5, [r'\bprize\b', r'\bwon\s+\$?\d+'], False),
+        ("Greeting", 0.1, [r'\bhello\b'], False),
+    ])
+    hits = matcher.scan("hello, you won $500 and a prize")
+    confidence, reasons = matcher.score(hits)
+    assert reasons == ["Prize: \\bprize\\b", "Prize: \\bwon\\s+\\$?\\d+", "Greeting: \\bhello\\b"]
+    assert confidence == 0.5 + 0.5 + 0.1
+
+    # A category's regexes are only tried where its required pattern is found
+    gated = SignalMatcher([("Prize", 0.5, [r'\bwon\s+\$?\d+'], False)], {"Prize": r'\d{3}'})
+    assert gated.scan("you won $500") == [0]
+    assert gated.scan("you won $50") == []
+
+
+if __name__ == "__main__":
+    test_matches_reference_on_corpus()
+    print("✓ PASS corpus matches re.search reference")
+    test_matches_reference_on_random_mixes()
+    print("✓ PASS random mixes match re.search reference")
+    test_custom_categories()
+    print("✓ PASS custom categories")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test conversation streams: turns sent over one WebSocket build the same
+session as the same turns posted with their full history, bad frames are
+answered without closing the stream, a stream opens its session under the
+session lock, and a stream follows a session that another client advanced.
+"""
+
+from contextlib import contextmanager
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from asgi_client import ASGIClient, run
+from codec import RequestMetadata
+from server import create_app
+from sessions import SessionStore
+from stream import ConversationStream
+from test_helpers import METADATA, make_handler
+
+SCRIPT = [
+    "Hello, this is Rahul from your bank",
+    "URGENT: your account will be blocked today",
+    "Verify your KYC now at http://bit.ly/kyc",
+    "Pay the fee to fraud@ybl or call 9876543210",
+]
+
+
+def turn(text):
+    return {"sender": "scammer", "text": text, "timestamp": "2024-01-01T10:00:00Z"}
+
+
+def make_app():
+    app = create_app(make_handler(), warmup=False)
+    return app, ASGIClient(app, headers={"x-api-key": "test-key"})
+
+
+def test_stream_matches_posts():
+    async def over_posts():
+        app, client = make_app()
+        history, answers = [], []
+        for text in SCRIPT:
+            body = {"sessionId": "s", "message": turn(text), "conversationHistory": history, "metadata": METADATA}
+            answer = (await client.post("/honeypot/message", body, json_body=True)).json()
+            history = history + [turn(text), {"sender": "user", "text": answer["reply"],
+                                              "timestamp": "2024-01-01T10:00:00Z"}]
+            answers.append(answer)
+        return app, answers
+
+    async def over_stream():
+        app, client = make_app()
+        answers = []
+        async with client.websocket("/honeypot/stream/s") as socket:
+            for text in SCRIPT:
+                await socket.send_json(turn(text))
+                answers.append(await socket.receive_json())
+            assert app.state.streams == 1
+        assert app.state.streams == 0
+        return app, answers
+
+    posted_app, posted = run(over_posts())
+    streamed_app, streamed = run(over_stream())
+    assert [a["scamDetected"] for a in streamed] == [a["scamDetected"] for a in posted] == [False, True, True, True]
+    assert [a["historySeq"] for a in streamed] == [a["historySeq"] for a in posted] == [2, 4, 6, 8]
+    posted_session = posted_app.state.handler.session_store.get_session("s")
+    streamed_session = streamed_app.state.handler.session_store.get_session("s")
+    assert streamed_session.extracted_intelligence.to_dict() == posted_session.extracted_intelligence.to_dict()
+    assert streamed_session.total_message_count == posted_session.total_message_count == len(SCRIPT)
+
+
+def test_bad_frames_keep_the_stream_open():
+    async def scenario():
+        app, client = make_app()
+        async with client.websocket("/honeypot/stream/bad") as socket:
+            await socket.send_text("not json")
+            invalid = await socket.receive_json()
+            await socket.send_json({"sender": "scammer", "text": "no timestamp"})
+            missing = await socket.receive_json()
+            await socket.send_json(turn(SCRIPT[3]))
+            answer = await socket.receive_json()
+        return invalid, missing, answer
+
+    invalid, missing, answer = run(scenario())
+    assert invalid["error"] == "invalid_turn"
+    assert missing["error"] == "invalid_turn" and missing["detail"][0]["loc"][-1] == "timestamp"
+    assert answer["scamDetected"] and answer["historySeq"] == 2
+
+
+class LockCheckingStore(SessionStore):
+    """Records, for each session lookup, whether the session was held."""
+
+    def __init__(self):
+        super().__init__(max_sessions=100, idle_ttl=0)
+        self.held = set()
+        self.lookups = []
+
+    @contextmanager
+    def locked(self, session_id):
+        self.held.add(session_id)
+        try:
+            with super().locked(session_id):
+                yield
+        finally:
+            self.held.discard(session_id)
+
+    def get_session(self, session_id):
+        self.lookups.append(session_id in self.held)
+        return super().get_session(session_id)
+
+
+def test_stream_opens_session_under_lock():
+    store = LockCheckingStore()
+    stream = ConversationStream(make_handler(session_store=store), "opened", RequestMetadata(**METADATA), None)
+    assert store.lookups == [True]
+    assert stream.history_seq == store.get_session("opened").history_seq == 0
+
+
+def test_stream_follows_other_clients():
+    async def scenario():
+        app, client = make_app()
+        async with client.websocket("/honeypot/stream/shared") as socket:
+            await socket.send_json(turn(SCRIPT[0]))
+            first = await socket.receive_json()
+            # A POST in delta mode advances the session behind the stream's back
+            body = {"sessionId": "shared", "message": turn(SCRIPT[1]), "metadata": METADATA,
+                    "historySeq": first["historySeq"], "historyDigest": first["historyDigest"]}
+            posted = (await client.post("/honeypot/message", body, json_body=True)).json()
+            await socket.send_json(turn(SCRIPT[2]))
+            mismatch = await socket.receive_json()
+            await socket.send_json(turn(SCRIPT[2]))
+            resent = await socket.receive_json()
+        # A new stream joins the conversation where it is
+        async with client.websocket("/honeypot/stream/shared") as socket:
+            await socket.send_json(turn(SCRIPT[3]))
+            joined = await socket.receive_json()
+        return posted, mismatch, resent, joined
+
+    posted, mismatch, resent, joined = run(scenario())
+    assert mismatch["error"] == "history_mismatch"
+    assert (mismatch["historySeq"], mismatch["historyDigest"]) == (posted["historySeq"], posted["historyDigest"])
+    assert resent["historySeq"] == 6 and joined["historySeq"] == 8
+
+
+if __name__ == "__main__":
+    test_stream_matches_posts()
+    print("✓ PASS stream builds the same session as posts")
+    test_bad_frames_keep_the_stream_open()
+    print("✓ PASS bad frames keep the stream open")
+    test_stream_opens_session_under_lock()
+    print("✓ PASS stream opens its session under the session lock")
+    test_stream_follows_other_clients()
+    print("✓ PASS stream follows other clients")